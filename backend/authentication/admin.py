@@ -1,4 +1,5 @@
 from django.contrib import admin
+from todo_project.paginators import EstimatedCountPaginator
 from .models import User
 
 
@@ -14,3 +15,6 @@ class UserAdmin(admin.ModelAdmin):
     ordering = ('-date_joined',)
     readonly_fields = ('last_login', 'date_joined')
     fields = ('username', 'email', 'first_name', 'last_name', 'is_active', 'last_login', 'date_joined')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from todo_project.metrics import metrics
+
+
+class UserCache:
+    """
+    Bounded per-process LRU cache of users by primary key.
+
+    Entries are reloaded after JWT_USER_CACHE_TTL seconds. In between,
+    RECHECK_FIELDS are re-read (a narrow primary-key query) every
+    JWT_USER_ACTIVE_RECHECK seconds: a deactivated or deleted account is
+    rejected, and a password or name change reloads the entry, in every
+    worker within that interval. Writes made through this process call
+    invalidate() and are seen at once.
+    """
+    RECHECK_FIELDS = ('is_active', 'password', 'first_name', 'last_name')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'JWT_USER_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'JWT_USER_CACHE_TTL', 300)
+
+    @property
+    def active_recheck(self):
+        return getattr(settings, 'JWT_USER_ACTIVE_RECHECK', 30)
+
+    def get(self, user_model, user_id):
+        """
+        Copy of the cached user (callers may modify and save it), or None
+        when the user does not exist or is no longer active
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+
+        if entry is not None and now - entry['loaded_at'] < self.ttl:
+            if now - entry['checked_at'] >= self.active_recheck:
+                current = user_model.objects.filter(pk=user_id).values_list(*self.RECHECK_FIELDS).first()
+                if current is None or not current[0]:
+                    self.invalidate(user_id)
+                    metrics.increment('auth.user_cache', result='revoked')
+                    return None
+                if current != tuple(getattr(entry['user'], name) for name in self.RECHECK_FIELDS):
+                    # Changed in another process: reload below
+                    metrics.increment('auth.user_cache', result='changed')
+                    entry = None
+                else:
+                    entry['checked_at'] = now
+            if entry is not None:
+                metrics.increment('auth.user_cache', result='hit')
+                return copy.copy(entry['user'])
+
+        metrics.increment('auth.user_cache', result='miss')
+        user = user_model.objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            self.invalidate(user_id)
+            return None
+        with self._lock:
+            self._entries[user_id] = {'user': user, 'loaded_at': now, 'checked_at': now}
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return copy.copy(user)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through user_cache
+    instead of a primary-key query on every request
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user_id = self.user_model._meta.pk.to_python(user_id)
+        user = user_cache.get(self.user_model, user_id)
+        if user is None:
+            # Missing and inactive users get the same response, as the
+            # active flag is not loaded separately on a cache miss
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,127 @@
+"""
+Per-process Bloom filter in front of simplejwt's token blacklist.
+
+Every refresh token verification used to query token_blacklist. The
+filter holds the JTIs of all blacklisted, unexpired tokens: a negative
+answer ("not revoked", the common case) needs no query, and a positive
+one is confirmed against the database. Tokens blacklisted by other
+processes are picked up every JWT_DENYLIST_SYNC_INTERVAL seconds (one
+query over rows blacklisted since the last sync, minus an overlap for
+transactions that committed late), and the filter is rebuilt every
+JWT_DENYLIST_REBUILD_INTERVAL seconds so expired tokens drop out.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from todo_project.metrics import metrics
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings, sized for `capacity` items at false
+    positive rate `error_rate`
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: h1 + i * h2 over one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        if item in self:
+            return
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class JTIDenylist:
+    """
+    Bloom filter of blacklisted refresh token JTIs, synced from the
+    BlacklistedToken table
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_wall = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def _new_filter(self, expected):
+        capacity = max(getattr(settings, 'JWT_DENYLIST_CAPACITY', 100000), expected * 2)
+        return BloomFilter(capacity, getattr(settings, 'JWT_DENYLIST_ERROR_RATE', 0.001))
+
+    def _load(self, since=None):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        tokens = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        if since is not None:
+            tokens = tokens.filter(blacklisted_at__gte=since)
+        return list(tokens.values_list('token__jti', flat=True))
+
+    def sync(self, force=False):
+        """
+        Rebuild the filter when it is due, otherwise add tokens
+        blacklisted since the last sync
+        """
+        now = time.monotonic()
+        rebuild_interval = getattr(settings, 'JWT_DENYLIST_REBUILD_INTERVAL', 3600)
+        sync_interval = getattr(settings, 'JWT_DENYLIST_SYNC_INTERVAL', 10)
+        with self._lock:
+            if self._filter is None or force or now - self._built_at >= rebuild_interval:
+                wall = timezone.now()
+                jtis = self._load()
+                bloom = self._new_filter(len(jtis))
+                for jti in jtis:
+                    bloom.add(jti)
+                self._filter = bloom
+                self._built_at = self._synced_at = now
+                self._synced_wall = wall
+                metrics.set_gauge('auth.jti_denylist.size', bloom.count)
+            elif now - self._synced_at >= sync_interval:
+                wall = timezone.now()
+                overlap = timedelta(seconds=getattr(settings, 'JWT_DENYLIST_SYNC_OVERLAP', 60))
+                for jti in self._load(self._synced_wall - overlap):
+                    self._filter.add(jti)
+                self._synced_at = now
+                self._synced_wall = wall
+                metrics.set_gauge('auth.jti_denylist.size', self._filter.count)
+
+    def might_contain(self, jti):
+        """
+        False when the token is certainly not blacklisted (as of the last
+        sync); True when the database has to be checked
+        """
+        self.sync()
+        found = jti in self._filter
+        metrics.increment('auth.jti_denylist.lookups', result='maybe' if found else 'miss')
+        return found
+
+    def add(self, jti):
+        """
+        Record a token blacklisted by this process without waiting for a sync
+        """
+        self.sync()
+        with self._lock:
+            self._filter.add(jti)
+
+
+denylist = JTIDenylist()
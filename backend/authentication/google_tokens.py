@@ -0,0 +1,136 @@
+"""
+Google ID token verification with in-process caching of the signing certs.
+
+The certs endpoint (GOOGLE_CERTS_URL) is fetched through CachedRequest,
+which keeps responses for as long as their Cache-Control/Expires
+headers allow, so steady-state logins make no outbound request. The
+endpoint may serve Google's {key id: x509 PEM} format or a JWKS
+({"keys": [...]}), which makes it easy to point at a local stub.
+"""
+import json
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+try:
+    import jwt as pyjwt
+    from google.auth import jwt as google_jwt
+    from google.auth.transport import requests as google_requests
+except Exception:  # pragma: no cover
+    pyjwt = None
+    google_jwt = None
+    google_requests = None
+
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+MAX_AGE_RE = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+def cache_lifetime(headers):
+    """
+    Seconds a response may be reused according to its Cache-Control,
+    Age and Expires headers (0 = do not cache)
+    """
+    cache_control = headers.get('Cache-Control', '') or ''
+    directives = {part.strip().split('=')[0].lower() for part in cache_control.split(',')}
+    if directives & {'no-store', 'no-cache', 'private'}:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    if match:
+        try:
+            age = int(headers.get('Age', 0) or 0)
+        except ValueError:
+            age = 0
+        return max(0, int(match[1]) - age)
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return max(0, int(parsedate_to_datetime(expires).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class CachedResponse:
+    """
+    google.auth.transport.Response replayed from the cache
+    """
+
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+class CachedRequest:
+    """
+    google.auth.transport.Request that reuses one HTTP session and serves
+    cacheable GET responses from memory until they expire
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._request = None
+
+    def _get_request(self):
+        if self._request is None:
+            self._request = google_requests.Request()
+        return self._request
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        if method != 'GET':
+            return self._get_request()(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        if timeout is None:
+            timeout = getattr(settings, 'GOOGLE_CERTS_TIMEOUT', 5)
+        response = self._get_request()(url, method=method, headers=headers, timeout=timeout, **kwargs)
+        lifetime = cache_lifetime(response.headers) if response.status == 200 else 0
+        if lifetime:
+            entry = CachedResponse(response.status, dict(response.headers), response.data)
+            with self._lock:
+                self._cache[url] = (now + lifetime, entry)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+certs_request = CachedRequest()
+
+
+def verify_google_id_token(token, client_id):
+    """
+    Verify signature, expiry, audience and issuer of a Google ID token;
+    return its claims. Raises ValueError (or a PyJWT error) when invalid.
+    """
+    certs_url = getattr(settings, 'GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+    response = certs_request(certs_url)
+    if response.status != 200:
+        raise ValueError(f'Could not fetch certificates at {certs_url}')
+    certs = json.loads(response.data.decode('utf-8'))
+
+    if 'keys' in certs:
+        # JWKS: pick the key by the token's kid
+        kid = pyjwt.get_unverified_header(token).get('kid')
+        keys = [key for key in pyjwt.PyJWKSet.from_dict(certs).keys if key.key_id == kid]
+        if not keys:
+            raise ValueError('No certificate matches the token key id')
+        idinfo = pyjwt.decode(token, keys[0].key, algorithms=[keys[0].algorithm_name or 'RS256'], audience=client_id)
+    else:
+        idinfo = google_jwt.decode(token, certs=certs, audience=client_id)
+
+    if idinfo.get('iss') not in GOOGLE_ISSUERS:
+        raise ValueError('Wrong issuer')
+    return idinfo
@@ -0,0 +1,136 @@
+"""
+Password hashers that run in a bounded, per-process worker pool.
+
+Hashing is deliberately slow, so a burst of logins or registrations can
+occupy every request worker and starve unrelated traffic. The hashers
+below hand encode()/verify() to a pool of PASSWORD_HASHING_WORKERS
+threads; at most PASSWORD_HASHING_QUEUE_SIZE more calls may wait for a
+free worker, and further callers are rejected at once with a 429
+(rest_framework.exceptions.Throttled, with Retry-After).
+
+The algorithm names are unchanged, so existing hashes keep verifying.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+from rest_framework.exceptions import Throttled
+from todo_project.metrics import metrics
+
+
+class HashingPool:
+    """
+    Size-limited executor with admission control
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = None
+        self._pid = None
+        self._admitted = 0
+        # Moving average of the time a hash takes, for Retry-After
+        self._average_seconds = 0.0
+
+    @property
+    def workers(self):
+        return max(1, getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1)
+
+    @property
+    def queue_size(self):
+        return max(0, getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', 16))
+
+    def _get_executor(self):
+        # Created lazily and again after a fork: worker threads do not survive it
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hashing')
+            self._pid = os.getpid()
+            self._admitted = 0
+        return self._executor
+
+    def retry_after(self):
+        """
+        Seconds until a slot is likely to free up
+        """
+        backlog = self._admitted / self.workers
+        return max(1, math.ceil(backlog * self._average_seconds))
+
+    def run(self, operation, func, *args):
+        """
+        Run func(*args) on the pool and wait for its result
+        """
+        if getattr(self._local, 'in_worker', False):
+            # Already on a pool thread (e.g. verify() calling encode())
+            return func(*args)
+
+        with self._lock:
+            executor = self._get_executor()
+            if self._admitted >= self.workers + self.queue_size:
+                metrics.increment('password_hashing.rejected', operation=operation)
+                raise Throttled(wait=self.retry_after())
+            self._admitted += 1
+            metrics.set_gauge('password_hashing.queue_depth', max(0, self._admitted - self.workers))
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            metrics.observe('password_hashing.wait_seconds', started - submitted, operation=operation)
+            self._local.in_worker = True
+            try:
+                return func(*args)
+            finally:
+                self._local.in_worker = False
+                elapsed = time.perf_counter() - started
+                metrics.observe('password_hashing.seconds', elapsed, operation=operation)
+                self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed if self._average_seconds else elapsed
+
+        try:
+            return executor.submit(task).result()
+        finally:
+            with self._lock:
+                self._admitted -= 1
+                metrics.set_gauge('password_hashing.queue_depth', max(0, self._admitted - self.workers))
+
+
+hashing_pool = HashingPool()
+
+
+class PooledHasherMixin:
+    """
+    Run encode() and verify() of a Django hasher on hashing_pool
+    """
+
+    def encode(self, password, salt, *args, **kwargs):
+        return hashing_pool.run('encode', lambda: super(PooledHasherMixin, self).encode(password, salt, *args, **kwargs))
+
+    def verify(self, password, encoded):
+        return hashing_pool.run('verify', lambda: super(PooledHasherMixin, self).verify(password, encoded))
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    pass
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """
+    Argon2id with costs from PASSWORD_ARGON2_TIME_COST,
+    PASSWORD_ARGON2_MEMORY_COST (KiB) and PASSWORD_ARGON2_PARALLELISM.
+    Requires argon2-cffi.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from authentication.models import User
+
+
+ENDPOINTS = {
+    'login': '/api/auth/login/',
+    'token': '/api/auth/token/',
+}
+
+# Cheap hasher to measure the request path without the password hash cost
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput through the full middleware stack (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Logins per endpoint (default 50)'
+        )
+        parser.add_argument(
+            '--fast-hasher', action='store_true',
+            help='Hash the benchmark password with MD5 to isolate the non-hashing cost'
+        )
+
+    def handle(self, *args, **options):
+        count = max(1, options['requests'])
+        hashers = FAST_HASHERS if options['fast_hasher'] else settings.PASSWORD_HASHERS
+        client = Client()
+        password = 'benchmark-password'
+
+        with override_settings(PASSWORD_HASHERS=hashers, ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            User.objects.create_user(
+                email='benchmark@example.invalid',
+                username='benchmark',
+                password=password,
+                first_name='Bench',
+                last_name='Mark',
+            )
+            # Both endpoints take the USERNAME_FIELD (email) and password
+            credentials = {'email': 'benchmark@example.invalid', 'password': password}
+            sessions_before = Session.objects.count()
+
+            for name, url in ENDPOINTS.items():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for _ in range(count):
+                        response = client.post(url, credentials, content_type='application/json')
+                        if response.status_code != 200:
+                            raise CommandError(f'{url} returned {response.status_code}: {response.content[:200]!r}')
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{name:>6}: {count / elapsed:>8,.1f} logins/s, '
+                    f'{elapsed / count * 1000:>7.2f} ms/login, '
+                    f'{len(queries) / count:.1f} queries/login'
+                )
+
+            self.stdout.write(f'django_session rows written: {Session.objects.count() - sessions_before}')
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Tokens deleted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if 'rest_framework_simplejwt.token_blacklist' not in settings.INSTALLED_APPS:
+            raise CommandError('The token blacklist is not enabled (JWT_ENABLE_BLACKLIST)')
+
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        batch_size = max(1, options['batch_size'])
+        cutoff = timezone.now()
+        deleted = 0
+        # Short transactions keep row locks brief on large tables
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    OutstandingToken.objects.filter(expires_at__lte=cutoff)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(pk__in=ids).delete()
+            deleted += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} refresh tokens expired before {cutoff:%Y-%m-%d %H:%M}'))
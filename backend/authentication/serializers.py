@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from tasks.models import TaskCounters
 from .models import User
 
 
@@ -74,25 +75,13 @@ class UserLoginSerializer(serializers.Serializer):
         password = attrs.get('password')
         
         if email and password:
-            # Try to authenticate using email
+            # Email is the USERNAME_FIELD, so one authenticate() call covers it
             user = authenticate(
                 request=self.context.get('request'),
                 username=email,
                 password=password
             )
             
-            if not user:
-                # Try to find user by email and authenticate with username
-                try:
-                    user_obj = User.objects.get(email=email)
-                    user = authenticate(
-                        request=self.context.get('request'),
-                        username=user_obj.username,
-                        password=password
-                    )
-                except User.DoesNotExist:
-                    pass
-            
             if not user:
                 raise serializers.ValidationError('Invalid email or password.')
             
@@ -126,13 +115,22 @@ class UserProfileSerializer(serializers.ModelSerializer):
         """
         Get total number of tasks for user
         """
-        return obj.tasks.count()
+        return self._get_counters(obj).total
     
     def get_completed_task_count(self, obj):
         """
         Get number of completed tasks for user
         """
-        return obj.tasks.filter(is_done=True).count()
+        return self._get_counters(obj).completed
+    
+    def _get_counters(self, obj):
+        """
+        Load the user's TaskCounters row once per serialized object
+        """
+        cache = self.__dict__.setdefault('_counters_cache', {})
+        if obj.pk not in cache:
+            cache[obj.pk] = TaskCounters.objects.for_user(obj)
+        return cache[obj.pk]
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -158,8 +156,18 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         """
         user = self.instance
         if User.objects.filter(username=value).exclude(pk=user.pk).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
-        return value
+            raise serializers.ValidationError("A user with this username already exists.")
+        return value
+
+    def update(self, instance, validated_data):
+        """
+        Write only the submitted fields: the instance may be a cached copy
+        of the user (see authentication.authentication.user_cache)
+        """
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
 
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -197,5 +205,5 @@ class ChangePasswordSerializer(serializers.Serializer):
         """
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         return user
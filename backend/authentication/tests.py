@@ -1,3 +1,284 @@
-from django.test import TestCase
-
-# Create your tests here.
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hashers_by_algorithm, make_password
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from todo_project.middleware import CompressionMiddleware
+
+from .authentication import UserCache
+from .denylist import BloomFilter, denylist
+from .google_tokens import CachedRequest, cache_lifetime
+from .hashers import HashingPool, PooledArgon2PasswordHasher, PooledPBKDF2PasswordHasher
+from .tokens import BLACKLIST_ENABLED, DenylistRefreshToken
+from .views import allocate_username
+
+User = get_user_model()
+
+
+class PooledHasherTests(SimpleTestCase):
+    """
+    Password hashing goes through the bounded pool
+    """
+
+    def test_every_algorithm_verifies_on_the_pool(self):
+        # The last hasher per algorithm wins, so no plain duplicate may follow
+        hashers = get_hashers_by_algorithm()
+        self.assertIsInstance(hashers['pbkdf2_sha256'], PooledPBKDF2PasswordHasher)
+        self.assertIsInstance(hashers['argon2'], PooledArgon2PasswordHasher)
+
+    def test_round_trip(self):
+        encoded = make_password('correct horse')
+        self.assertTrue(check_password('correct horse', encoded))
+        self.assertFalse(check_password('wrong horse', encoded))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE_SIZE=0)
+    def test_rejects_callers_beyond_the_queue(self):
+        pool = HashingPool()
+        release = threading.Event()
+        worker = threading.Thread(target=pool.run, args=('verify', release.wait))
+        worker.start()
+        try:
+            deadline = time.monotonic() + 5
+            while pool._admitted == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            with self.assertRaises(Throttled) as raised:
+                pool.run('verify', lambda: None)
+            self.assertGreaterEqual(raised.exception.wait, 1)
+        finally:
+            release.set()
+            worker.join()
+        self.assertIsNone(pool.run('verify', lambda: None))
+
+
+class AuthCompressionTests(SimpleTestCase):
+    """
+    Auth responses (tokens next to echoed input) are never compressed
+    """
+
+    def get(self, path):
+        middleware = CompressionMiddleware(lambda request: HttpResponse('{"access": "token"}' * 100))
+        return middleware(RequestFactory().get(path, HTTP_ACCEPT_ENCODING='gzip'))
+
+    def test_auth_responses_are_not_compressed(self):
+        response = self.get('/api/auth/login/')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_other_responses_are_compressed(self):
+        response = self.get('/api/tasks/')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class BloomFilterTests(SimpleTestCase):
+    """
+    The denylist filter never misses an added JTI
+    """
+
+    def test_contains_every_added_item(self):
+        bloom = BloomFilter(1000, 0.001)
+        jtis = [f'jti-{i}' for i in range(1000)]
+        for jti in jtis:
+            bloom.add(jti)
+        self.assertTrue(all(jti in bloom for jti in jtis))
+        self.assertEqual(bloom.count, 1000)
+
+    def test_false_positives_stay_near_the_error_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class CacheLifetimeTests(SimpleTestCase):
+    """
+    Google certs responses are cached as long as their headers allow
+    """
+
+    def test_headers(self):
+        cases = [
+            ({}, 0),
+            ({'Cache-Control': 'public, max-age=600'}, 600),
+            ({'Cache-Control': 'public, max-age="600"', 'Age': '100'}, 500),
+            ({'Cache-Control': 'max-age=60', 'Age': '120'}, 0),
+            ({'Cache-Control': 'max-age=60', 'Age': 'soon'}, 60),
+            ({'Cache-Control': 'no-store, max-age=600'}, 0),
+            ({'Cache-Control': 'private, max-age=600'}, 0),
+            ({'Expires': 'not a date'}, 0),
+            ({'Expires': http_date(time.time() - 60)}, 0),
+        ]
+        for headers, lifetime in cases:
+            with self.subTest(headers=headers):
+                self.assertEqual(cache_lifetime(headers), lifetime)
+
+    def test_expires(self):
+        self.assertAlmostEqual(cache_lifetime({'Expires': http_date(time.time() + 3600)}), 3600, delta=2)
+
+    def test_cached_request_reuses_fresh_responses(self):
+        upstream = mock.Mock(return_value=mock.Mock(status=200, headers={'Cache-Control': 'max-age=60'}, data=b'{}'))
+        request = CachedRequest()
+        with mock.patch.object(request, '_get_request', return_value=upstream):
+            self.assertEqual(request('https://certs.example.com').data, b'{}')
+            self.assertEqual(request('https://certs.example.com').data, b'{}')
+            self.assertEqual(upstream.call_count, 1)
+            upstream.return_value.headers = {'Cache-Control': 'no-cache'}
+            request.clear()
+            request('https://certs.example.com')
+            request('https://certs.example.com')
+            self.assertEqual(upstream.call_count, 3)
+
+
+class AllocateUsernameTests(TestCase):
+    """
+    Google sign-up picks the email's local part, or it with the lowest free suffix
+    """
+
+    def create(self, username):
+        User.objects.create(email=f'{username}@example.com', username=username)
+
+    def test_free_base(self):
+        self.create('alice1')
+        self.assertEqual(allocate_username('alice'), 'alice')
+
+    def test_lowest_free_suffix(self):
+        for username in ('alice', 'alice1', 'alice3', 'alice01', 'alicex', 'alice2b'):
+            self.create(username)
+        self.assertEqual(allocate_username('alice'), 'alice2')
+
+    def test_single_query(self):
+        self.create('bob')
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_username('bob'), 'bob1')
+
+class StatelessLoginTests(APITestCase):
+    """
+    Logging in issues tokens only: no session row, but last_login is kept
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='alice@example.com', password='pass12345', username='alice',
+            first_name='Alice', last_name='User',
+        )
+
+    def login(self, password):
+        return self.client.post(
+            reverse('authentication:login'),
+            {'email': 'alice@example.com', 'password': password},
+            format='json',
+        )
+
+    def test_login_writes_no_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.login('pass12345')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data['tokens'])
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_failed_login_leaves_last_login(self):
+        self.assertEqual(self.login('wrong-password').status_code, 400)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+@skipUnless(BLACKLIST_ENABLED, 'token_blacklist app not installed (JWT_ENABLE_BLACKLIST)')
+class DenylistRefreshTokenTests(TestCase):
+    """
+    Blacklisting goes through the per-process denylist
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='alice@example.com', password='pass12345', username='alice',
+            first_name='Alice', last_name='User',
+        )
+        denylist.sync(force=True)
+
+    def test_blacklist_returns_token_and_created(self):
+        token = DenylistRefreshToken.for_user(self.user)
+        blacklisted, created = token.blacklist()
+        self.assertTrue(created)
+        self.assertEqual(blacklisted.token.jti, token['jti'])
+        again, created = token.blacklist()
+        self.assertFalse(created)
+        self.assertEqual(again.pk, blacklisted.pk)
+
+    def test_blacklisted_token_is_rejected(self):
+        token = DenylistRefreshToken.for_user(self.user)
+        token.blacklist()
+        with self.assertRaises(TokenError):
+            DenylistRefreshToken(str(token))
+
+    def test_unrevoked_token_is_checked_without_queries(self):
+        token = DenylistRefreshToken.for_user(self.user)
+        with self.assertNumQueries(0):
+            DenylistRefreshToken(str(token))
+
+
+@override_settings(JWT_USER_CACHE_SIZE=2, JWT_USER_CACHE_TTL=300, JWT_USER_ACTIVE_RECHECK=30)
+class UserCacheTests(TestCase):
+    """
+    JWT users are served from the per-process cache
+    """
+
+    def setUp(self):
+        self.cache = UserCache()
+        self.users = [
+            User.objects.create_user(
+                email=f'user{i}@example.com', password='pass12345', username=f'user{i}',
+                first_name='Test', last_name='User',
+            )
+            for i in range(3)
+        ]
+        self.user = self.users[0]
+
+    def test_hit_needs_no_query(self):
+        self.cache.get(User, self.user.pk)
+        with self.assertNumQueries(0):
+            cached = self.cache.get(User, self.user.pk)
+        self.assertEqual(cached.pk, self.user.pk)
+        cached.first_name = 'Changed'
+        self.assertEqual(self.cache.get(User, self.user.pk).first_name, 'Test')
+
+    def test_deactivated_user_is_rejected_after_recheck(self):
+        self.cache.get(User, self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNotNone(self.cache.get(User, self.user.pk))
+        with mock.patch('authentication.authentication.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertIsNone(self.cache.get(User, self.user.pk))
+
+    def test_change_in_another_process_reloads_after_recheck(self):
+        self.cache.get(User, self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(first_name='Renamed', password=make_password('new secret'))
+        self.assertEqual(self.cache.get(User, self.user.pk).first_name, 'Test')
+        with mock.patch('authentication.authentication.time.monotonic', return_value=time.monotonic() + 31):
+            user = self.cache.get(User, self.user.pk)
+        self.assertEqual(user.first_name, 'Renamed')
+        self.assertTrue(user.check_password('new secret'))
+
+    def test_invalidate_reloads(self):
+        self.cache.get(User, self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+        self.cache.invalidate(self.user.pk)
+        self.assertEqual(self.cache.get(User, self.user.pk).first_name, 'Renamed')
+
+    def test_least_recently_used_is_evicted(self):
+        for user in self.users:
+            self.cache.get(User, user.pk)
+        with self.assertNumQueries(1):
+            self.cache.get(User, self.users[0].pk)
+        with self.assertNumQueries(0):
+            self.cache.get(User, self.users[2].pk)
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .authentication import user_cache
+from .denylist import denylist
+
+BLACKLIST_ENABLED = 'rest_framework_simplejwt.token_blacklist' in settings.INSTALLED_APPS
+
+if BLACKLIST_ENABLED:
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class DenylistRefreshToken(RefreshToken):
+    """
+    RefreshToken checked against the in-process JTI denylist before the
+    token_blacklist tables, with single-statement blacklist and
+    outstanding-token writes
+    """
+
+    if BLACKLIST_ENABLED:
+
+        def check_blacklist(self):
+            if denylist.might_contain(self.payload[api_settings.JTI_CLAIM]):
+                super().check_blacklist()
+
+        def blacklist(self):
+            jti = self.payload[api_settings.JTI_CLAIM]
+            token_id = OutstandingToken.objects.filter(jti=jti).values_list('pk', flat=True).first()
+            if token_id is None:
+                # Issued before outstanding tokens were recorded
+                result = super().blacklist()
+            else:
+                # (token, created) like super(), with one INSERT in the usual case
+                try:
+                    with transaction.atomic():
+                        result = BlacklistedToken.objects.create(token_id=token_id), True
+                except IntegrityError:
+                    result = BlacklistedToken.objects.get(token_id=token_id), False
+            denylist.add(jti)
+            return result
+
+        def outstand(self):
+            OutstandingToken.objects.bulk_create(
+                [OutstandingToken(
+                    user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+                    jti=self.payload[api_settings.JTI_CLAIM],
+                    token=str(self),
+                    created_at=self.current_time,
+                    expires_at=datetime_from_epoch(self.payload['exp']),
+                )],
+                ignore_conflicts=True,
+            )
+
+
+class DenylistTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer using DenylistRefreshToken, with the user's
+    active check served from the authentication user cache
+    """
+    token_class = DenylistRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        if user_id:
+            User = get_user_model()
+            user = user_cache.get(User, User._meta.pk.to_python(user_id))
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(
+                    self.error_messages['no_active_account'],
+                    'no_active_account',
+                )
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Blacklist app not installed
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data['refresh'] = str(refresh)
+
+        return data
@@ -2,12 +2,15 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.contrib.auth import login
-from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.contrib.auth.models import update_last_login
+from django.db import transaction
+from tasks.models import Task, TaskCounters, TaskTombstone
+from .authentication import user_cache
 from .models import User
+from .tokens import DenylistRefreshToken
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
@@ -16,19 +19,15 @@ from .serializers import (
     ChangePasswordSerializer
 )
 from decouple import config
-try:
-    # Optional google auth (installed if GOOGLE_CLIENT_ID configured)
-    from google.oauth2 import id_token as google_id_token
-    from google.auth.transport import requests as google_requests
-except Exception:  # pragma: no cover
-    google_id_token = None
-    google_requests = None
+from . import google_tokens
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom JWT token serializer to include user data
     """
+    token_class = DenylistRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -41,16 +40,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
     
     def validate(self, attrs):
-        # Use email as username for authentication
-        email = attrs.get('username')  # DRF uses 'username' field
-        password = attrs.get('password')
-        
-        try:
-            user = User.objects.get(email=email)
-            attrs['username'] = user.username
-        except User.DoesNotExist:
-            pass
-        
+        # The credential field is User.USERNAME_FIELD (email)
         data = super().validate(attrs)
         
         # Add user data to response
@@ -81,7 +71,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate tokens for the new user
-        refresh = RefreshToken.for_user(user)
+        refresh = DenylistRefreshToken.for_user(user)
         
         # Get user profile data
         user_serializer = UserProfileSerializer(user)
@@ -110,10 +100,12 @@ class LoginView(APIView):
         serializer.is_valid(raise_exception=True)
         
         user = serializer.validated_data['user']
-        login(request, user)
+        # Token-only login: no session is created (see STATELESS_API)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
         
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = DenylistRefreshToken.for_user(user)
         
         # Get user profile data
         user_serializer = UserProfileSerializer(user)
@@ -139,7 +131,7 @@ class LogoutView(APIView):
         if refresh_token:
             # Best-effort blacklist: ignore errors in environments without blacklist app
             try:
-                token = RefreshToken(refresh_token)
+                token = DenylistRefreshToken(refresh_token)
                 try:
                     token.blacklist()
                 except Exception:
@@ -173,7 +165,14 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        full_name = instance.get_full_name()
+        with transaction.atomic():
+            self.perform_update(serializer)
+            # Task responses embed the user's name
+            if instance.get_full_name() != full_name:
+                TaskTombstone.objects.touch(Task.objects.filter(user_id=instance.pk))
+            TaskCounters.objects.bump_version(instance.pk)
+        user_cache.invalidate(instance.pk)
         
         # Return updated profile data
         profile_serializer = UserProfileSerializer(instance)
@@ -196,6 +195,7 @@ class ChangePasswordView(APIView):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        user_cache.invalidate(request.user.pk)
         
         return Response({
             'message': 'Password changed successfully'
@@ -214,7 +214,7 @@ class DeleteAccountView(APIView):
         refresh_token = request.data.get('refresh_token')
         if refresh_token:
             try:
-                token = RefreshToken(refresh_token)
+                token = DenylistRefreshToken(refresh_token)
                 try:
                     token.blacklist()
                 except Exception:
@@ -222,7 +222,9 @@ class DeleteAccountView(APIView):
             except Exception:
                 pass
         email = user.email
+        user_id = user.pk
         user.delete()
+        user_cache.invalidate(user_id)
         return Response({'message': f'Account {email} deleted'}, status=status.HTTP_200_OK)
 
 
@@ -240,47 +242,32 @@ class GoogleLoginView(APIView):
             return Response({'error': 'id_token_missing'}, status=status.HTTP_400_BAD_REQUEST)
         if not client_id:
             return Response({'error': 'client_id_missing'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        # Try a late import in case the module became available after startup
-        _id_token = google_id_token
-        _requests = google_requests
-        if _id_token is None or _requests is None:
-            try:
-                from google.oauth2 import id_token as _id_token  # type: ignore
-                from google.auth.transport import requests as _requests  # type: ignore
-            except Exception as e:
-                return Response({'error': 'google_auth_library_missing', 'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        # Ensure underlying 'requests' package is available for transport
-        try:
-            import requests as _py_requests  # noqa: F401
-        except Exception as e:
-            return Response({'error': 'requests_library_missing', 'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        # google-auth (and requests, its transport) are optional dependencies
+        if google_tokens.google_requests is None:
+            return Response({'error': 'google_auth_library_missing'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
         try:
-            idinfo = _id_token.verify_oauth2_token(id_tok, _requests.Request(), client_id)
-            if idinfo.get('iss') not in ['accounts.google.com', 'https://accounts.google.com']:
-                raise ValueError('Wrong issuer')
+            # Signing certs are cached per process (see google_tokens)
+            idinfo = google_tokens.verify_google_id_token(id_tok, client_id)
             email = idinfo.get('email')
             if not email:
                 return Response({'error': 'Email missing'}, status=status.HTTP_400_BAD_REQUEST)
             first_name = (idinfo.get('given_name') or '').strip() or 'User'
             last_name = (idinfo.get('family_name') or '').strip() or 'Google'
-            username_base = email.split('@')[0]
-            username = username_base
-            # Ensure unique username
-            suffix = 1
-            while User.objects.filter(username=username).exclude(email=email).exists():
-                username = f"{username_base}{suffix}"
-                suffix += 1
-
             user, created = User.objects.get_or_create(
                 email=email,
-                defaults={'first_name': first_name, 'last_name': last_name, 'username': username}
+                defaults={
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    # Only evaluated when the user is created
+                    'username': lambda: allocate_username(email.split('@')[0]),
+                }
             )
             if created and not user.has_usable_password():
                 user.set_unusable_password()
                 user.save()
 
-            refresh = RefreshToken.for_user(user)
+            refresh = DenylistRefreshToken.for_user(user)
             user_serializer = UserProfileSerializer(user)
             return Response({
                 'message': 'Login successful',
@@ -294,27 +281,40 @@ class GoogleLoginView(APIView):
             return Response({'error': 'Invalid Google token', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def allocate_username(base):
+    """
+    `base`, or `base` followed by the lowest free numeric suffix (1, 2, ...),
+    found with a single prefix query
+    """
+    taken = set()
+    for username in User.objects.filter(username__startswith=base).values_list('username', flat=True):
+        suffix = username[len(base):]
+        if suffix == '':
+            taken.add(0)
+        elif suffix.isascii() and suffix.isdigit() and not suffix.startswith('0'):
+            taken.add(int(suffix))
+    if 0 not in taken:
+        return base
+    suffix = 1
+    while suffix in taken:
+        suffix += 1
+    return f"{base}{suffix}"
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_stats(request):
     """
     Get user statistics
     """
-    user = request.user
-    total_tasks = user.tasks.count()
-    completed_tasks = user.tasks.filter(is_done=True).count()
-    pending_tasks = total_tasks - completed_tasks
-    overdue_tasks = user.tasks.filter(
-        deadline__lt=timezone.now(),
-        is_done=False
-    ).count()
+    counters = TaskCounters.objects.for_user(request.user)
     
     return Response({
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'overdue_tasks': overdue_tasks,
-        'completion_rate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2)
+        'total_tasks': counters.total,
+        'completed_tasks': counters.completed,
+        'pending_tasks': counters.pending,
+        'overdue_tasks': counters.get_overdue_count(),
+        'completion_rate': counters.completion_rate
     })
 
 
@@ -0,0 +1,22 @@
+"""
+Production server configuration, read by `gunicorn` started from this
+directory: the ASGI application on uvicorn workers, so requests waiting on
+the AI provider (tasks.async_views) don't hold a worker each.
+
+Settings come from the environment or .env, like the Django settings.
+"""
+from decouple import config
+
+wsgi_app = 'todo_project.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+# One event loop per worker; a few workers per host are enough
+workers = config('GUNICORN_WORKERS', default=2, cast=int)
+# Must outlast the longest assist request (AI_ASSIST_DEADLINE) and stream
+timeout = config('GUNICORN_TIMEOUT', default=120, cast=int)
+graceful_timeout = config('GUNICORN_GRACEFUL_TIMEOUT', default=60, cast=int)
+keepalive = config('GUNICORN_KEEPALIVE', default=5, cast=int)
+max_requests = config('GUNICORN_MAX_REQUESTS', default=0, cast=int)
+max_requests_jitter = config('GUNICORN_MAX_REQUESTS_JITTER', default=0, cast=int)
+accesslog = config('GUNICORN_ACCESS_LOG', default='-')
@@ -1,18 +1,110 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower
 from django.utils.html import format_html
+from todo_project.paginators import EstimatedCountPaginator
 from .models import Task, TaskCategory
 
 
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter rendered as a text box. Unlike the built-in related
+    filters it does not list every distinct value of the column, so the
+    sidebar costs no query however large the table is.
+    """
+    template = 'admin/input_filter.html'
+    placeholder = ''
+    
+    def lookups(self, request, model_admin):
+        return ()
+    
+    def has_output(self):
+        return True
+    
+    def choices(self, changelist):
+        # Keep the other filters, search and ordering when the box is submitted
+        self.hidden_params = [
+            (name, value)
+            for name, values in changelist.params.items()
+            if name not in (self.parameter_name, 'p')
+            for value in values
+        ]
+        if self.value() is not None:
+            yield {
+                'selected': False,
+                'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+                'display': 'Clear',
+            }
+
+
+class UserEmailFilter(InputFilter):
+    """
+    Filter by the exact email of the user, resolved through its unique index
+    """
+    parameter_name = 'user_email'
+    user_field = 'user'
+    title = 'user email'
+    placeholder = 'email@example.com'
+    
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        email = get_user_model().objects.normalize_email(value.strip())
+        return queryset.filter(**{f'{self.user_field}__email': email})
+
+
+class OwnerEmailFilter(UserEmailFilter):
+    parameter_name = 'owner_email'
+    user_field = 'owner'
+    title = 'owner email'
+
+
+class CategoryNameFilter(InputFilter):
+    """
+    Filter by category name (case-insensitive), matched on the
+    lower(name) unique indexes of task categories
+    """
+    parameter_name = 'category_name'
+    title = 'category name'
+    
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        categories = TaskCategory.objects.alias(
+            name_lower=Lower('name')
+        ).filter(name_lower=Lower(Value(value.strip()))).values('pk')
+        return queryset.filter(category__in=categories)
+
+
 @admin.register(TaskCategory)
 class TaskCategoryAdmin(admin.ModelAdmin):
     """
     Admin interface for TaskCategory model
     """
     list_display = ('name', 'colored_name', 'owner', 'task_count', 'created_at')
-    list_filter = ('created_at', 'owner')
+    list_filter = ('created_at', OwnerEmailFilter)
+    list_select_related = ('owner',)
     search_fields = ('name', 'description')
     ordering = ('name',)
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('owner',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    
+    def get_queryset(self, request):
+        """
+        Count tasks in a correlated subquery, evaluated for the displayed page only
+        """
+        task_count = Task.objects.filter(
+            category=OuterRef('pk')
+        ).order_by().values('category').annotate(count=Count('pk')).values('count')
+        return super().get_queryset(request).annotate(
+            task_count=Coalesce(Subquery(task_count), 0)
+        )
     
     def colored_name(self, obj):
         """
@@ -29,7 +121,7 @@ class TaskCategoryAdmin(admin.ModelAdmin):
         """
         Display number of tasks in this category
         """
-        return obj.tasks.count()
+        return obj.task_count
     task_count.short_description = 'Tasks'
 
 
@@ -42,14 +134,20 @@ class TaskAdmin(admin.ModelAdmin):
         'title', 'user', 'is_done', 'priority', 'category', 
         'deadline', 'created_at', 'is_overdue'
     )
+    # No date_hierarchy and no related-object filters: both scan the whole
+    # table to build their choices
     list_filter = (
-        'is_done', 'priority', 'category', 'created_at', 
-        'deadline', 'user__is_active'
+        'is_done', 'priority', 'created_at', 'deadline',
+        UserEmailFilter, CategoryNameFilter
     )
+    list_select_related = ('user', 'category')
     search_fields = ('title', 'description', 'user__email', 'user__first_name', 'user__last_name')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at', 'completed_at', 'is_overdue')
-    date_hierarchy = 'created_at'
+    autocomplete_fields = ('user', 'category')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
     
     fieldsets = (
         ('Task Information', {
@@ -78,6 +176,12 @@ class TaskAdmin(admin.ModelAdmin):
             return format_html('<span style="color: gray;">No deadline</span>')
     is_overdue.short_description = 'Status'
     
+    def delete_queryset(self, request, queryset):
+        """
+        Bulk delete through tracked_delete() to keep task counters in sync
+        """
+        queryset.tracked_delete()
+    
     def save_model(self, request, obj, form, change):
         """
         Set user to current user if not specified
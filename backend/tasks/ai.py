@@ -0,0 +1,375 @@
+"""
+LLM provider configuration and a process-wide registry of API clients.
+
+ai_assist used to construct a new OpenAI client (and with it a new
+connection pool, so a new TCP/TLS handshake) for every provider call.
+get_client() returns one client per (base_url, api_key) and process,
+backed by a pooled HTTP client with keep-alive and, when the h2 package
+is installed, HTTP/2. Timeouts are set per call (see AI_ANSWER_TIMEOUT
+and AI_PLAN_TIMEOUT).
+
+call_pool runs the independent provider calls of one assist request (the
+answer and the action plan) concurrently under a shared deadline.
+get_async_client() and gather_calls() are the asyncio counterparts used by
+tasks.async_views.
+"""
+import asyncio
+import os
+import weakref
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from importlib import import_module
+from importlib.util import find_spec
+
+from decouple import config
+from django.conf import settings
+from todo_project.metrics import metrics
+
+try:
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+    # httpx, or httpx2 in newer openai releases: whichever the SDK's client is built on
+    httpx = import_module(DefaultHttpxClient.__mro__[1].__module__.split('.')[0])
+except Exception:  # pragma: no cover
+    AsyncOpenAI = None
+    DefaultAsyncHttpxClient = None
+    DefaultHttpxClient = None
+    OpenAI = None
+    httpx = None
+
+
+OPENROUTER_BASE_URL = 'https://openrouter.ai/api/v1'
+
+
+class AIProvider:
+    """
+    Provider settings read once per process from the environment
+    """
+
+    def __init__(self, api_key, base_url, model, source, max_tokens, extra_headers):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.source = source
+        self.max_tokens = max_tokens
+        self.extra_headers = extra_headers
+
+    @classmethod
+    def from_env(cls):
+        api_key = config('OPENAI_API_KEY', default=None)
+        if not api_key:
+            return None
+        # Auto-detect OpenRouter key and set base URL if needed
+        is_openrouter_key = api_key.startswith('sk-or-')
+        base_url = config('OPENAI_BASE_URL', default=None) or (OPENROUTER_BASE_URL if is_openrouter_key else None)
+
+        # Normalize model id: OpenRouter expects vendor prefix (e.g. "openai/gpt-4o-mini")
+        model = config('OPENAI_MODEL', default='gpt-4o-mini')
+        if is_openrouter_key and '/' not in model:
+            model = f'openai/{model}'
+
+        try:
+            max_tokens = config('OPENAI_MAX_TOKENS', default=512, cast=int)
+        except Exception:
+            max_tokens = 512
+
+        # Optional OpenRouter ranking headers
+        extra_headers = {}
+        referer = config('AI_REFERER', default=None)
+        site_title = config('AI_TITLE', default=None)
+        if referer:
+            extra_headers['HTTP-Referer'] = referer
+        if site_title:
+            extra_headers['X-Title'] = site_title
+
+        return cls(
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            source='openrouter' if is_openrouter_key else 'openai',
+            max_tokens=max(32, min(max_tokens, 4096)),
+            extra_headers=extra_headers,
+        )
+
+    def request_options(self, timeout):
+        """
+        Keyword arguments shared by every completion call
+        """
+        options = {'timeout': timeout}
+        if self.extra_headers:
+            options['extra_headers'] = self.extra_headers
+        return options
+
+
+_provider_lock = threading.Lock()
+_provider = None
+_provider_loaded = False
+
+
+def get_provider():
+    """
+    The configured provider, or None when no API key is set or the
+    openai package is missing
+    """
+    global _provider, _provider_loaded
+    if OpenAI is None:
+        return None
+    if not _provider_loaded:
+        with _provider_lock:
+            if not _provider_loaded:
+                _provider = AIProvider.from_env()
+                _provider_loaded = True
+    return _provider
+
+
+def reset_provider():
+    """
+    Forget the cached provider, e.g. after the environment changed
+    """
+    global _provider, _provider_loaded
+    with _provider_lock:
+        _provider = None
+        _provider_loaded = False
+
+
+class ClientRegistry:
+    """
+    One API client per (base_url, api_key), recreated after a fork
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def get(self, base_url, api_key):
+        key = (base_url, api_key)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Pooled connections must not be shared with the parent process
+                self._clients = {}
+                self._pid = os.getpid()
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self._factory(base_url, api_key)
+            return client
+
+    def clear(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+def http_client_options():
+    """
+    Connection pool settings for the provider's HTTP client
+    """
+    return {
+        'http2': find_spec('h2') is not None,
+        # Default for calls made without their own timeout
+        'timeout': httpx.Timeout(
+            max(getattr(settings, 'AI_ANSWER_TIMEOUT', 30), getattr(settings, 'AI_PLAN_TIMEOUT', 30)),
+            connect=getattr(settings, 'AI_CONNECT_TIMEOUT', 5),
+        ),
+        'limits': httpx.Limits(
+            max_connections=getattr(settings, 'AI_HTTP_MAX_CONNECTIONS', 100),
+            max_keepalive_connections=getattr(settings, 'AI_HTTP_MAX_KEEPALIVE', 20),
+            keepalive_expiry=getattr(settings, 'AI_HTTP_KEEPALIVE_EXPIRY', 120),
+        ),
+    }
+
+
+def _create_client(base_url, api_key):
+    options = {
+        'api_key': api_key,
+        'max_retries': getattr(settings, 'AI_MAX_RETRIES', 2),
+    }
+    if base_url:
+        options['base_url'] = base_url
+    if httpx is not None:
+        options['http_client'] = DefaultHttpxClient(**http_client_options())
+    return OpenAI(**options)
+
+
+clients = ClientRegistry(_create_client)
+
+
+def get_client(provider):
+    return clients.get(provider.base_url, provider.api_key)
+
+
+class AsyncClientRegistry:
+    """
+    One async API client per (base_url, api_key) and event loop: its
+    connections belong to the loop that opened them. Clients of a closed
+    loop are dropped with it.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get(self, base_url, api_key):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get((base_url, api_key))
+            if client is None:
+                client = clients[(base_url, api_key)] = self._factory(base_url, api_key)
+            return client
+
+
+def _create_async_client(base_url, api_key):
+    options = {
+        'api_key': api_key,
+        'max_retries': getattr(settings, 'AI_MAX_RETRIES', 2),
+    }
+    if base_url:
+        options['base_url'] = base_url
+    if httpx is not None:
+        options['http_client'] = DefaultAsyncHttpxClient(**http_client_options())
+    return AsyncOpenAI(**options)
+
+
+async_clients = AsyncClientRegistry(_create_async_client)
+
+
+def get_async_client(provider):
+    return async_clients.get(provider.base_url, provider.api_key)
+
+
+async def _timed_acall(name, func, deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f'{name}: assist deadline exceeded before the call started')
+    started = time.perf_counter()
+    try:
+        return await func(remaining)
+    finally:
+        metrics.observe('ai.call_seconds', time.perf_counter() - started, call=name)
+
+
+async def gather_calls(calls, timeout):
+    """
+    Await each coroutine function func(remaining_seconds) in `calls`
+    ({name: func}) concurrently and return {name: result}. The calls share
+    one deadline; when one fails or the deadline passes the others are
+    cancelled, requests in flight included, and the error is raised.
+    """
+    deadline = time.monotonic() + timeout
+    tasks = {name: asyncio.ensure_future(_timed_acall(name, func, deadline)) for name, func in calls.items()}
+    if not tasks:
+        return {}
+    try:
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # Also reached when the request itself is cancelled (client disconnect)
+        for task in tasks.values():
+            task.cancel()
+    errors = [task.exception() for task in done if not task.cancelled() and task.exception() is not None]
+    if errors:
+        raise errors[0]
+    for name, task in tasks.items():
+        if task in pending:
+            raise TimeoutError(f'{name}: assist deadline exceeded')
+    return {name: task.result() for name, task in tasks.items()}
+
+
+def _timed_call(name, func, deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f'{name}: assist deadline exceeded before the call started')
+    started = time.perf_counter()
+    try:
+        return func(remaining)
+    finally:
+        metrics.observe('ai.call_seconds', time.perf_counter() - started, call=name)
+
+
+class CallGroup:
+    """
+    Provider calls started together by CallPool.submit()
+    """
+
+    def __init__(self, futures, deadline):
+        self._futures = futures
+        self._deadline = deadline
+
+    def results(self):
+        """
+        Wait for {name: result}. When a call fails or the deadline passes,
+        calls that have not started yet are cancelled and the error is
+        raised. A call already in flight cannot be interrupted: its result
+        is discarded and its own timeout (never past the deadline) bounds it.
+        """
+        done, pending = wait(
+            self._futures.values(),
+            timeout=max(0, self._deadline - time.monotonic()),
+            return_when=FIRST_EXCEPTION,
+        )
+        for future in pending:
+            future.cancel()
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+        for name, future in self._futures.items():
+            if future in pending:
+                raise TimeoutError(f'{name}: assist deadline exceeded')
+        return {name: future.result() for name, future in self._futures.items()}
+
+    def cancel(self):
+        for future in self._futures.values():
+            future.cancel()
+
+
+class CallPool:
+    """
+    Bounded per-process thread pool for concurrent provider calls
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Created lazily and again after a fork: worker threads do not survive it
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, getattr(settings, 'AI_CALL_WORKERS', 32)),
+                    thread_name_prefix='ai-call',
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, calls, timeout):
+        """
+        Start each func(remaining_seconds) in `calls` ({name: func}) on the
+        pool under a shared deadline `timeout` seconds away
+        """
+        deadline = time.monotonic() + timeout
+        executor = self._get_executor()
+        return CallGroup(
+            {name: executor.submit(_timed_call, name, func, deadline) for name, func in calls.items()},
+            deadline,
+        )
+
+    def run(self, calls, timeout):
+        """
+        Run `calls` concurrently and return {name: result} (see CallGroup)
+        """
+        if len(calls) == 1:
+            # Nothing to overlap with: stay on the request thread
+            (name, func), = calls.items()
+            return {name: _timed_call(name, func, time.monotonic() + timeout)}
+        return self.submit(calls, timeout).results()
+
+
+call_pool = CallPool()
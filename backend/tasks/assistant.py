@@ -0,0 +1,549 @@
+"""
+Request-independent parts of the AI assistant, shared by the sync views
+(tasks.views) and their async counterparts (tasks.async_views): the chat
+and task queries, prompts, plan parsing, the deterministic replies and the
+execution of a confirmed plan. Database work is kept in a few sync
+functions, which the async views run on their database threads.
+"""
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import intents
+from .models import ChatMessage, ChatSession, Task, TaskCategory
+
+
+# Chat sessions kept per user
+CHAT_RETENTION = 15
+
+SYSTEM_PROMPT = (
+    "Ты — помощник по планированию задач. Отвечай по-русски."
+    "Учитывай ТОЛЬКО задачи текущего пользователя, которые даются в контексте. "
+    "Не повторяй обратно список задач, если тебя об этом явно не попросили. "
+    "Никогда не утверждай, что уже выполнил какие‑либо изменения. Если пользователь просит создать/обновить/удалить — кратко подтверди намерение и жди подтверждения."
+)
+
+# Limits per request
+MAX_NEW_CATEGORIES = 5
+MAX_NEW_TASKS = 20
+
+
+def empty_plan():
+    return {"categories": [], "tasks": []}
+
+
+def schema_prompt(confirm):
+    return (
+        "Ты парсер намерений для приложения задач. Верни ТОЛЬКО JSON. "
+        "Схема: {\"categories\":[], \"tasks\":[], \"update_categories\":[], \"update_tasks\":[], \"delete_categories\":[], \"delete_tasks\":[]} "
+        "categories: [{name, color?, description?}] — создать; "
+        "tasks: [{title, description?, priority?, deadline?, category?}] — создать; "
+        "update_categories: [{name, new_name?, color?, description?}]; "
+        "update_tasks: [{id?|title, title?, description?, priority?, deadline?, category?, is_done?}]; "
+        "delete_categories: [{name}]; delete_tasks: [{id?|title}]. "
+        + ("deadline по возможности ISO8601 (например 2025-09-05T18:00:00Z)." if confirm else "deadline по возможности ISO8601.")
+    )
+
+
+def open_chat(user, chat_id, user_message):
+    """
+    Continue the user's chat `chat_id` (or start a new one) and save
+    `user_message`. Returns (session, prompt content, chat history), or
+    None if `chat_id` is not one of the user's chats.
+    """
+    if chat_id:
+        try:
+            session = ChatSession.objects.get(id=chat_id, user=user)
+        except ChatSession.DoesNotExist:
+            return None
+    else:
+        # Create new chat session, keep only the last CHAT_RETENTION sessions
+        title = (user_message[:100] + '...') if len(user_message) > 100 else user_message
+        session = ChatSession.objects.create(user=user, title=title or 'Новый диалог')
+        ids_to_keep = list(ChatSession.objects.filter(user=user).order_by('-updated_at').values_list('id', flat=True)[:CHAT_RETENTION])
+        ChatSession.objects.filter(user=user).exclude(id__in=ids_to_keep).delete()
+
+    # Save user message (only for regular prompts)
+    if user_message:
+        ChatMessage.objects.create(session=session, role='user', content=user_message)
+
+    # Collect a concise snapshot of user's tasks
+    tasks_qs = Task.objects.filter(user=user).select_related('category')
+    pending = tasks_qs.filter(is_done=False).values('id', 'title', 'priority', 'deadline', 'category__name')[:50]
+    completed = tasks_qs.filter(is_done=True).values('id', 'title', 'priority', 'completed_at', 'category__name')[:20]
+    content = format_context(tasks_qs.count(), list(pending), list(completed), user_message)
+
+    # Build chat history for the model (last 10 pairs to keep short)
+    history = list(session.messages.order_by('-created_at').values('role', 'content')[:10])
+    history.reverse()
+    return session, content, history
+
+
+def format_context(total, pending, completed, user_message):
+    """
+    User prompt with a concise snapshot of the user's tasks
+    """
+    def fmt_task(t):
+        return f"- [{t.get('category__name') or 'Без категории'}] {t['title']} (приоритет: {t.get('priority') or '-'}, дедлайн: {t.get('deadline') or '-'})"
+    def fmt_completed(t):
+        return f"- [{t.get('category__name') or 'Без категории'}] {t['title']} (выполнено)"
+
+    snapshot = "\n".join([fmt_task(t) for t in pending])
+    snapshot_done = "\n".join([fmt_completed(t) for t in completed])
+    return (
+        f"Контекст — мои задачи (всего: {total}):\n"
+        f"Невыполненные (до 50):\n{snapshot or '- нет'}\n\n"
+        f"Выполненные (до 20):\n{snapshot_done or '- нет'}\n\n"
+        f"Вопрос: {user_message}"
+    )
+
+
+def answer_max_tokens(provider, data):
+    """
+    max_tokens with safe bounds (from env and optional request override)
+    """
+    env_cap = provider.max_tokens
+    req_cap = None
+    if isinstance(data, dict) and data.get('max_tokens') is not None:
+        try:
+            req_cap = int(data.get('max_tokens'))
+        except Exception:
+            req_cap = None
+    return env_cap if req_cap is None else max(32, min(req_cap, env_cap))
+
+
+def answer_request(model, history, content, max_tokens):
+    """
+    Arguments of the chat answer completion (history: oldest first)
+    """
+    return {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *[{"role": m['role'], "content": m['content']} for m in history],
+            {"role": "user", "content": content},
+        ],
+        'temperature': 0.2,
+        'max_tokens': max_tokens,
+    }
+
+
+def plan_request(model, content, confirm):
+    """
+    Arguments of the JSON action plan completion
+    """
+    return {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": schema_prompt(confirm)},
+            {"role": "user", "content": content},
+        ],
+        'temperature': 0,
+        'max_tokens': 768,
+    }
+
+
+def parse_plan(raw_json):
+    raw_json = (raw_json or "").strip()
+    try:
+        return json.loads(raw_json)
+    except Exception:
+        start = raw_json.find('{'); end = raw_json.rfind('}')
+        return json.loads(raw_json[start:end+1]) if (start != -1 and end != -1 and end > start) else empty_plan()
+
+
+def client_plan(data):
+    """
+    Plan sent back by the client with a confirm request, if any
+    """
+    if not data.get('actions'):
+        return None
+    try:
+        return data['actions'] if isinstance(data['actions'], dict) else json.loads(data['actions'])
+    except Exception:
+        return empty_plan()
+
+
+def plan_source(data, user_message):
+    """
+    Where the plan of an assist request comes from, decided without I/O:
+    (actions, command). `actions` is the plan sent back by the client with
+    a confirm request; otherwise `command` is the simple command to plan
+    with the rules (intents.command_plan), if the message is one.
+    """
+    if data.get('confirm'):
+        actions = client_plan(data)
+        if actions is not None:
+            return actions, None
+    return None, intents.match_command(user_message)
+
+
+def assist_calls(data, actions):
+    """
+    Provider calls an assist request needs, given the plan from the client
+    or the rules (None if neither has one): (calls, actions, executed).
+    `calls` names 'answer' and/or 'plan'. The reply to a confirm request
+    is always the execution summary, so it never needs an answer.
+    """
+    executed = bool(data.get('confirm'))
+    if actions is not None:
+        return (), actions, executed
+    return ('plan',) if executed else ('answer', 'plan'), empty_plan(), executed
+
+
+def record_round(calls, started):
+    """
+    Time of a provider round that answered a message (what answering
+    with the rules saves, see intents.FastPathStats)
+    """
+    if 'answer' in calls:
+        intents.stats.record_provider_round(time.perf_counter() - started)
+
+
+def unavailable_payload(provider=None, error=None):
+    """
+    Error payload when the provider can't be used. In DEBUG the error and
+    provider settings are included (no secrets) to speed up troubleshooting.
+    """
+    payload = {'error': 'Сервис ИИ пока что недоступен'}
+    if error is not None and getattr(settings, 'DEBUG', False):
+        payload['detail'] = str(error)
+        if provider is not None:
+            payload.update(model=provider.model, base_url=provider.base_url, provider=provider.source)
+    return payload
+
+def summarize_plan(a: dict) -> str:
+    """
+    Deterministic assistant reply for a prepared plan, to avoid misleading claims
+    """
+    c_c = len(a.get('categories') or [])
+    c_t = len(a.get('tasks') or [])
+    u_c = len(a.get('update_categories') or [])
+    u_t = len(a.get('update_tasks') or [])
+    d_c = len(a.get('delete_categories') or [])
+    d_t = len(a.get('delete_tasks') or [])
+    lines = ["Я подготовил план изменений:"]
+    if any([c_c, c_t]):
+        lines.append(f"- создать: категорий {c_c}, задач {c_t}")
+    if any([u_c, u_t]):
+        lines.append(f"- обновить: категорий {u_c}, задач {u_t}")
+    if any([d_c, d_t]):
+        lines.append(f"- удалить: категорий {d_c}, задач {d_t}")
+    lines.append("Нажмите Подтвердить, чтобы выполнить.")
+    return "\n".join(lines)
+
+
+def plan_has_actions(actions):
+    return any([
+        actions.get('categories'), actions.get('tasks'),
+        actions.get('update_categories'), actions.get('update_tasks'),
+        actions.get('delete_categories'), actions.get('delete_tasks')
+    ])
+
+
+def build_reply(provider, session, answer, actions, executed, created_summary):
+    """
+    (assistant message text, response payload)
+    """
+    has_actions = plan_has_actions(actions)
+
+    if not executed and has_actions:
+        answer = summarize_plan(actions)
+    elif executed:
+        if created_summary:
+            answer = "Изменения выполнены. " + "; ".join(created_summary)
+        else:
+            answer = "Изменения выполнены."
+
+    payload = {
+        'reply': (answer or '').rstrip(),
+        'source': provider.source,
+        'chat_id': session.id,
+        'requires_confirmation': (not executed and has_actions),
+        'executed': executed,
+    }
+    if not executed:
+        payload['plan'] = actions
+    if executed and created_summary:
+        payload['created'] = created_summary
+    return answer or '', payload
+
+
+# Helper normalization
+def save_reply(user, provider, session, answer, actions, executed):
+    """
+    Execute a confirmed plan, then save and return the reply payload
+    (see build_reply)
+    """
+    created_summary = execute_actions(user, actions) if executed else []
+    answer, payload = build_reply(provider, session, answer, actions, executed, created_summary)
+    ChatMessage.objects.create(session=session, role='assistant', content=answer)
+    return payload
+
+
+def chat_list(user):
+    """
+    The user's last 15 chat sessions
+    """
+    sessions = ChatSession.objects.filter(user=user).order_by('-updated_at')[:15]
+    return [
+        {
+            'id': s.id,
+            'title': s.title,
+            'created_at': s.created_at,
+            'updated_at': s.updated_at,
+        }
+        for s in sessions
+    ]
+
+
+def chat_messages(user, chat_id):
+    """
+    A chat session with its last 200 messages, or None if it isn't the user's
+    """
+    try:
+        session = ChatSession.objects.get(id=chat_id, user=user)
+    except ChatSession.DoesNotExist:
+        return None
+    msgs = session.messages.order_by('created_at')[:200]
+    data = [{'role': m.role, 'content': m.content, 'created_at': m.created_at} for m in msgs]
+    return {'chat': {'id': session.id, 'title': session.title}, 'messages': data}
+
+
+def norm_priority(p):
+    p = (p or '').lower()
+    return p if p in ('low', 'medium', 'high') else 'medium'
+
+
+def parse_deadline(value):
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt:
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, timezone=dt_timezone.utc)
+        return dt
+    try:
+        dt = datetime.fromisoformat(value)
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, timezone=dt_timezone.utc)
+        return dt
+    except Exception:
+        pass
+    # Fallback: dd.mm.yyyy[ HH:MM]
+    try:
+        parts = value.strip().split()
+        date_part = parts[0]
+        day, month, year = [int(x) for x in date_part.split('.')]
+        if len(parts) > 1:
+            time_part = parts[1]
+            hh, mm = [int(x) for x in time_part.split(':')]
+        else:
+            hh, mm = 9, 0  # default 09:00
+        dt = datetime(year, month, day, hh, mm)
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, timezone=dt_timezone.utc)
+        return dt
+    except Exception:
+        return None
+
+
+def execute_actions(user, actions):
+    """
+    Apply a confirmed plan for `user` and return the summary lines. Each
+    kind of change is applied best-effort, as the plan comes from the model
+    or the client.
+    """
+    created_summary = []
+
+    # Create or reuse categories
+    try:
+        cats_in = (actions.get('categories') or [])[:MAX_NEW_CATEGORIES]
+        for cat in cats_in:
+            name = (cat.get('name') or '').strip()
+            if not name:
+                continue
+            color = cat.get('color') or None
+            # Prefer an existing accessible category (user-owned first, then global)
+            matches = [c for c in TaskCategory.objects.visible_to(user) if c.name.upper() == name.upper()]
+            obj = min(matches, key=lambda c: c.owner_id is None) if matches else None
+            if not obj:
+                # Create a user-owned category
+                obj = TaskCategory.objects.create(
+                    name=name,
+                    color=(color if (isinstance(color, str) and color.startswith('#') and len(color) in (4, 7)) else '#3B82F6'),
+                    owner=user
+                )
+            else:
+                # Update color only for user's own categories
+                if obj.owner_id == user.id and color and isinstance(color, str) and color.startswith('#') and len(color) in (4, 7) and obj.color != color:
+                    obj.color = color
+                    obj.save()
+            # Do not reveal whether category existed before to avoid inference
+            created_summary.append(f"категория: {obj.name}")
+    except Exception:
+        pass
+
+    # Category lookup cache (only categories visible to the user)
+    cat_cache = {c.name.lower(): c for c in TaskCategory.objects.visible_to(user)}
+
+    # Create tasks
+    try:
+        tasks_in = (actions.get('tasks') or [])[:MAX_NEW_TASKS]
+        new_count = 0
+        for t in tasks_in:
+            title = (t.get('title') or '').strip()
+            if len(title) < 3:
+                continue
+            desc = t.get('description') or None
+            prio = norm_priority(t.get('priority'))
+            cat_name = (t.get('category') or '').strip().lower()
+            category = cat_cache.get(cat_name) if cat_name else None
+            deadline_dt = parse_deadline(t.get('deadline'))
+            Task.objects.create(
+                user=user,
+                title=title,
+                description=desc,
+                priority=prio,
+                deadline=deadline_dt,
+                category=category,
+            )
+            new_count += 1
+        if new_count:
+            created_summary.append(f"задач создано: {new_count}")
+    except Exception:
+        pass
+
+    # Update categories
+    try:
+        updates = actions.get('update_categories') or []
+        upd_count = 0
+        for u in updates:
+            name = (u.get('name') or '').strip()
+            if not name:
+                continue
+            # Only allow updating user's own categories
+            cat = TaskCategory.objects.filter(owner=user, name__iexact=name).first()
+            if not cat:
+                continue
+            changed = False
+            new_name = (u.get('new_name') or '').strip()
+            if new_name and new_name != cat.name and not TaskCategory.objects.filter(owner=user, name__iexact=new_name).exists():
+                cat.name = new_name
+                changed = True
+            color = u.get('color')
+            if color and isinstance(color, str) and color.startswith('#') and len(color) in (4, 7) and color != cat.color:
+                cat.color = color
+                changed = True
+            desc = u.get('description')
+            if desc is not None and desc != cat.description:
+                cat.description = desc
+                changed = True
+            if changed:
+                cat.save()
+                upd_count += 1
+        if upd_count:
+            created_summary.append(f"категорий обновлено: {upd_count}")
+    except Exception:
+        pass
+
+    # Update tasks
+    try:
+        updates = actions.get('update_tasks') or []
+        upd_count = 0
+        cat_cache = {c.name.lower(): c for c in TaskCategory.objects.visible_to(user)}
+        for u in updates:
+            task = None
+            if u.get('id') is not None:
+                task = Task.objects.filter(user=user, id=u.get('id')).first()
+            if not task and u.get('title'):
+                task = Task.objects.filter(user=user, title__iexact=(u.get('title') or '').strip()).order_by('-created_at').first()
+            if not task:
+                continue
+            changed = False
+            if 'title' in u and u['title']:
+                title = u['title'].strip()
+                if len(title) >= 3 and title != task.title:
+                    task.title = title
+                    changed = True
+            if 'description' in u:
+                desc = u['description']
+                if desc != task.description:
+                    task.description = desc
+                    changed = True
+            if 'priority' in u:
+                prio = norm_priority(u.get('priority'))
+                if prio != task.priority:
+                    task.priority = prio
+                    changed = True
+            if 'deadline' in u:
+                deadline_dt = parse_deadline(u.get('deadline'))
+                if deadline_dt != task.deadline:
+                    task.deadline = deadline_dt
+                    changed = True
+            if 'category' in u:
+                cname = (u.get('category') or '').strip().lower()
+                new_cat = cat_cache.get(cname) if cname else None
+                if new_cat != task.category:
+                    task.category = new_cat
+                    changed = True
+            if 'is_done' in u:
+                is_done = bool(u.get('is_done'))
+                if is_done != task.is_done:
+                    task.is_done = is_done
+                    changed = True
+            if changed:
+                task.save()
+                upd_count += 1
+        if upd_count:
+            created_summary.append(f"задач обновлено: {upd_count}")
+    except Exception:
+        pass
+
+    # Delete categories
+    try:
+        deletions = actions.get('delete_categories') or []
+        del_ok = 0
+        for d in deletions:
+            name = (d.get('name') or '').strip()
+            if not name:
+                continue
+            # Only delete user's own categories
+            cat = TaskCategory.objects.filter(owner=user, name__iexact=name).first()
+            if not cat:
+                continue
+            Task.objects.filter(user=user, category=cat).tracked_update(category=None)
+            cat.delete()
+            del_ok += 1
+        msg_parts = []
+        if del_ok:
+            msg_parts.append(f"категорий удалено: {del_ok}")
+        if msg_parts:
+            created_summary.append("; ".join(msg_parts))
+    except Exception:
+        pass
+
+    # Delete tasks
+    try:
+        deletions = actions.get('delete_tasks') or []
+        del_count = 0
+        for d in deletions:
+            task = None
+            if d.get('id') is not None:
+                task = Task.objects.filter(user=user, id=d.get('id')).first()
+            if not task and d.get('title'):
+                task = Task.objects.filter(user=user, title__iexact=(d.get('title') or '').strip()).order_by('-created_at').first()
+            if not task:
+                continue
+            task.delete()
+            del_count += 1
+        if del_count:
+            created_summary.append(f"задач удалено: {del_count}")
+    except Exception:
+        pass
+
+    return created_summary
@@ -0,0 +1,286 @@
+"""
+Async versions of the AI assistant views, routed instead of those in
+tasks.views when AI_ASYNC_VIEWS is enabled (the ASGI entry point enables
+it). Requests, responses and event streams are the same.
+
+While a request waits on the provider nothing blocks on it and it holds
+no database connection: provider calls go through AsyncOpenAI, and database
+work (the sync functions in tasks.assistant) runs on a pool of
+AI_ASYNC_DB_CONCURRENCY threads per process, which own the only database
+connections these views use and keep them for AI_ASYNC_DB_CONN_MAX_AGE
+seconds. Thousands of requests can wait on the provider without
+exhausting the database's connections. Authentication, permissions,
+throttling, parsing and rendering go through DRF's APIView machinery, as
+for the sync views.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions, permissions, status
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from todo_project.metrics import metrics
+from todo_project.renderers import EventStreamRenderer, event_stream_response, render_event
+
+from . import ai, assistant, intents
+from .models import ChatMessage
+
+
+def api_response(request, data, status_code=status.HTTP_200_OK):
+    """
+    `data` rendered with the negotiated renderer, like a DRF Response
+    """
+    renderer = request.accepted_renderer
+    response = HttpResponse(status=status_code)
+    response.content = renderer.render(data, request.accepted_media_type, {'request': request, 'response': response})
+    response['Content-Type'] = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def error_response(request, exc):
+    """
+    Response for an APIException, from the exception handling of the view
+    prepare() ran (status, Retry-After, WWW-Authenticate, ...)
+    """
+    view = request.parser_context['view']
+    return view.finalize_response(request, view.handle_exception(exc)).render()
+
+
+class DatabasePool:
+    """
+    Per-process pool of threads running the async views' database work
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Created lazily and again after a fork: worker threads do not survive it
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, getattr(settings, 'AI_ASYNC_DB_CONCURRENCY', 10)),
+                    thread_name_prefix='ai-db',
+                    initializer=self._init_thread,
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    @staticmethod
+    def _init_thread():
+        # Pool threads outlive requests, so unlike the per-request threads of
+        # sync code under ASGI they can keep a connection between calls
+        max_age = getattr(settings, 'AI_ASYNC_DB_CONN_MAX_AGE', 60)
+        for alias in connections:
+            connection = connections[alias]
+            connection.settings_dict = {**connection.settings_dict, 'CONN_MAX_AGE': max_age}
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) on a pool thread. Its connection is checked and
+        kept or closed (AI_ASYNC_DB_CONN_MAX_AGE) as around a sync request.
+        """
+        def call():
+            close_old_connections()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                close_old_connections()
+
+        return await sync_to_async(call, thread_sensitive=False, executor=self._get_executor())()
+
+
+database = DatabasePool()
+
+
+class AsyncViewPolicy(APIView):
+    """
+    DRF policy of the async views: the API's renderers, parsers,
+    authentication and throttles, IsAuthenticated like the sync views.
+    Only used through prepare(), never dispatched.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+
+async def prepare(request, event_stream=False):
+    """
+    Wrap `request` in a DRF Request and run APIView.initial() on it:
+    renderer negotiation (offering text/event-stream if `event_stream`),
+    authentication, permissions and throttles. Returns (request, error
+    response or None).
+    """
+    view = AsyncViewPolicy()
+    if event_stream:
+        view.renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+    view.args, view.kwargs = (), {}
+    view.headers = view.default_response_headers
+    request = view.request = view.initialize_request(request)
+    try:
+        # JWT users are usually served from the per-process cache; throttle
+        # history lives in the cache backend
+        await database.run(view.initial, request)
+    except exceptions.APIException as exc:
+        return request, error_response(request, exc)
+    return request, None
+
+
+async def stream_assist_reply(client, provider, session, answer_request, plan_call, started):
+    """
+    Async tasks.views.stream_assist_reply. A client disconnect cancels the
+    response, which closes the provider stream and cancels the plan call.
+    """
+    plan = asyncio.ensure_future(ai.gather_calls({'plan': plan_call}, getattr(settings, 'AI_ASSIST_DEADLINE', 30)))
+    stream = None
+    parts = []
+    saved = False
+    try:
+        stream = await client.chat.completions.create(**answer_request, stream=True)
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if not parts:
+                metrics.observe('ai.stream.first_token_seconds', time.perf_counter() - started)
+            parts.append(delta)
+            yield render_event('token', {'text': delta})
+
+        actions = (await plan)['plan']
+        answer, payload = assistant.build_reply(provider, session, ''.join(parts), actions, False, [])
+        await database.run(ChatMessage.objects.create, session=session, role='assistant', content=answer)
+        saved = True
+        yield render_event('plan', payload)
+    except (asyncio.CancelledError, GeneratorExit):
+        metrics.increment('ai.stream.disconnects')
+        raise
+    except Exception as e:
+        yield render_event('error', assistant.unavailable_payload(provider, e))
+    finally:
+        plan.cancel()
+        if stream is not None:
+            await stream.close()
+        if not saved and parts:
+            await database.run(ChatMessage.objects.create, session=session, role='assistant', content=''.join(parts))
+
+
+@csrf_exempt
+@require_POST
+async def ai_assist(request):
+    """
+    Async tasks.views.ai_assist
+    """
+    started = time.perf_counter()
+    request, error = await prepare(request, event_stream=True)
+    if error is not None:
+        return error
+    stream = isinstance(request.accepted_renderer, EventStreamRenderer)
+    # Provider settings and API clients are shared per process (see tasks.ai)
+    provider = ai.get_provider()
+    if provider is None:
+        return api_response(request, assistant.unavailable_payload(), status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    user = request.user
+    try:
+        data = request.data or {}
+    except exceptions.APIException as exc:
+        return error_response(request, exc)
+    user_message = (data.get('message') or '').strip()
+    if not user_message and not data.get('confirm'):
+        return api_response(request, {'error': 'message is required'}, status.HTTP_400_BAD_REQUEST)
+
+    # Chat session, user message and the prompt context
+    chat = await database.run(assistant.open_chat, user, data.get('chat_id'), user_message)
+    if chat is None:
+        return api_response(request, {'error': 'chat_not_found'}, status.HTTP_404_NOT_FOUND)
+    session, content, history = chat
+
+    try:
+        client = ai.get_async_client(provider)
+        model = provider.model
+        answer_timeout = getattr(settings, 'AI_ANSWER_TIMEOUT', 30)
+        plan_timeout = getattr(settings, 'AI_PLAN_TIMEOUT', 30)
+
+        answer_request = assistant.answer_request(model, history, content, assistant.answer_max_tokens(provider, data))
+        plan_request = assistant.plan_request(model, content, bool(data.get('confirm')))
+
+        async def answer_call(remaining):
+            completion = await client.chat.completions.create(
+                **answer_request,
+                **provider.request_options(min(answer_timeout, remaining)),
+            )
+            return completion.choices[0].message.content
+
+        async def plan_call(remaining):
+            # A failed plan is an empty plan: it never cancels the answer
+            try:
+                actions_completion = await client.chat.completions.create(
+                    **plan_request,
+                    **provider.request_options(min(plan_timeout, remaining)),
+                )
+                return assistant.parse_plan(actions_completion.choices[0].message.content)
+            except Exception:
+                return assistant.empty_plan()
+
+        # The database is only needed once the message matched a command
+        actions, command = assistant.plan_source(data, user_message)
+        if command:
+            actions = await database.run(intents.command_plan, user, command)
+        needed, actions, executed = assistant.assist_calls(data, actions)
+        calls = {name: {'answer': answer_call, 'plan': plan_call}[name] for name in needed}
+
+        if stream and 'answer' in calls:
+            answer_request.update(provider.request_options(answer_timeout))
+            return event_stream_response(
+                stream_assist_reply(client, provider, session, answer_request, plan_call, started)
+            )
+
+        round_started = time.perf_counter()
+        results = await ai.gather_calls(calls, getattr(settings, 'AI_ASSIST_DEADLINE', 30))
+        assistant.record_round(calls, round_started)
+        answer = results.get('answer')
+        actions = results.get('plan', actions)
+
+        response_payload = await database.run(assistant.save_reply, user, provider, session, answer, actions, executed)
+
+        if stream:
+            return HttpResponse(render_event('plan', response_payload), content_type='text/event-stream; charset=utf-8')
+        return api_response(request, response_payload)
+    except Exception as e:
+        return api_response(request, assistant.unavailable_payload(provider, e), status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@require_GET
+async def ai_chats_list(request):
+    """
+    Async tasks.views.ai_chats_list
+    """
+    request, error = await prepare(request)
+    if error is not None:
+        return error
+    return api_response(request, {'chats': await database.run(assistant.chat_list, request.user)})
+
+
+@require_GET
+async def ai_chat_messages(request, chat_id: int):
+    """
+    Async tasks.views.ai_chat_messages
+    """
+    request, error = await prepare(request)
+    if error is not None:
+        return error
+    data = await database.run(assistant.chat_messages, request.user, chat_id)
+    if data is None:
+        return api_response(request, {'error': 'chat_not_found'}, status.HTTP_404_NOT_FOUND)
+    return api_response(request, data)
@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, TaskCategory, record_task_changes
+from .serializers import TaskBatchItemSerializer
+
+
+def _apply_completion(task):
+    """
+    Same completed_at rules as Task.save(), for rows written in bulk
+    """
+    if task.is_done and not task.completed_at:
+        task.completed_at = timezone.now()
+    elif not task.is_done and task.completed_at:
+        task.completed_at = None
+
+
+def write_batch(user, creates, updates, all_or_nothing=False):
+    """
+    Validate and write a batch of task creates and partial updates.
+
+    Categories are loaded once per batch and tasks to update in one locked
+    query; rows are then written with bulk_create/bulk_update and derived
+    data is updated once, all in a single transaction.
+
+    Returns (created, updated, errors): created/updated are lists of
+    {'index', 'id'}; errors maps 'create'/'update' to lists of
+    {'index', 'errors'}. With all_or_nothing, nothing is written when
+    any item is invalid.
+    """
+    errors = {'create': [], 'update': []}
+    category_ids = {category.pk for category in TaskCategory.objects.visible_to(user)}
+    context = {'category_ids': category_ids}
+
+    with transaction.atomic():
+        # Validate creates
+        new_tasks = []
+        for index, item in enumerate(creates):
+            serializer = TaskBatchItemSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                errors['create'].append({'index': index, 'errors': serializer.errors})
+                continue
+            data = serializer.validated_data
+            category_id = data.pop('category', None)
+            task = Task(user=user, category_id=category_id, **data)
+            _apply_completion(task)
+            new_tasks.append((index, task))
+
+        # Validate updates against tasks loaded (and locked) in one query
+        ids = [item.get('id') for item in updates]
+        existing = Task.objects.select_for_update().in_bulk(
+            [pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+        )
+        existing = {pk: task for pk, task in existing.items() if task.user_id == user.pk}
+        changed_tasks = []
+        changed_fields = set()
+        seen = set()
+        for index, item in enumerate(updates):
+            pk = item.get('id')
+            task = existing.get(pk)
+            if task is None:
+                errors['update'].append({'index': index, 'errors': {'id': ['Task not found.']}})
+                continue
+            if pk in seen:
+                errors['update'].append({'index': index, 'errors': {'id': ['Duplicate task id in batch.']}})
+                continue
+            seen.add(pk)
+            fields = {key: value for key, value in item.items() if key != 'id'}
+            serializer = TaskBatchItemSerializer(data=fields, partial=True, context=context)
+            if not serializer.is_valid():
+                errors['update'].append({'index': index, 'errors': serializer.errors})
+                continue
+            before = task.get_tracked_state()
+            for name, value in serializer.validated_data.items():
+                setattr(task, 'category_id' if name == 'category' else name, value)
+                changed_fields.add('category_id' if name == 'category' else name)
+            _apply_completion(task)
+            changed_tasks.append((index, task, before))
+
+        if all_or_nothing and (errors['create'] or errors['update']):
+            return [], [], errors
+
+        if new_tasks:
+            Task.objects.bulk_create([task for _, task in new_tasks], batch_size=500)
+        if changed_tasks:
+            now = timezone.now()
+            for _, task, _ in changed_tasks:
+                task.updated_at = now
+            fields = changed_fields | {'completed_at', 'updated_at'}
+            Task.objects.bulk_update([task for _, task, _ in changed_tasks], sorted(fields), batch_size=500)
+
+        record_task_changes(
+            [(None, task.get_tracked_state()) for _, task in new_tasks] +
+            [(before, task.get_tracked_state()) for _, task, before in changed_tasks]
+        )
+
+    created = [{'index': index, 'id': task.pk} for index, task in new_tasks]
+    updated = [{'index': index, 'id': task.pk} for index, task, _ in changed_tasks]
+    return created, updated, errors
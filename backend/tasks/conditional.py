@@ -0,0 +1,80 @@
+import functools
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import TaskCounters
+
+
+def get_validators(request):
+    """
+    Compute (etag, last_modified) for a read of the user's task data.
+
+    The ETag covers the user's data version (bumped on any task or category
+    write), the full path with query string and the negotiated media type.
+    Fields such as is_overdue depend on the clock, so a time bucket of
+    TASKS_CONDITIONAL_GET_MAX_AGE seconds is mixed in as well: a 304 is
+    never more than that stale.
+    """
+    version, changed_at = TaskCounters.objects.get_version(request.user)
+    bucket_size = max(1, getattr(settings, 'TASKS_CONDITIONAL_GET_MAX_AGE', 60))
+    bucket = int(datetime.now(dt_timezone.utc).timestamp()) // bucket_size
+    raw = '|'.join([
+        str(request.user.pk),
+        str(version),
+        changed_at.isoformat(),
+        str(bucket),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    etag = quote_etag(hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32])
+    last_modified = max(int(changed_at.timestamp()), bucket * bucket_size)
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
+
+
+def evaluate_conditional_get(request, handler):
+    """
+    Answer 304 from the data version alone, before the handler builds a
+    queryset or serializes anything; otherwise call it and tag the response.
+    """
+    etag, last_modified = get_validators(request)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return set_validators(not_modified, etag, last_modified)
+    response = handler()
+    if response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_get(view_func):
+    """
+    Decorator for function-based task read views. Place it below @api_view
+    so authentication and permission checks have already run.
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_func(request, *args, **kwargs)
+        return evaluate_conditional_get(request, lambda: view_func(request, *args, **kwargs))
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for GET on class-based task read views
+    """
+
+    def get(self, request, *args, **kwargs):
+        return evaluate_conditional_get(request, lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs))
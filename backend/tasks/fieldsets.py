@@ -0,0 +1,48 @@
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _parse(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_requested_fields(request, available):
+    """
+    Output fields selected with ?fields=a,b and/or ?omit=c, in the
+    serializer's own order, or None when neither parameter is given.
+    Unknown field names are rejected with a 400.
+    """
+    fields = request.query_params.get(FIELDS_PARAM)
+    omit = request.query_params.get(OMIT_PARAM)
+    if fields is None and omit is None:
+        return None
+
+    include = _parse(fields) if fields is not None else list(available)
+    exclude = _parse(omit) if omit is not None else []
+    errors = {}
+    for param, names in ((FIELDS_PARAM, include), (OMIT_PARAM, exclude)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = [f"Unknown fields: {', '.join(unknown)}"]
+    if errors:
+        raise ValidationError(errors)
+    selected = tuple(name for name in available if name in include and name not in exclude)
+    if not selected:
+        raise ValidationError({FIELDS_PARAM: ['Select at least one field.']})
+    return selected
+
+
+def get_source_columns(fields, sources):
+    """
+    Model columns needed to render the selected output fields, given a
+    {output field: (column, ...)} map. Always includes the primary key.
+    """
+    columns = ['id']
+    for name in fields:
+        for column in sources[name]:
+            if column not in columns:
+                columns.append(column)
+    return columns
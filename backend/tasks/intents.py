@@ -0,0 +1,551 @@
+"""
+Rule-based fast path for the AI assistant.
+
+Simple imperatives in Russian or English ("create task X tomorrow at 18:00
+in Work", "отметь Y выполненной", "перенеси Z на пятницу") are turned into
+the same action plan the model returns (see assistant.schema_prompt),
+without calling the provider. Messages the rules don't recognize, or only
+with a confidence below AI_INTENT_MIN_CONFIDENCE, go to the model as
+before.
+
+Relative dates are resolved in the current time zone; a date without a
+time means 09:00, like the dd.mm.yyyy format of assistant.parse_deadline.
+"""
+import re
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from todo_project.metrics import metrics
+
+from . import assistant
+from .models import Task, TaskCategory
+
+
+DEFAULT_TIME = dt_time(9, 0)
+
+WEEKDAYS = {
+    'monday': 0, 'понедельник': 0,
+    'tuesday': 1, 'вторник': 1,
+    'wednesday': 2, 'среда': 2, 'среду': 2,
+    'thursday': 3, 'четверг': 3,
+    'friday': 4, 'пятница': 4, 'пятницу': 4,
+    'saturday': 5, 'суббота': 5, 'субботу': 5,
+    'sunday': 6, 'воскресенье': 6,
+}
+# Abbreviations are ordinary words too ("sun", "sat"): only taken after a preposition
+WEEKDAY_ABBREVIATIONS = {
+    'mon': 0, 'пн': 0, 'tue': 1, 'tues': 1, 'вт': 1, 'wed': 2, 'ср': 2,
+    'thu': 3, 'thurs': 3, 'чт': 3, 'fri': 4, 'пт': 4, 'sat': 5, 'сб': 5, 'sun': 6, 'вс': 6,
+}
+MONTHS = {
+    'january': 1, 'jan': 1, 'января': 1, 'february': 2, 'feb': 2, 'февраля': 2,
+    'march': 3, 'mar': 3, 'марта': 3, 'april': 4, 'apr': 4, 'апреля': 4,
+    'may': 5, 'мая': 5, 'june': 6, 'jun': 6, 'июня': 6, 'july': 7, 'jul': 7, 'июля': 7,
+    'august': 8, 'aug': 8, 'августа': 8, 'september': 9, 'sep': 9, 'sept': 9, 'сентября': 9,
+    'october': 10, 'oct': 10, 'октября': 10, 'november': 11, 'nov': 11, 'ноября': 11,
+    'december': 12, 'dec': 12, 'декабря': 12,
+}
+PARTS_OF_DAY = {
+    'morning': dt_time(9, 0), 'in the morning': dt_time(9, 0), 'утром': dt_time(9, 0),
+    'afternoon': dt_time(14, 0), 'in the afternoon': dt_time(14, 0), 'днём': dt_time(14, 0), 'днем': dt_time(14, 0),
+    'evening': dt_time(19, 0), 'in the evening': dt_time(19, 0), 'вечером': dt_time(19, 0),
+    'noon': dt_time(12, 0), 'полдень': dt_time(12, 0), 'midnight': dt_time(23, 59), 'полночь': dt_time(23, 59),
+}
+PRIORITIES = {
+    'high': 'high', 'высокий': 'high', 'высоким': 'high', 'urgent': 'high', 'срочно': 'high', 'срочная': 'high',
+    'medium': 'medium', 'средний': 'medium', 'средним': 'medium', 'normal': 'medium', 'обычный': 'medium',
+    'low': 'low', 'низкий': 'low', 'низким': 'low',
+}
+
+
+def _names(words):
+    return '|'.join(sorted((re.escape(w) for w in words), key=len, reverse=True))
+
+
+_FLAGS = re.IGNORECASE | re.UNICODE
+_PREPOSITIONS = r'on|by|due|until|till|for|до|к|ко|на|в|во'
+_PREPOSITION = r'(?:(?:' + _PREPOSITIONS + r')\s+)?'
+_SEPARATOR = re.compile(r'[\s,]*')
+_NEXT = r'(?:(?:next|this|следующ\w*|эт\w+)\s+)?'
+_QUANTITY = r'(?:(\d+)\s*|(?:an?|one|один|одну|одна)\s+)?'
+
+# Anchored parsers of one date or time phrase: (pattern, handler(match, today))
+# returning a dict of 'date', 'time' and/or 'at' (an exact aware datetime)
+_WHEN_PARSERS = []
+
+
+def _when_parser(pattern):
+    def register(handler):
+        _WHEN_PARSERS.append((re.compile(pattern, _FLAGS), handler))
+        return handler
+    return register
+
+
+@_when_parser(_PREPOSITION + r'(\d{4}-\d{2}-\d{2})(?:[T ](\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?))?(?![\w:.-])')
+def _iso(match, today):
+    # ISO 8601, as returned by the model: left to parse_deadline when it has a time
+    if match.group(2):
+        at = assistant.parse_deadline(f'{match.group(1)}T{match.group(2).upper()}')
+        return {'at': at} if at else None
+    try:
+        return {'date': date.fromisoformat(match.group(1))}
+    except ValueError:
+        return None
+
+
+@_when_parser(_PREPOSITION + r'(\d{1,2})\.(\d{1,2})(?:\.(\d{4}|\d{2}))?(?![\w:.])')
+def _dotted(match, today):
+    # dd.mm.yyyy (parse_deadline's format), dd.mm.yy and dd.mm (next such day)
+    day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+    return _calendar_date(day, month, year, today)
+
+
+@_when_parser(_PREPOSITION + r'(\d{1,2})(?:st|nd|rd|th|-?го|-?е)?\s+(' + _names(MONTHS) + r')\.?(?:,?\s+(\d{4}))?(?!\w)')
+def _day_month(match, today):
+    return _calendar_date(int(match.group(1)), MONTHS[match.group(2).lower()], match.group(3), today)
+
+
+@_when_parser(_PREPOSITION + r'(' + _names(MONTHS) + r')\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?(?!\w)')
+def _month_day(match, today):
+    return _calendar_date(int(match.group(2)), MONTHS[match.group(1).lower()], match.group(3), today)
+
+
+@_when_parser(_PREPOSITION + r'(today|сегодня|tomorrow|завтра|послезавтра|(?:the\s+)?day\s+after\s+tomorrow)(?!\w)')
+def _named_day(match, today):
+    word = match.group(1).lower()
+    offset = 0 if word in ('today', 'сегодня') else 1 if word in ('tomorrow', 'завтра') else 2
+    return {'date': today + timedelta(days=offset)}
+
+
+@_when_parser(r'tonight')
+def _tonight(match, today):
+    return {'date': today, 'time': dt_time(20, 0)}
+
+
+@_when_parser(r'((?:' + _PREPOSITIONS + r')\s+)?' + _NEXT + r'(' + _names(list(WEEKDAYS) + list(WEEKDAY_ABBREVIATIONS)) + r')\.?(?!\w)')
+def _weekday(match, today):
+    word = match.group(2).lower()
+    if word in WEEKDAY_ABBREVIATIONS and not match.group(1):
+        return None
+    weekday = WEEKDAYS.get(word, WEEKDAY_ABBREVIATIONS.get(word))
+    # The next such day, a week ahead when it is today
+    return {'date': today + timedelta(days=(weekday - today.weekday()) % 7 or 7)}
+
+
+@_when_parser(r'next\s+week|на\s+следующей\s+неделе')
+def _next_week(match, today):
+    return {'date': today + timedelta(days=7)}
+
+
+@_when_parser(r'(?:in|через)\s+' + _QUANTITY + r'(minutes?|mins?|hours?|hrs?|days?|weeks?|минут[уы]?|час(?:а|ов)?|дн(?:я|ей)|день|недел[юиь]|недели)(?!\w)')
+def _relative(match, today):
+    count = int(match.group(1) or 1)
+    if not count:
+        return None
+    unit = match.group(2).lower()
+    if unit.startswith(('min', 'мин')):
+        return {'at': _now() + timedelta(minutes=count)}
+    if unit.startswith(('h', 'час')):
+        return {'at': _now() + timedelta(hours=count)}
+    if unit.startswith(('w', 'недел')):
+        return {'date': today + timedelta(weeks=count)}
+    return {'date': today + timedelta(days=count)}
+
+
+@_when_parser(r'(?:(?:at|@|в|во|к|ко|на)\s+)?(\d{1,2}):(\d{2})(?:\s*(am|pm))?(?![\w:])')
+def _clock(match, today):
+    return _clock_time(int(match.group(1)), int(match.group(2)), match.group(3))
+
+
+@_when_parser(r'(?:(?:at|@)\s+)?(\d{1,2})\s*(am|pm)(?!\w)')
+def _meridiem(match, today):
+    return _clock_time(int(match.group(1)), 0, match.group(2))
+
+
+@_when_parser(r'(?:at|в|во|к|ко)\s+(\d{1,2})(?:\s+час(?:а|ов)?)?(?:\s+(утра|дня|вечера|ночи))?(?!\w)')
+def _hour(match, today):
+    hour = int(match.group(1))
+    if match.group(2) in ('дня', 'вечера') and hour < 12:
+        hour += 12
+    return _clock_time(hour, 0, None)
+
+
+@_when_parser(r'(?:(?:at|в|к)\s+)?(' + _names(PARTS_OF_DAY) + r')(?!\w)')
+def _part_of_day(match, today):
+    return {'time': PARTS_OF_DAY[match.group(1).lower()]}
+
+
+def _now():
+    return timezone.localtime().replace(second=0, microsecond=0)
+
+
+def _calendar_date(day, month, year, today):
+    try:
+        if year:
+            year = int(year)
+            return {'date': date(year + 2000 if year < 100 else year, month, day)}
+        value = date(today.year, month, day)
+        return {'date': value if value >= today else date(today.year + 1, month, day)}
+    except ValueError:
+        return None
+
+
+def _clock_time(hour, minute, meridiem):
+    meridiem = (meridiem or '').lower()
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return {'time': dt_time(hour, minute)}
+
+
+def parse_when(text, today=None):
+    """
+    Date/time phrase `text` ("завтра в 18:00", "next friday 5pm",
+    "31.12.2025 10:00", "in 2 days") as a dict of 'date', 'time' and/or
+    'at', or None unless all of it is understood
+    """
+    today = today or _now().date()
+    text = text.strip()
+    when = {}
+    position = 0
+    while position < len(text):
+        for pattern, handler in _WHEN_PARSERS:
+            match = pattern.match(text, position)
+            if not match:
+                continue
+            parsed = handler(match, today)
+            if not parsed:
+                continue
+            if any(key in when for key in parsed) or ('at' in when and parsed) or ('at' in parsed and when):
+                # Two dates, or two times
+                return None
+            when.update(parsed)
+            position = match.end()
+            break
+        else:
+            return None
+        position = _SEPARATOR.match(text, position).end()
+    return when or None
+
+
+def resolve_when(when, current=None):
+    """
+    Aware datetime for a parse_when result. Missing parts come from
+    `current` (the deadline being moved) if given; otherwise a time
+    alone means its next occurrence and a date alone means 09:00.
+    """
+    if when.get('at'):
+        return when['at']
+    now = _now()
+    current = timezone.localtime(current) if current else None
+    moment = when.get('time') or (current.time() if current else DEFAULT_TIME)
+    day = when.get('date') or (current.date() if current else None)
+    if day is None:
+        day = now.date()
+        if datetime.combine(day, moment) <= now.replace(tzinfo=None):
+            day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, moment))
+
+
+_COMMANDS = [
+    # (intent, pattern, confident): the pattern matches up to the title
+    ('create', r'(?:please\s+)?(?:create|add|make|new)\s+(?:an?\s+)?(?:new\s+)?(?:task|todo|to-do|reminder)\b\s*:?', True),
+    ('create', r'(?:please\s+)?remind\s+me\s+(?:to\s+|about\s+)?', True),
+    ('create', r'(?:пожалуйста\s+)?(?:создай(?:те)?|создать|добавь(?:те)?|добавить|заведи(?:те)?|новая)\s+(?:новую\s+|новая\s+)?(?:задачу|задача|напоминание)\b\s*:?', True),
+    ('create', r'(?:пожалуйста\s+)?напомни(?:те)?\s+(?:мне\s+)?(?:о\s+том,?\s+что\s+|что\s+|про\s+)?', True),
+    ('create', r'(?:please\s+)?(?:create|add)\s+', False),
+    ('create', r'(?:создай(?:те)?|добавь(?:те)?)\s+', False),
+    ('complete', r'(?:please\s+)?(?:mark|set)\s+(?:the\s+)?(?:task\s+)?(?P<title>.+?)\s+(?:as\s+)?(?:done|complete|completed|finished)$', True),
+    ('complete', r'(?:please\s+)?(?:complete|finish|close|check\s+off|tick\s+off)\s+(?:the\s+)?(?:task\s+)?', True),
+    ('complete', r'(?:отметь(?:те)?|пометь(?:те)?|отметить|пометить)\s+(?:задачу\s+)?(?P<title>.+?)\s+(?:как\s+)?(?:выполненн\w*|сделанн\w*|готов\w*|завершенн\w*|завершённ\w*)$', True),
+    ('complete', r'(?:заверши(?:те)?|завершить|закрой(?:те)?|закрыть|выполни(?:те)?)\s+(?:задачу\s+)?', True),
+    ('complete', r'(?:задача\s+)?(?P<title>.+?)\s+(?:выполнена|сделана|готова)$', True),
+    ('delete', r'(?:please\s+)?(?:delete|remove|drop|erase)\s+(?:the\s+)?(?:task\s+)?', True),
+    ('delete', r'(?:удали(?:те)?|удалить|убери(?:те)?|убрать)\s+(?:задачу\s+)?', True),
+    ('reschedule', r'(?:please\s+)?(?:move|reschedule|postpone|push|shift)\s+(?:the\s+)?(?:task\s+)?', True),
+    ('reschedule', r'(?:перенеси(?:те)?|перенести|сдвинь(?:те)?|отложи(?:те)?)\s+(?:задачу\s+)?', True),
+]
+_COMMANDS = [(intent, re.compile(pattern, _FLAGS), confident) for intent, pattern, confident in _COMMANDS]
+
+_QUOTED = re.compile(r'["«“„]([^"«»“”„]{1,200})["»”“]', _FLAGS)
+_SECOND_COMMAND = re.compile(
+    r'(?:[,;]|\b(?:and|then|и|потом|затем)\b)\s*(?:create|add|delete|remove|mark|complete|move|reschedule|'
+    r'создай|добавь|удали|отметь|заверши|перенеси|напомни)\b', _FLAGS
+)
+# Date-like words left in a title. Month abbreviations (and "may") and
+# weekday abbreviations are ordinary words too: only counted next to a
+# number, or after a preposition
+_DATE_WORDS = re.compile(
+    r'\b(?:today|tomorrow|tonight|сегодня|завтра|послезавтра|\d{1,2}:\d{2}|\d{1,2}\.\d{1,2}(?:\.\d{2,4})?|'
+    r'(?:in|через)\s+\d+|\d{1,2}(?:st|nd|rd|th|-(?:го|ого|е|ое|му|ому)|\s+числа)|'
+    r'(?:' + _names(m for m in MONTHS if len(m) > 3 and m != 'may') + r')|'
+    r'(?:' + _names(MONTHS) + r')\.?\s+\d{1,4}|\d{1,2}\s+(?:' + _names(MONTHS) + r')|'
+    r'(?:' + _names(WEEKDAYS) + r')|(?:' + _PREPOSITIONS + r')\s+(?:' + _names(WEEKDAY_ABBREVIATIONS) + r'))\b', _FLAGS
+)
+_TRAILING_PREPOSITION = re.compile(r'\s+(?:' + _PREPOSITIONS + r')$', _FLAGS)
+_RESCHEDULE_TO = re.compile(r'\s+(?:to|until|till|for|on|на|к|до)\s+', _FLAGS)
+_CATEGORY = [
+    # (pattern, explicit): a trailing category; explicit ones name the category
+    (r'\s+(?:in|into|under|to)\s+(?:the\s+)?(?:category|list|folder|project)\s+(?P<name>{name})$', True),
+    (r'\s+(?:in|into|under|to)\s+(?:the\s+)?(?P<name>{word})\s+(?:category|list|folder|project)$', True),
+    (r'\s+(?:category|категория)\s*:?\s*(?P<name>{name})$', True),
+    (r'\s+(?:в|во)\s+(?:категори[юи]|папк[уе]|списке?|раздел[е]?|проект[е]?)\s+(?P<name>{name})$', True),
+    (r'\s+(?:in|into|under)\s+(?P<name>{word})$', False),
+]
+_CATEGORY = [
+    (re.compile(pattern.format(name=r'"[^"]+"|«[^»]+»|[\w-]+(?:\s+[\w-]+){0,2}', word=r'"[^"]+"|«[^»]+»|[\w-]+'), _FLAGS), explicit)
+    for pattern, explicit in _CATEGORY
+]
+_PRIORITY = [re.compile(pattern, _FLAGS) for pattern in (
+    r'\s+(?:with\s+)?(?P<p>high|medium|normal|low)\s+priority$',
+    r'\s+priority\s*:?\s*(?P<p>high|medium|normal|low)$',
+    r'\s+(?:с\s+)?(?P<p>высоким|средним|низким)\s+приоритетом$',
+    r'\s+приоритет\s*:?\s*(?P<p>высокий|средний|обычный|низкий)$',
+    r'[\s,]+(?P<p>urgent|срочно|срочная)!*$',
+)]
+
+
+def parse_command(message):
+    """
+    Recognize a single task command in `message`. Returns a dict with the
+    'intent' (create, complete, delete or reschedule), the task 'title',
+    'when' (see parse_when), 'category', 'priority' and a 'confidence'
+    between 0 and 1, or None.
+    """
+    text = re.sub(r'\s+', ' ', message or '').strip().rstrip('.!').strip()
+    if not text or '?' in text or '\n' in (message or '').strip() or len(text) > 300:
+        return None
+    for intent, pattern, confident in _COMMANDS:
+        match = pattern.match(text)
+        if match:
+            break
+    else:
+        return None
+    if _SECOND_COMMAND.search(text, match.end()):
+        return None
+
+    command = {
+        'intent': intent, 'when': None, 'category': None, 'category_explicit': False,
+        'priority': None, 'confidence': 1.0,
+    }
+    if not confident:
+        command['confidence'] -= 0.25
+    rest = (match.group('title') if 'title' in pattern.groupindex else text[match.end():]).strip()
+
+    if intent == 'reschedule':
+        # "<title> to <when>": the first split whose remainder is all date and time
+        for split in _RESCHEDULE_TO.finditer(rest):
+            when = parse_when(rest[split.end():])
+            if when:
+                command['when'], rest = when, rest[:split.start()]
+                break
+        else:
+            return None
+    elif intent == 'create':
+        rest = _strip_attributes(rest, command)
+
+    quoted = _QUOTED.fullmatch(rest.strip())
+    title = (quoted.group(1) if quoted else rest).strip(' ,.:;-—"«»“”')
+    if len(title) < 3:
+        return None
+    if not quoted:
+        if _DATE_WORDS.search(title):
+            # A date the rules did not understand
+            command['confidence'] -= 0.3
+        if len(title) > 80:
+            command['confidence'] -= 0.3
+        if re.search(r',|\b(?:and|и)\b', title, _FLAGS):
+            command['confidence'] -= 0.1
+    command['title'] = title[:1].upper() + title[1:] if intent == 'create' else title
+    return command
+
+
+def _strip_attributes(rest, command):
+    # Deadline, category and priority, in any order, at either end of the title
+    changed = True
+    while changed and rest:
+        changed = False
+        rest = rest.strip(' ,;')
+        words = rest.split(' ')
+        for size in range(min(8, len(words) - 1), 0, -1):
+            for head, tail, at_end in ((words[:-size], words[-size:], True), (words[size:], words[:size], False)):
+                when = None if command['when'] else parse_when(' '.join(tail))
+                if when:
+                    rest = ' '.join(head)
+                    if at_end:
+                        # "Plan for next week": the preposition belongs to the date
+                        rest = _TRAILING_PREPOSITION.sub('', rest)
+                    command['when'], changed = when, True
+                    break
+            if changed:
+                break
+        if changed:
+            continue
+        if not command['category']:
+            for pattern, explicit in _CATEGORY:
+                match = pattern.search(rest)
+                if match:
+                    command['category'] = match.group('name').strip('"«»')
+                    command['category_explicit'] = explicit
+                    rest, changed = rest[:match.start()], True
+                    break
+        if not changed and not command['priority']:
+            for pattern in _PRIORITY:
+                match = pattern.search(rest)
+                if match:
+                    command['priority'] = PRIORITIES[match.group('p').lower()]
+                    rest, changed = rest[:match.start()], True
+                    break
+    return rest
+
+
+def _find_task(user, title, intent):
+    """
+    The user's task called `title` (exact, else the only partial match) and
+    whether the match was exact, or (None, False)
+    """
+    tasks = Task.objects.filter(user=user)
+    if intent == 'complete':
+        tasks = tasks.filter(is_done=False)
+    for lookup, exact in (('title__iexact', True), ('title__icontains', False)):
+        matches = list(tasks.filter(**{lookup: title}).order_by('-created_at')[:2])
+        if len(matches) == 1:
+            return matches[0], exact
+        if matches:
+            return None, False
+    return None, False
+
+
+def _future_deadline(when, current=None):
+    """
+    resolve_when() result, or None if that moment has already passed
+    """
+    deadline = resolve_when(when, current)
+    return deadline if deadline > _now() else None
+
+
+def build_plan(user, command):
+    """
+    Action plan (assistant.schema_prompt) for a parse_command result, or
+    None if it names no task of the user's or a deadline in the past. May
+    lower the confidence.
+    """
+    plan = assistant.empty_plan()
+    intent = command['intent']
+    if intent == 'create':
+        task = {'title': command['title']}
+        if command['when']:
+            deadline = _future_deadline(command['when'])
+            if deadline is None:
+                return None
+            task['deadline'] = deadline.isoformat()
+        if command['priority']:
+            task['priority'] = command['priority']
+        if command['category']:
+            name = command['category']
+            existing = next(
+                (c for c in TaskCategory.objects.visible_to(user) if c.name.lower() == name.lower()), None
+            )
+            if existing:
+                name = existing.name
+            else:
+                plan['categories'].append({'name': name[:1].upper() + name[1:]})
+                name = plan['categories'][0]['name']
+                # A bare "in X" may just be part of the title
+                command['confidence'] -= 0.1 if command['category_explicit'] else 0.25
+            task['category'] = name
+        plan['tasks'].append(task)
+        return plan
+
+    task, exact = _find_task(user, command['title'], intent)
+    if task is None:
+        return None
+    if not exact:
+        command['confidence'] -= 0.15
+    if intent == 'complete':
+        plan['update_tasks'] = [{'id': task.id, 'is_done': True}]
+    elif intent == 'delete':
+        plan['delete_tasks'] = [{'id': task.id}]
+    else:
+        deadline = _future_deadline(command['when'], task.deadline)
+        if deadline is None:
+            return None
+        plan['update_tasks'] = [{'id': task.id, 'deadline': deadline.isoformat()}]
+    return plan
+
+
+class FastPathStats:
+    """
+    Hit rate of the rule-based path and the provider time it saves, kept in
+    the metrics registry ('ai.intent.*')
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._messages = 0
+        self._hits = 0
+        self._provider_seconds = None
+
+    def record_provider_round(self, seconds):
+        """
+        Duration of the answer and plan calls for a message the rules didn't
+        take: what a hit saves (moving average)
+        """
+        with self._lock:
+            previous = self._provider_seconds
+            self._provider_seconds = seconds if previous is None else previous * 0.8 + seconds * 0.2
+
+    def record(self, outcome, seconds):
+        metrics.increment('ai.intent.messages', outcome=outcome)
+        metrics.observe('ai.intent.seconds', seconds)
+        with self._lock:
+            self._messages += 1
+            self._hits += outcome == 'hit'
+            hit_rate = self._hits / self._messages
+            saved = self._provider_seconds
+        metrics.set_gauge('ai.intent.hit_rate', hit_rate)
+        if outcome == 'hit' and saved is not None:
+            metrics.observe('ai.intent.saved_seconds', max(0.0, saved - seconds))
+
+
+stats = FastPathStats()
+
+
+def match_command(message):
+    """
+    parse_command() result for `message`, or None when it isn't a command
+    or the fast path is off. Needs no database: only a match is worth
+    passing on to command_plan().
+    """
+    if not message or not getattr(settings, 'AI_INTENT_FAST_PATH', True):
+        return None
+    started = time.perf_counter()
+    command = parse_command(message)
+    seconds = time.perf_counter() - started
+    if command is None:
+        stats.record('miss', seconds)
+        return None
+    command['parse_seconds'] = seconds
+    return command
+
+
+def command_plan(user, command):
+    """
+    Action plan for a match_command() result if it was recognized with at
+    least AI_INTENT_MIN_CONFIDENCE, else None (ask the model)
+    """
+    started = time.perf_counter()
+    plan = build_plan(user, command)
+    if plan is None or command['confidence'] < getattr(settings, 'AI_INTENT_MIN_CONFIDENCE', 0.8):
+        # A command, but not one for the rules (unknown task, unclear parts)
+        outcome, plan = 'low_confidence', None
+    else:
+        outcome = 'hit'
+    stats.record(outcome, command['parse_seconds'] + time.perf_counter() - started)
+    return plan
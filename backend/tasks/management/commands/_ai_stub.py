@@ -0,0 +1,150 @@
+"""
+Local OpenAI-compatible chat completions server used by the AI
+benchmark commands. Replies after a fixed latency: the action plan call
+(temperature 0) gets an empty plan, any other call a short answer. With
+"stream": true the answer is sent as chat.completion.chunk events, one word
+every `token_interval` seconds.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+EMPTY_PLAN = {'categories': [], 'tasks': []}
+STREAMED_ANSWER = 'Stub answer streamed to the client one word at a time.'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connection_opened()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        self.server.stub.request_started()
+        try:
+            time.sleep(self.server.stub.latency)
+        finally:
+            self.server.stub.request_served()
+        if body.get('temperature') == 0:
+            content = json.dumps(EMPTY_PLAN)
+        else:
+            content = STREAMED_ANSWER if body.get('stream') else 'Stub answer.'
+        if body.get('stream'):
+            return self.send_stream(body, content)
+        payload = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out before the reply was ready
+            self.close_connection = True
+
+    def send_stream(self, body, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        words = content.split(' ')
+        try:
+            for index, word in enumerate(words):
+                if index:
+                    time.sleep(self.server.stub.token_interval)
+                chunk = {
+                    'id': 'chatcmpl-stub',
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'delta': {'content': word if index == 0 else ' ' + word},
+                        'finish_reason': 'stop' if index == len(words) - 1 else None,
+                    }],
+                }
+                self.write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.write_chunk(b'data: [DONE]\n\n')
+            self.write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away mid-stream
+            self.server.stub.stream_aborted()
+            self.close_connection = True
+
+    def write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept bursts of connections from load tests
+    request_queue_size = 4096
+
+
+class StubOpenAIServer:
+    """
+    Context manager running the stub on 127.0.0.1 in a background thread
+    """
+
+    def __init__(self, latency=0.0, token_interval=0.01):
+        self.latency = latency
+        self.token_interval = token_interval
+        self.connections = 0
+        self.requests = 0
+        self.aborted_streams = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def request_started(self):
+        with self._lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def request_served(self):
+        with self._lock:
+            self.active -= 1
+            self.requests += 1
+
+    def stream_aborted(self):
+        with self._lock:
+            self.aborted_streams += 1
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._server.server_port}/v1'
+
+    def __enter__(self):
+        self._server = StubHTTPServer(('127.0.0.1', 0), StubHandler)
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,59 @@
+"""
+Synthetic data shared by the benchmark commands. Callers run inside a
+transaction and roll it back.
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from tasks.models import Task, TaskCategory
+
+
+def create_benchmark_tasks(count):
+    """
+    Create a throwaway user with `count` varied tasks; returns the user
+    """
+    user = get_user_model().objects.create_user(
+        email='benchmark@example.invalid',
+        username='benchmark',
+        password=None,
+        first_name='Bench',
+        last_name='Mark',
+    )
+    categories = [
+        TaskCategory.objects.create(name=f'Benchmark {i}', color='#3B82F6', owner=user)
+        for i in range(5)
+    ]
+    # Deadlines sit mid-day so days_until_deadline is stable across runs
+    now = timezone.now()
+    Task.objects.bulk_create(
+        [
+            Task(
+                user=user,
+                title=f'Benchmark task {i}',
+                description='Lorem ipsum dolor sit amet ' * (i % 4),
+                is_done=i % 3 == 0,
+                completed_at=now if i % 3 == 0 else None,
+                priority=('low', 'medium', 'high')[i % 3],
+                category=categories[i % 6] if i % 6 < 5 else None,
+                deadline=now + timedelta(days=i % 30 - 10, hours=12) if i % 4 else None,
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    return user
+
+
+def best_time(repeat, func):
+    """
+    Run func `repeat` times; return (last result, fastest wall time)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
@@ -0,0 +1,123 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from tasks import ai
+
+from ._ai_stub import StubOpenAIServer
+
+
+class Command(BaseCommand):
+    help = 'Compare a new OpenAI client per assist call with the shared client registry (sequential and concurrent calls) against a stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--calls', type=int, default=50,
+            help='Assist calls (two completions each) per mode'
+        )
+        parser.add_argument(
+            '--latency', type=float, default=0.0,
+            help='Stub server latency per completion, in milliseconds'
+        )
+        parser.add_argument(
+            '--token-interval', type=float, default=10.0,
+            help='Delay between streamed stub tokens, in milliseconds'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Use this OpenAI-compatible server instead of the local stub (e.g. an https endpoint)'
+        )
+
+    def handle(self, *args, **options):
+        if ai.OpenAI is None:
+            raise CommandError('The openai package is not installed')
+        calls = max(1, options['calls'])
+
+        if options['base_url']:
+            self.run(options['base_url'], calls, None)
+        else:
+            with StubOpenAIServer(
+                latency=options['latency'] / 1000, token_interval=options['token_interval'] / 1000
+            ) as stub:
+                self.run(stub.base_url, calls, stub)
+
+    def run(self, base_url, calls, stub):
+        api_key = 'sk-benchmark'
+
+        def completion(client, temperature, timeout=30):
+            return client.chat.completions.create(
+                model='stub',
+                messages=[{'role': 'user', 'content': 'Benchmark'}],
+                temperature=temperature,
+                max_tokens=16,
+                timeout=timeout,
+            )
+
+        def assist(client):
+            # The answer and the action plan calls made by ai_assist
+            for temperature in (0.2, 0):
+                completion(client, temperature)
+
+        def assist_concurrently(client):
+            ai.call_pool.run({
+                'answer': lambda remaining: completion(client, 0.2, remaining),
+                'plan': lambda remaining: completion(client, 0, remaining),
+            }, 30)
+
+        registry = ai.ClientRegistry(ai._create_client)
+        modes = (
+            # Previous behaviour: a client (and connection pool) per request
+            ('new client per request', assist, lambda: ai.OpenAI(api_key=api_key, base_url=base_url, timeout=30)),
+            ('shared client registry', assist, lambda: registry.get(base_url, api_key)),
+            ('registry, concurrent calls', assist_concurrently, lambda: registry.get(base_url, api_key)),
+        )
+        results = {}
+        for name, call, get_client in modes:
+            # Warm-up outside the measurement
+            call(get_client())
+            connections_before = stub.connections if stub else 0
+            timings = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                call(get_client())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.mean(timings)
+            timings.sort()
+            line = (
+                f'{name:>26}: mean {results[name]:7.2f} ms, p50 {timings[len(timings) // 2]:7.2f} ms, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms per assist'
+            )
+            if stub:
+                line += f', {stub.connections - connections_before} connections opened'
+            self.stdout.write(line)
+        # Streamed answer (ai_assist with Accept: text/event-stream)
+        client = registry.get(base_url, api_key)
+        first_token, full = [], []
+        for _ in range(calls):
+            start = time.perf_counter()
+            stream = client.chat.completions.create(
+                model='stub',
+                messages=[{'role': 'user', 'content': 'Benchmark'}],
+                temperature=0.2,
+                max_tokens=16,
+                timeout=30,
+                stream=True,
+            )
+            first = None
+            with stream:
+                for chunk in stream:
+                    if first is None and chunk.choices and chunk.choices[0].delta.content:
+                        first = time.perf_counter() - start
+            first_token.append(first * 1000)
+            full.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f'{"streamed answer":>26}: first token {statistics.mean(first_token):7.2f} ms, '
+            f'full reply {statistics.mean(full):7.2f} ms'
+        )
+        registry.clear()
+
+        baseline, pooled, concurrent = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            f'Shared client saves {baseline - pooled:.2f} ms per assist call ({baseline / pooled:.1f}x), '
+            f'concurrent calls {baseline - concurrent:.2f} ms ({baseline / concurrent:.1f}x)'
+        ))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from tasks.models import Task
+from tasks.serializers import TaskListSerializer
+from todo_project.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+from ._benchmark import best_time, create_benchmark_tasks
+
+
+class Command(BaseCommand):
+    help = 'Compare encode time and payload size of the API renderers on TaskListSerializer output (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, action='append', dest='sizes',
+            help='Number of tasks per run (repeatable, default 1000 and 10000)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per renderer; the best time is reported'
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['sizes'] or [1000, 10000]
+        repeat = max(1, options['repeat'])
+        renderers = [('json (stdlib)', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('json (orjson)', ORJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed, skipping ORJSONRenderer'))
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('msgpack is not installed, skipping MessagePackRenderer'))
+
+        with transaction.atomic():
+            user = create_benchmark_tasks(max(sizes))
+            queryset = Task.objects.filter(user=user).select_related('category', 'user').order_by('-created_at', '-id')
+
+            for size in sizes:
+                data = TaskListSerializer(queryset[:size], many=True).data
+                baseline = baseline_body = None
+                for name, renderer in renderers:
+                    body, elapsed = best_time(repeat, lambda: renderer.render(data))
+                    if baseline is None:
+                        baseline, baseline_body = elapsed, body
+                    note = ''
+                    if renderer.media_type == 'application/json' and body is not baseline_body:
+                        note = ', identical' if body == baseline_body else ', DIFFERS from stdlib'
+                    self.stdout.write(
+                        f'{size:>6} rows {name:<14} {elapsed * 1000:>8.2f} ms '
+                        f'({baseline / elapsed:.1f}x), {len(body):>10,} bytes{note}'
+                    )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
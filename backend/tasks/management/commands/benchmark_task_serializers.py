@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from tasks.models import Task
+from tasks.serializers import TaskListRowSerializer, TaskListSerializer
+
+from ._benchmark import best_time, create_benchmark_tasks
+
+
+class Command(BaseCommand):
+    help = 'Compare TaskListSerializer with the .values() fast path on synthetic tasks (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, action='append', dest='sizes',
+            help='Number of tasks per run (repeatable, default 1000 and 10000)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Runs per size; the best time is reported'
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['sizes'] or [1000, 10000]
+        repeat = max(1, options['repeat'])
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            user = create_benchmark_tasks(max(sizes))
+            queryset = Task.objects.filter(user=user).order_by('-created_at', '-id')
+
+            for size in sizes:
+                rows = queryset[:size]
+                baseline, baseline_time = best_time(repeat, lambda: renderer.render(
+                    TaskListSerializer(rows.select_related('category', 'user'), many=True).data
+                ))
+                fast, fast_time = best_time(repeat, lambda: renderer.render(
+                    TaskListRowSerializer(TaskListRowSerializer.values(rows), user=user).data
+                ))
+                if fast != baseline:
+                    raise CommandError(f'Fast path output differs from TaskListSerializer at {size} rows')
+                self.stdout.write(
+                    f'{size:>6} rows: serializer {size / baseline_time:>10,.0f} rows/s, '
+                    f'fast path {size / fast_time:>10,.0f} rows/s '
+                    f'({baseline_time / fast_time:.1f}x), {len(fast):,} bytes identical'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from tasks.models import TaskCounters, TaskTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones past the retention window and expire older sync tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=getattr(settings, 'TASKS_SYNC_TOMBSTONE_RETENTION_DAYS', 30),
+            help='Keep tombstones newer than this many days'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(days=max(0, options['days']))
+        with transaction.atomic():
+            expired = TaskTombstone.objects.filter(deleted_at__lt=cutoff)
+            floors = expired.values('user_id').order_by().annotate(max_seq=Max('sync_seq'))
+            for row in floors:
+                # Tokens below the highest compacted tombstone can no longer
+                # be served incrementally (see tasks.sync.get_changes)
+                TaskCounters.objects.filter(user_id=row['user_id']).update(
+                    sync_floor=Greatest('sync_floor', row['max_seq'])
+                )
+            deleted, _ = expired.delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Compacted {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}')
+        )
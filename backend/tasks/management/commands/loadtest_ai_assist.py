@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import resolve
+from asgiref.sync import iscoroutinefunction
+from authentication.models import User
+from rest_framework_simplejwt.tokens import AccessToken
+from tasks import ai
+from tasks.models import ChatSession
+
+from ._ai_stub import StubOpenAIServer
+
+
+ASSIST_PATH = '/api/tasks/ai/assist/'
+
+
+class Command(BaseCommand):
+    help = (
+        'Send many concurrent ai_assist requests through the ASGI application in this '
+        'process (one event loop) against a stub provider. Needs AI_ASYNC_VIEWS=true.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Assist requests to send')
+        parser.add_argument(
+            '--latency', type=float, default=3000.0,
+            help='Stub provider latency per completion, in milliseconds'
+        )
+        parser.add_argument(
+            '--ramp', type=float, default=2000.0,
+            help='Requests start evenly spread over this many milliseconds'
+        )
+        parser.add_argument('--stream', action='store_true', help='Ask for text/event-stream replies')
+
+    def handle(self, *args, **options):
+        if not iscoroutinefunction(resolve(ASSIST_PATH).func):
+            raise CommandError('ai_assist is served by the sync view: run with AI_ASYNC_VIEWS=true')
+        count = max(1, options['requests'])
+
+        # Throwaway user; each request continues its own chat (no retention pass)
+        user = User.objects.create_user(
+            f'loadtest-{os.getpid()}-{time.time_ns()}@example.invalid',
+            username=f'loadtest-{os.getpid()}',
+            first_name='Load',
+            last_name='Test',
+        )
+        environ = {name: os.environ.get(name) for name in ('OPENAI_API_KEY', 'OPENAI_BASE_URL')}
+        try:
+            sessions = ChatSession.objects.bulk_create(
+                ChatSession(user=user, title=f'Load test {index}') for index in range(count)
+            )
+            token = str(AccessToken.for_user(user))
+            with StubOpenAIServer(latency=options['latency'] / 1000) as stub:
+                os.environ['OPENAI_API_KEY'] = 'sk-loadtest'
+                os.environ['OPENAI_BASE_URL'] = stub.base_url
+                ai.reset_provider()
+                # One provider connection per in-flight call
+                with override_settings(AI_HTTP_MAX_CONNECTIONS=2 * count):
+                    report = asyncio.run(self.drive(
+                        get_asgi_application(), token, [s.pk for s in sessions],
+                        options['ramp'] / 1000, options['stream'],
+                    ))
+                report['provider_peak'] = stub.peak_active
+        finally:
+            for name, value in environ.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            ai.reset_provider()
+            user.delete()
+
+        latencies = sorted(report['latencies'])
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        self.stdout.write(
+            f'{count} assist requests started over {options["ramp"]:.0f} ms, '
+            f'{options["latency"]:.0f} ms provider latency, one process and event loop'
+        )
+        self.stdout.write(
+            f'  in flight at once: {report["peak"]} requests, {report["provider_peak"]} provider calls'
+        )
+        self.stdout.write(
+            f'  wall time {report["wall"]:.2f} s, {count / report["wall"]:.0f} requests/s; '
+            f'latency p50 {percentile(0.5):.2f} s, p95 {percentile(0.95):.2f} s, '
+            f'p99 {percentile(0.99):.2f} s, mean {statistics.mean(latencies):.2f} s'
+        )
+        self.stdout.write(
+            f'  peak threads: {report["threads"]} excluding the stub server '
+            f'({report["db_threads"]} with a database connection)'
+        )
+        statuses = dict(sorted(report['statuses'].items(), key=lambda item: str(item[0])))
+        style = self.style.SUCCESS if set(statuses) == {200} else self.style.WARNING
+        self.stdout.write(style(f'  statuses: {statuses}'))
+
+    async def drive(self, application, token, session_ids, ramp, stream):
+        count = len(session_ids)
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+        state = {'in_flight': 0, 'peak': 0, 'threads': 0, 'db_threads': 0}
+        latencies = []
+        statuses = Counter()
+
+        async def assist(index):
+            await asyncio.sleep(ramp * index / count)
+            body = json.dumps({'message': 'Что мне сделать сегодня?', 'chat_id': session_ids[index]}).encode()
+            headers = [
+                (b'host', host.encode()),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'authorization', f'Bearer {token}'.encode()),
+            ]
+            if stream:
+                headers.append((b'accept', b'text/event-stream'))
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'POST',
+                'scheme': 'http',
+                'path': ASSIST_PATH,
+                'raw_path': ASSIST_PATH.encode(),
+                'root_path': '',
+                'query_string': b'',
+                'headers': headers,
+                'client': ('127.0.0.1', 40000 + index % 20000),
+                'server': (host, 80),
+            }
+            finished = asyncio.Event()
+            body_sent = False
+            status_code = None
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+                # The client stays connected until the whole response arrived
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal status_code
+                if message['type'] == 'http.response.start':
+                    status_code = message['status']
+                elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                    finished.set()
+
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            start = time.perf_counter()
+            try:
+                await application(scope, receive, send)
+            except Exception as exc:
+                status_code = type(exc).__name__
+            finally:
+                state['in_flight'] -= 1
+                finished.set()
+            latencies.append(time.perf_counter() - start)
+            statuses[status_code] += 1
+
+        async def monitor():
+            while True:
+                threads = [t.name for t in threading.enumerate() if 'process_request_thread' not in t.name]
+                state['threads'] = max(state['threads'], len(threads))
+                state['db_threads'] = max(state['db_threads'], sum(1 for name in threads if name.startswith('ai-db')))
+                await asyncio.sleep(0.05)
+
+        watcher = asyncio.ensure_future(monitor())
+        started = time.perf_counter()
+        await asyncio.gather(*(assist(index) for index in range(count)))
+        wall = time.perf_counter() - started
+        watcher.cancel()
+        return {
+            'peak': state['peak'],
+            'threads': state['threads'],
+            'db_threads': state['db_threads'],
+            'latencies': latencies,
+            'statuses': statuses,
+            'wall': wall,
+        }
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from tasks.models import TaskCategory
+from django.db import transaction
+from tasks.models import TaskCategory, TaskCounters
 
 
 class Command(BaseCommand):
@@ -19,25 +20,34 @@ class Command(BaseCommand):
             },
         ]
         
+        # Insert the missing ones in one statement: TaskCategory.save()
+        # would bump every user's data version once per category
+        existing = set(
+            TaskCategory.objects.filter(
+                owner=None, name__in=[data['name'] for data in categories]
+            ).values_list('name', flat=True)
+        )
         created_count = 0
+        new_categories = []
         for category_data in categories:
-            # Create as global (owner=None)
-            category, created = TaskCategory.objects.get_or_create(
-                name=category_data['name'], owner=None,
-                defaults={
-                    'color': category_data['color'],
-                    'description': category_data['description']
-                }
-            )
-            if created:
-                created_count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created category: {category.name}')
-                )
-            else:
+            if category_data['name'] in existing:
                 self.stdout.write(
-                    self.style.WARNING(f'Category already exists: {category.name}')
+                    self.style.WARNING(f'Category already exists: {category_data["name"]}')
                 )
+                continue
+            # Create as global (owner=None)
+            new_categories.append(TaskCategory(owner=None, **category_data))
+            created_count += 1
+            self.stdout.write(
+                self.style.SUCCESS(f'Created category: {category_data["name"]}')
+            )
+        
+        with transaction.atomic():
+            TaskCategory.objects.bulk_create(new_categories, ignore_conflicts=True)
+            TaskCounters.objects.bump_version(None)
+        # Make every worker reload global categories, including rows
+        # changed outside the ORM
+        TaskCategory.objects.invalidate_cache(None)
         
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tasks.models import TaskCounters, TaskDailyActivity
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user task counters and daily activity from the tasks table and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only rebuild counters for this user id (repeatable)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted counters without writing'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Users processed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if user_ids is None:
+            user_ids = list(get_user_model().objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+
+        checked = repaired = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                current = {
+                    c.user_id: c
+                    for c in TaskCounters.objects.select_for_update().filter(user_id__in=batch)
+                }
+                computed = TaskCounters.objects.compute(batch)
+                activity = TaskDailyActivity.objects.compute(batch)
+                stored_activity = {}
+                for row in TaskDailyActivity.objects.select_for_update().filter(user_id__in=batch):
+                    if row.created or row.completed:
+                        stored_activity.setdefault(row.user_id, {})[row.date] = [row.created, row.completed]
+                for user_id in batch:
+                    checked += 1
+                    if self.repair_activity(user_id, activity.get(user_id, {}), stored_activity.get(user_id, {}), dry_run):
+                        repaired += 1
+                    values = computed.get(user_id, {})
+                    expected = {
+                        field: values.get(field, {} if field == 'by_category' else 0)
+                        for field in TaskCounters.COUNTER_FIELDS
+                    }
+                    counters = current.get(user_id)
+                    if counters is not None and all(
+                        getattr(counters, field) == value for field, value in expected.items()
+                    ):
+                        continue
+                    repaired += 1
+                    self.stdout.write(
+                        self.style.WARNING(f'Counters drifted for user {user_id}')
+                    )
+                    if not dry_run:
+                        TaskCounters.objects.update_or_create(user_id=user_id, defaults=expected)
+
+        verb = 'would be repaired' if dry_run else 'repaired'
+        self.stdout.write(
+            self.style.SUCCESS(f'Checked {checked} users, {repaired} drifted records {verb}')
+        )
+
+    def repair_activity(self, user_id, expected, stored, dry_run):
+        """
+        Replace the user's daily activity rows if they differ from expected
+        """
+        if dict(expected) == stored:
+            return False
+        self.stdout.write(
+            self.style.WARNING(f'Daily activity drifted for user {user_id}')
+        )
+        if not dry_run:
+            TaskDailyActivity.objects.filter(user_id=user_id).delete()
+            TaskDailyActivity.objects.bulk_create([
+                TaskDailyActivity(user_id=user_id, date=day, created=created, completed=completed)
+                for day, (created, completed) in expected.items()
+            ])
+        return True
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_alter_user_managers_alter_user_username'),
+        ('tasks', '0006_task_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('overdue_eligible', models.IntegerField(default=0, help_text='Pending tasks that have a deadline')),
+                ('low', models.IntegerField(default=0)),
+                ('medium', models.IntegerField(default=0)),
+                ('high', models.IntegerField(default=0)),
+                ('by_category', models.JSONField(default=dict, help_text='Task count per category id ("none" for uncategorized)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Task Counters',
+                'verbose_name_plural': 'Task Counters',
+                'db_table': 'task_counters',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_activity(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskDailyActivity = apps.get_model('tasks', 'TaskDailyActivity')
+    rows = {}
+    created = Task.objects.annotate(day=TruncDate('created_at')).values('user_id', 'day').order_by().annotate(n=Count('id'))
+    for r in created:
+        rows.setdefault((r['user_id'], r['day']), [0, 0])[0] += r['n']
+    completed = Task.objects.filter(is_done=True, completed_at__isnull=False).annotate(
+        day=TruncDate('completed_at')
+    ).values('user_id', 'day').order_by().annotate(n=Count('id'))
+    for r in completed:
+        rows.setdefault((r['user_id'], r['day']), [0, 0])[1] += r['n']
+    TaskDailyActivity.objects.bulk_create(
+        [
+            TaskDailyActivity(user_id=user_id, date=day, created=c, completed=d)
+            for (user_id, day), (c, d) in rows.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Task Daily Activity',
+                'verbose_name_plural': 'Task Daily Activity',
+                'db_table': 'task_daily_activity',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_activity_per_user_day')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, reverse_code=migrations.RunPython.noop),
+    ]
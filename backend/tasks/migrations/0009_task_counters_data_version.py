@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_task_daily_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcounters',
+            name='data_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When data_version was last incremented'),
+        ),
+        migrations.AddField(
+            model_name='taskcounters',
+            name='data_version',
+            field=models.BigIntegerField(default=0, help_text='Incremented on every task or category write'),
+        ),
+    ]
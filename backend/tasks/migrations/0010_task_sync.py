@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:30
+
+import django.db.models.deletion
+import django.utils.timezone
+import tasks.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_counters_data_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE IF NOT EXISTS task_sync_seq',
+            reverse_sql='DROP SEQUENCE IF EXISTS task_sync_seq',
+        ),
+        migrations.CreateModel(
+            name='TaskTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sync_seq', models.BigIntegerField(db_default=tasks.models.NextVal('task_sync_seq'))),
+            ],
+            options={
+                'db_table': 'task_tombstones',
+                'ordering': ['sync_seq'],
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='sync_seq',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Position of the last write in the delta sync stream'),
+        ),
+        migrations.RunSQL(
+            "UPDATE tasks SET sync_seq = nextval('task_sync_seq')",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='taskcounters',
+            name='sync_floor',
+            field=models.BigIntegerField(default=0, help_text='Highest tombstone sync_seq compacted away; older sync tokens are expired'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'sync_seq'], name='tasks_user_sync_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='tasktombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['user', 'sync_seq'], name='tombstones_user_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasktombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstones_deleted_at_idx'),
+        ),
+    ]
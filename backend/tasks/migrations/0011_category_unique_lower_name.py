@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:48
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+def rename_case_duplicates(apps, schema_editor):
+    """
+    Categories whose names differ only in case under the same owner would
+    violate the new constraints: keep the oldest, suffix the others.
+    """
+    TaskCategory = apps.get_model('tasks', 'TaskCategory')
+    seen = {}
+    taken = set(TaskCategory.objects.values_list('owner_id', 'name'))
+    for category in TaskCategory.objects.order_by('created_at', 'id'):
+        key = (category.owner_id, category.name.lower())
+        if key not in seen:
+            seen[key] = category.pk
+            continue
+        n = 2
+        while True:
+            suffix = f' ({n})'
+            name = category.name[:50 - len(suffix)] + suffix
+            if (category.owner_id, name.lower()) not in seen and (category.owner_id, name) not in taken:
+                break
+            n += 1
+        category.name = name
+        category.save(update_fields=['name'])
+        seen[(category.owner_id, name.lower())] = category.pk
+        taken.add((category.owner_id, name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_case_duplicates, reverse_code=migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='taskcategory',
+            name='unique_category_per_owner',
+        ),
+        migrations.AddConstraint(
+            model_name='taskcategory',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), models.F('owner'), name='unique_category_name_per_owner'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskcategory',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), condition=models.Q(('owner__isnull', True)), name='unique_global_category_name'),
+        ),
+    ]
@@ -1,8 +1,125 @@
-from django.db import models
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Cast, Lower, TruncDate, Upper
 from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils import timezone
 
 
+class TaskCategoryManager(models.Manager):
+    """
+    Manager with a cache of the categories visible to each user.
+
+    Global categories are kept in process memory, each user's own
+    categories in the Django cache; both are keyed by a version stored in
+    the cache and replaced on commit of any category write (and by
+    populate_categories), so readers reload on their next access.
+    TASKS_CATEGORY_CACHE_TIMEOUT bounds staleness if a bump is lost.
+
+    The versions must be seen by every process (other workers, management
+    commands), so the cache is only used with a shared backend; with a
+    per-process one (LocMemCache, the default) categories are read from
+    the database on every call.
+    """
+    GLOBAL_VERSION_KEY = 'task_categories:global:version'
+    USER_VERSION_KEY = 'task_categories:user:{}:version'
+    USER_ROWS_KEY = 'task_categories:user:{}:{}'
+
+    def __init__(self):
+        super().__init__()
+        # (version, loaded at, rows) of the global categories
+        self._global_snapshot = None
+
+    def _field_names(self):
+        return [field.attname for field in self.model._meta.concrete_fields]
+
+    def _timeout(self):
+        return getattr(settings, 'TASKS_CATEGORY_CACHE_TIMEOUT', 300)
+
+    def cache_enabled(self):
+        """
+        Whether the cache backend is shared by all processes
+        """
+        return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+    def _rows(self, user_id):
+        if not self.cache_enabled():
+            return tuple(
+                self.filter(Q(owner__isnull=True) | Q(owner_id=user_id)).values_list(*self._field_names())
+            )
+        return self._global_rows() + self._user_rows(user_id)
+
+    def _get_version(self, key):
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+        return version
+
+    def _global_rows(self):
+        version = self._get_version(self.GLOBAL_VERSION_KEY)
+        snapshot = self._global_snapshot
+        if snapshot is None or snapshot[0] != version or time.monotonic() - snapshot[1] > self._timeout():
+            rows = tuple(self.filter(owner__isnull=True).values_list(*self._field_names()))
+            snapshot = self._global_snapshot = (version, time.monotonic(), rows)
+        return snapshot[2]
+
+    def _user_rows(self, user_id):
+        version = self._get_version(self.USER_VERSION_KEY.format(user_id))
+        key = self.USER_ROWS_KEY.format(user_id, version)
+        rows = cache.get(key)
+        if rows is None:
+            rows = tuple(self.filter(owner_id=user_id).values_list(*self._field_names()))
+            cache.set(key, rows, self._timeout())
+        return rows
+
+    def visible_to(self, user):
+        """
+        Global and user-owned categories, ordered by name, from the cache
+        when it is enabled.
+        Instances are built per call, so callers may modify them.
+        """
+        field_names = self._field_names()
+        name_index = field_names.index('name')
+        rows = sorted(
+            self._rows(user.pk),
+            key=lambda row: (row[name_index].casefold(), row[name_index])
+        )
+        return [self.model.from_db(self.db, field_names, row) for row in rows]
+
+    def get_visible(self, user, pk):
+        """
+        The category with this id if the user may use it, else None
+        """
+        field_names = self._field_names()
+        pk_index = field_names.index(self.model._meta.pk.attname)
+        for row in self._rows(user.pk):
+            if row[pk_index] == pk:
+                return self.model.from_db(self.db, field_names, row)
+        return None
+
+    def invalidate_cache(self, owner_id):
+        """
+        Drop cached categories of owner_id (None: global categories) once
+        the current transaction commits
+        """
+        def bump():
+            if owner_id is None:
+                self._global_snapshot = None
+                cache.set(self.GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
+            else:
+                cache.set(self.USER_VERSION_KEY.format(owner_id), uuid.uuid4().hex, None)
+        transaction.on_commit(bump, using=self.db)
+
+
 class TaskCategory(models.Model):
     """
     Model for task categories
@@ -33,17 +150,156 @@ class TaskCategory(models.Model):
         default=timezone.now
     )
     
+    objects = TaskCategoryManager()
+    
     class Meta:
         db_table = 'task_categories'
         verbose_name = 'Task Category'
         verbose_name_plural = 'Task Categories'
         ordering = ['name']
         constraints = [
-            models.UniqueConstraint(fields=['name', 'owner'], name='unique_category_per_owner')
+            # Case-insensitive; NULL owners are distinct, so globals get their own index
+            models.UniqueConstraint(Lower('name'), 'owner', name='unique_category_name_per_owner'),
+            models.UniqueConstraint(
+                Lower('name'),
+                condition=Q(owner__isnull=True),
+                name='unique_global_category_name'
+            ),
         ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        """
+        Override save method to invalidate cached task/category responses
+        (and resync tasks in the category, whose payloads embed it)
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not adding:
+                TaskTombstone.objects.touch(Task.objects.filter(category_id=self.pk))
+            TaskCounters.objects.bump_version(self.owner_id)
+            TaskCategory.objects.invalidate_cache(self.owner_id)
+    
+    def delete(self, *args, **kwargs):
+        """
+        Override delete method to invalidate cached task/category responses
+        (tasks in the category are SET_NULL, and resynced)
+        """
+        owner_id = self.owner_id
+        with transaction.atomic():
+            task_ids = list(Task.objects.select_for_update().filter(category_id=self.pk).values_list('pk', flat=True))
+            result = super().delete(*args, **kwargs)
+            TaskTombstone.objects.touch(Task.objects.filter(pk__in=task_ids))
+            TaskCounters.objects.bump_version(owner_id)
+            TaskCategory.objects.invalidate_cache(owner_id)
+        return result
+
+
+# Sequence shared by Task.sync_seq and TaskTombstone.sync_seq (delta sync)
+TASK_SYNC_SEQUENCE = 'task_sync_seq'
+
+
+class NextVal(models.Func):
+    """
+    nextval() of a PostgreSQL sequence
+    """
+    function = 'nextval'
+    output_field = models.BigIntegerField()
+
+    def __init__(self, sequence, **extra):
+        super().__init__(models.Value(sequence), **extra)
+
+
+# Task columns that derived per-user data (counters, ...) is computed from
+TRACKED_TASK_FIELDS = (
+    'id', 'user_id', 'is_done', 'priority', 'category_id',
+    'deadline', 'created_at', 'completed_at',
+)
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    QuerySet with set-based writes that keep derived per-user data in sync.
+    Use these instead of update()/delete() whenever tracked fields change.
+    """
+
+    def tracked_update(self, **kwargs):
+        """
+        UPDATE the selected tasks and record the changes. Returns row count.
+
+        Runs as a single UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING
+        statement, so both the old and the new state of every row come back
+        with the write itself. Values must be plain values, not expressions.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        kwargs.setdefault('updated_at', timezone.now())
+        assignments, params = [], []
+        for name, value in kwargs.items():
+            field = self.model._meta.get_field(name)
+            if isinstance(value, models.Model):
+                value = value.pk
+            assignments.append(f'{quote(field.column)} = %s')
+            params.append(field.get_db_prep_save(value, connection))
+        columns = [quote(name) for name in TRACKED_TASK_FIELDS]
+
+        with transaction.atomic(using=self.db):
+            inner_sql, inner_params = (
+                self.select_for_update(of=('self',)).order_by()
+                .values(*TRACKED_TASK_FIELDS).query.sql_with_params()
+            )
+            sql = (
+                f'UPDATE {quote(self.model._meta.db_table)} AS new '
+                f'SET {", ".join(assignments)} '
+                f'FROM ({inner_sql}) AS old '
+                f'WHERE new.{quote("id")} = old.{quote("id")} '
+                f'RETURNING {", ".join("old." + column for column in columns)}, '
+                f'{", ".join("new." + column for column in columns)}'
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params + list(inner_params))
+                rows = cursor.fetchall()
+            size = len(TRACKED_TASK_FIELDS)
+            record_task_changes(
+                (dict(zip(TRACKED_TASK_FIELDS, row[:size])), dict(zip(TRACKED_TASK_FIELDS, row[size:])))
+                for row in rows
+            )
+        return len(rows)
+
+    def tracked_delete(self):
+        """
+        DELETE the selected tasks and record the changes. Returns row count.
+
+        Runs as a single DELETE ... RETURNING statement. Nothing references
+        tasks, so skipping Django's delete collector loses no cascades.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        with transaction.atomic(using=self.db):
+            inner_sql, inner_params = self.order_by().values('pk').query.sql_with_params()
+            sql = (
+                f'DELETE FROM {quote(self.model._meta.db_table)} '
+                f'WHERE {quote("id")} IN ({inner_sql}) '
+                f'RETURNING {", ".join(quote(name) for name in TRACKED_TASK_FIELDS)}'
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, inner_params)
+                rows = cursor.fetchall()
+            record_task_changes((dict(zip(TRACKED_TASK_FIELDS, row)), None) for row in rows)
+        return len(rows)
+
+
+class TaskManager(models.Manager.from_queryset(TaskQuerySet)):
+    """
+    Default Task manager. search_vector is only read inside the database
+    (search filters and ranking), so loading it into Python is skipped.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
 
 
 class Task(models.Model):
@@ -107,6 +363,27 @@ class Task(models.Model):
         null=True,
         help_text='When the task was completed'
     )
+    search_vector = models.GeneratedField(
+        # Russian + English stemming over title (weight A) and description (weight B)
+        expression=(
+            SearchVector('title', weight='A', config='russian')
+            + SearchVector('title', weight='A', config='english')
+            + SearchVector('description', weight='B', config='russian')
+            + SearchVector('description', weight='B', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        help_text='Full-text search document maintained by the database'
+    )
+    # Not sent back by INSERT ... RETURNING either (see TaskManager)
+    search_vector.db_returning = False
+    sync_seq = models.BigIntegerField(
+        default=0,
+        editable=False,
+        help_text='Position of the last write in the delta sync stream'
+    )
+    
+    objects = TaskManager()
     
     class Meta:
         db_table = 'tasks'
@@ -118,6 +395,22 @@ class Task(models.Model):
             models.Index(fields=['user', 'category']),
             models.Index(fields=['deadline']),
             models.Index(fields=['created_at']),
+            # Keyset pagination: one index per orderable column, id as tiebreaker
+            models.Index(fields=['user', 'created_at', 'id'], name='tasks_user_created_id_idx'),
+            models.Index(fields=['user', 'deadline', 'id'], name='tasks_user_deadline_id_idx'),
+            models.Index(fields=['user', 'priority', 'id'], name='tasks_user_priority_id_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='tasks_user_title_id_idx'),
+            # Full-text search and substring (icontains -> UPPER(col) LIKE) matching
+            GinIndex(fields=['search_vector'], name='tasks_search_vector_gin'),
+            models.Index(fields=['user', 'sync_seq'], name='tasks_user_sync_seq_idx'),
+            GinIndex(
+                OpClass(Upper(Cast('title', models.TextField())), name='gin_trgm_ops'),
+                name='tasks_title_trgm_idx',
+            ),
+            GinIndex(
+                OpClass(Upper(Cast('description', models.TextField())), name='gin_trgm_ops'),
+                name='tasks_description_trgm_idx',
+            ),
         ]
     
     def __str__(self):
@@ -127,13 +420,42 @@ class Task(models.Model):
     def save(self, *args, **kwargs):
         """
         Override save method to set completed_at timestamp
+        and keep derived per-user data in sync
         """
         if self.is_done and not self.completed_at:
             self.completed_at = timezone.now()
         elif not self.is_done and self.completed_at:
             self.completed_at = None
         
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            before = self._locked_tracked_state()
+            super().save(*args, **kwargs)
+            record_task_changes([(before, self.get_tracked_state())])
+    
+    def delete(self, *args, **kwargs):
+        """
+        Override delete method to keep derived per-user data in sync
+        """
+        with transaction.atomic():
+            before = self._locked_tracked_state()
+            result = super().delete(*args, **kwargs)
+            if before is not None:
+                record_task_changes([(before, None)])
+        return result
+    
+    def get_tracked_state(self):
+        """
+        Current values of TRACKED_TASK_FIELDS as a dict
+        """
+        return {name: getattr(self, name) for name in TRACKED_TASK_FIELDS}
+    
+    def _locked_tracked_state(self):
+        """
+        Stored values of TRACKED_TASK_FIELDS, row locked until commit
+        """
+        if self.pk is None:
+            return None
+        return Task.objects.select_for_update().filter(pk=self.pk).values(*TRACKED_TASK_FIELDS).first()
     
     @property
     def is_overdue(self):
@@ -172,6 +494,404 @@ class Task(models.Model):
         return colors.get(self.priority, '#6B7280')  # Gray default
 
 
+class TaskCountersManager(models.Manager):
+    """
+    Manager for maintaining and reading per-user task counters
+    """
+
+    def for_user(self, user):
+        """
+        Counters row for the user, rebuilt from the tasks table if missing
+        """
+        counters = self.filter(user=user).first()
+        if counters is None:
+            counters = self.recompute(user.pk)
+        return counters
+
+    def compute(self, user_ids=None):
+        """
+        Compute counter values from the tasks table with two grouped
+        queries. Returns {user_id: {field: value}}; users without tasks
+        are omitted.
+        """
+        tasks = Task.objects.all()
+        if user_ids is not None:
+            tasks = tasks.filter(user_id__in=user_ids)
+        results = {}
+        totals = tasks.values('user_id').order_by().annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(is_done=True)),
+            overdue_eligible=Count('id', filter=Q(is_done=False, deadline__isnull=False)),
+            low=Count('id', filter=Q(priority='low')),
+            medium=Count('id', filter=Q(priority='medium')),
+            high=Count('id', filter=Q(priority='high')),
+        )
+        for row in totals:
+            user_id = row.pop('user_id')
+            results[user_id] = dict(row, by_category={})
+        per_category = tasks.values('user_id', 'category_id').order_by().annotate(count=Count('id'))
+        for row in per_category:
+            results[row['user_id']]['by_category'][TaskCounters.category_key(row['category_id'])] = row['count']
+        return results
+
+    def counter_values(self, user_id):
+        """
+        One user's COUNTER_FIELDS values from the tasks table
+        """
+        values = self.compute([user_id]).get(user_id, {})
+        return {
+            field: values.get(field, {} if field == 'by_category' else 0)
+            for field in TaskCounters.COUNTER_FIELDS
+        }
+
+    def recompute(self, user_id):
+        """
+        Rebuild one user's counters row from the tasks table
+        """
+        counters, _ = self.update_or_create(user_id=user_id, defaults=self.counter_values(user_id))
+        return counters
+
+    def apply_changes(self, user_id, changes):
+        """
+        Apply (before, after) tracked-state pairs of one user's tasks.
+        Must run inside the transaction that wrote the tasks.
+        """
+        delta = Counter()
+        for before, after in changes:
+            if before is not None:
+                delta.subtract(TaskCounters.state_counts(before))
+            if after is not None:
+                delta.update(TaskCounters.state_counts(after))
+        counters = self.select_for_update().filter(user_id=user_id).first()
+        if counters is None:
+            # First write since counters were introduced: the tasks table
+            # already reflects this change, so build the row from it. A
+            # concurrent first write can't be locked out (there is no row
+            # yet); if it inserts first, our INSERT fails once it commits
+            # and this change is applied to its row instead.
+            try:
+                with transaction.atomic():
+                    self.create(user_id=user_id, **self.counter_values(user_id))
+                return
+            except IntegrityError:
+                counters = self.select_for_update().get(user_id=user_id)
+        by_category = dict(counters.by_category)
+        for key, value in delta.items():
+            if not value:
+                continue
+            if key.startswith('category:'):
+                category_key = key.split(':', 1)[1]
+                count = by_category.get(category_key, 0) + value
+                if count:
+                    by_category[category_key] = count
+                else:
+                    by_category.pop(category_key, None)
+            else:
+                setattr(counters, key, getattr(counters, key) + value)
+        counters.by_category = by_category
+        counters.data_version += 1
+        counters.data_changed_at = timezone.now()
+        counters.save()
+
+    def bump_version(self, user_id):
+        """
+        Mark the user's task/category data as changed.
+        user_id=None (global category change) bumps every user.
+        """
+        rows = self.all() if user_id is None else self.filter(user_id=user_id)
+        rows.update(data_version=F('data_version') + 1, data_changed_at=timezone.now())
+
+    def get_version(self, user):
+        """
+        (data_version, data_changed_at) for the user in a single query
+        """
+        version = self.filter(user=user).values_list('data_version', 'data_changed_at').first()
+        if version is None:
+            counters = self.for_user(user)
+            version = (counters.data_version, counters.data_changed_at)
+        return version
+
+
+class TaskCounters(models.Model):
+    """
+    Denormalized per-user task counts, kept in sync on every task write
+    by record_task_changes(). Rebuild with `manage.py rebuild_task_counters`.
+    Also carries the user's data version, bumped on any task or category
+    write, which drives conditional GET (see tasks.conditional).
+    """
+    COUNTER_FIELDS = ('total', 'completed', 'overdue_eligible', 'low', 'medium', 'high', 'by_category')
+    NO_CATEGORY_KEY = 'none'
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='task_counters'
+    )
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    overdue_eligible = models.IntegerField(
+        default=0,
+        help_text='Pending tasks that have a deadline'
+    )
+    low = models.IntegerField(default=0)
+    medium = models.IntegerField(default=0)
+    high = models.IntegerField(default=0)
+    by_category = models.JSONField(
+        default=dict,
+        help_text='Task count per category id ("none" for uncategorized)'
+    )
+    data_version = models.BigIntegerField(
+        default=0,
+        help_text='Incremented on every task or category write'
+    )
+    data_changed_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='When data_version was last incremented'
+    )
+    sync_floor = models.BigIntegerField(
+        default=0,
+        help_text='Highest tombstone sync_seq compacted away; older sync tokens are expired'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TaskCountersManager()
+
+    class Meta:
+        db_table = 'task_counters'
+        verbose_name = 'Task Counters'
+        verbose_name_plural = 'Task Counters'
+
+    def __str__(self):
+        return f"Counters for user {self.user_id}: {self.completed}/{self.total}"
+
+    @classmethod
+    def category_key(cls, category_id):
+        return str(category_id) if category_id is not None else cls.NO_CATEGORY_KEY
+
+    @classmethod
+    def state_counts(cls, state):
+        """
+        Counters a single task contributes, as a Counter
+        """
+        counts = Counter(total=1)
+        if state['is_done']:
+            counts['completed'] += 1
+        elif state['deadline'] is not None:
+            counts['overdue_eligible'] += 1
+        if state['priority'] in ('low', 'medium', 'high'):
+            counts[state['priority']] += 1
+        counts[f"category:{cls.category_key(state['category_id'])}"] += 1
+        return counts
+
+    @property
+    def pending(self):
+        return self.total - self.completed
+
+    @property
+    def completion_rate(self):
+        return round((self.completed / self.total * 100) if self.total > 0 else 0, 2)
+
+    def get_overdue_count(self):
+        """
+        Overdue depends on the current time, so it cannot be maintained
+        incrementally; skip the query when no pending task has a deadline.
+        """
+        if self.overdue_eligible <= 0:
+            return 0
+        return Task.objects.filter(
+            user_id=self.user_id,
+            is_done=False,
+            deadline__lt=timezone.now()
+        ).count()
+
+    def get_tasks_by_priority(self):
+        return {p: getattr(self, p) for p in ('low', 'medium', 'high') if getattr(self, p)}
+
+    def get_tasks_by_category(self):
+        """
+        Task counts keyed by category name (None for uncategorized).
+        Ids of categories deleted since (their tasks were SET_NULL) count
+        as uncategorized.
+        """
+        ids = [int(key) for key in self.by_category if key != self.NO_CATEGORY_KEY]
+        names = dict(TaskCategory.objects.filter(id__in=ids).values_list('id', 'name')) if ids else {}
+        result = {}
+        for key, count in self.by_category.items():
+            name = names.get(int(key)) if key != self.NO_CATEGORY_KEY else None
+            result[name] = result.get(name, 0) + count
+        return result
+
+
+class TaskDailyActivityManager(models.Manager):
+    """
+    Manager for maintaining the per-user, per-day activity rollup
+    """
+
+    def compute(self, user_ids=None):
+        """
+        Compute rollup values from the tasks table.
+        Returns {user_id: {date: [created, completed]}}.
+        """
+        tasks = Task.objects.all()
+        if user_ids is not None:
+            tasks = tasks.filter(user_id__in=user_ids)
+        results = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        created = tasks.annotate(day=TruncDate('created_at')).values('user_id', 'day').order_by().annotate(n=Count('id'))
+        for row in created:
+            results[row['user_id']][row['day']][0] += row['n']
+        completed = tasks.filter(is_done=True, completed_at__isnull=False).annotate(
+            day=TruncDate('completed_at')
+        ).values('user_id', 'day').order_by().annotate(n=Count('id'))
+        for row in completed:
+            results[row['user_id']][row['day']][1] += row['n']
+        return results
+
+    def apply_changes(self, user_id, changes):
+        """
+        Apply (before, after) tracked-state pairs of one user's tasks.
+        Callers serialize per user (TaskCounters row lock).
+        """
+        delta = defaultdict(lambda: [0, 0])
+        for before, after in changes:
+            for state, sign in ((before, -1), (after, 1)):
+                if state is None:
+                    continue
+                delta[timezone.localdate(state['created_at'])][0] += sign
+                if state['is_done'] and state['completed_at'] is not None:
+                    delta[timezone.localdate(state['completed_at'])][1] += sign
+        for day, (created, completed) in delta.items():
+            if not created and not completed:
+                continue
+            updated = self.filter(user_id=user_id, date=day).update(
+                created=F('created') + created,
+                completed=F('completed') + completed
+            )
+            if not updated:
+                self.create(user_id=user_id, date=day, created=created, completed=completed)
+
+    def window(self, user, days):
+        """
+        Rollup rows for the last `days` days (oldest first)
+        """
+        since = timezone.localdate(timezone.now() - timezone.timedelta(days=days))
+        return self.filter(user=user, date__gte=since).exclude(created=0, completed=0).order_by('date')
+
+
+class TaskDailyActivity(models.Model):
+    """
+    Per-user, per-day count of tasks created and completed (in the
+    default time zone), kept in sync by record_task_changes().
+    Counts follow existing tasks: deleting a task removes it from both.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='task_activity'
+    )
+    date = models.DateField()
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    objects = TaskDailyActivityManager()
+
+    class Meta:
+        db_table = 'task_daily_activity'
+        verbose_name = 'Task Daily Activity'
+        verbose_name_plural = 'Task Daily Activity'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_activity_per_user_day')
+        ]
+
+    def __str__(self):
+        return f"{self.date}: +{self.created} / ✓{self.completed}"
+
+
+class TaskTombstoneManager(models.Manager):
+    """
+    Manager for the delta sync stream (task sequence numbers and tombstones)
+    """
+
+    def apply_changes(self, user_id, changes):
+        """
+        Give written tasks a new sync_seq and record tombstones for deleted
+        ones. Must run while holding the user's TaskCounters row lock, so
+        that per-user commit order matches sequence order and a client
+        never skips a change that commits late.
+        """
+        written = [after['id'] for _, after in changes if after is not None]
+        deleted = [before['id'] for before, after in changes if after is None]
+        if written:
+            Task.objects.filter(pk__in=written).update(sync_seq=NextVal(TASK_SYNC_SEQUENCE))
+        if deleted:
+            self.bulk_create([TaskTombstone(user_id=user_id, task_id=pk) for pk in deleted])
+
+    def touch(self, tasks):
+        """
+        Give `tasks` (a Task queryset) a new sync_seq after a write that
+        changed their payloads but not their rows (category or user name).
+        Locks the tasks, then their users' TaskCounters rows, in the order
+        task writes take them; must run inside the write's transaction.
+        """
+        rows = list(tasks.select_for_update().values_list('pk', 'user_id'))
+        if not rows:
+            return
+        user_ids = sorted({user_id for _, user_id in rows})
+        list(TaskCounters.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id').values_list('pk', flat=True))
+        Task.objects.filter(pk__in=[pk for pk, _ in rows]).update(sync_seq=NextVal(TASK_SYNC_SEQUENCE))
+
+
+class TaskTombstone(models.Model):
+    """
+    Marker for a deleted task, served by the delta sync endpoint until
+    compacted (see `manage.py compact_sync_tombstones`)
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='task_tombstones'
+    )
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    sync_seq = models.BigIntegerField(db_default=NextVal(TASK_SYNC_SEQUENCE))
+
+    objects = TaskTombstoneManager()
+
+    class Meta:
+        db_table = 'task_tombstones'
+        ordering = ['sync_seq']
+        indexes = [
+            models.Index(fields=['user', 'sync_seq'], name='tombstones_user_seq_idx'),
+            models.Index(fields=['deleted_at'], name='tombstones_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted task {self.task_id} (seq {self.sync_seq})"
+
+
+def record_task_changes(changes):
+    """
+    Keep derived per-user data in sync with task writes.
+
+    changes: iterable of (before, after) pairs of tracked-state dicts (see
+    TRACKED_TASK_FIELDS); before is None for inserts, after is None for
+    deletes. Must be called inside the transaction that wrote the tasks.
+    """
+    by_user = defaultdict(list)
+    for before, after in changes:
+        if before is not None and after is not None and before['user_id'] != after['user_id']:
+            # Reassigned to another user: a delete for one, an insert for the other
+            by_user[before['user_id']].append((before, None))
+            by_user[after['user_id']].append((None, after))
+        else:
+            by_user[(after or before)['user_id']].append((before, after))
+    for user_id, user_changes in by_user.items():
+        TaskCounters.objects.apply_changes(user_id, user_changes)
+        TaskDailyActivity.objects.apply_changes(user_id, user_changes)
+        TaskTombstone.objects.apply_changes(user_id, user_changes)
+
+
 class ChatSession(models.Model):
     """
     AI chat session per user.
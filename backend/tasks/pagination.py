@@ -0,0 +1,175 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for task lists.
+
+    Pages are addressed by the (order column, id) pair of the last row seen,
+    so no COUNT(*) is issued and the database never scans skipped rows.
+    Works with every ordering accepted by the view's OrderingFilter; `id`
+    is always used as a tiebreaker, in the same direction as the order column.
+    Backed by the composite (user, <order col>, id) indexes on Task.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Order columns that can be NULL and how to decode cursor values
+    nullable_fields = {'deadline'}
+    datetime_fields = {'created_at', 'deadline'}
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request, queryset, view)
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+
+        # .values() rows (e.g. sparse fieldsets) must carry the cursor column
+        values_select = queryset.query.values_select
+        if values_select and field not in values_select:
+            queryset = queryset.values(*values_select, field)
+
+        # Match PostgreSQL's native NULL placement so the btree index can be
+        # scanned in either direction: NULLS LAST for ASC, NULLS FIRST for DESC.
+        if descending:
+            queryset = queryset.order_by(F(field).desc(nulls_first=True), '-id')
+        else:
+            queryset = queryset.order_by(F(field).asc(nulls_last=True), 'id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_keyset_filter(field, descending, *cursor))
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Reuse OrderingFilter validation so cursor mode accepts exactly the
+        same `ordering` values as page-number mode. Only the first term is
+        used; `id` is appended as the tiebreaker.
+        """
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or ['-created_at']
+        return ordering[0]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_keyset_filter(self, field, descending, value, pk):
+        """
+        Build the "strictly after (value, pk)" predicate for the given order.
+
+        The (value, pk) tiebreak is an OR, which PostgreSQL can't turn into
+        an index range on its own, so it is ANDed with a plain bound on the
+        order column to keep the scan on the (user, <col>, id) index.
+        """
+        if value is None:
+            # Only nullable columns have null cursors. NULLS FIRST for DESC:
+            # the null block precedes every non-null value; NULLS LAST for
+            # ASC: it follows them.
+            if descending:
+                return Q(**{f'{field}__isnull': True, 'id__lt': pk}) | Q(**{f'{field}__isnull': False})
+            return Q(**{f'{field}__isnull': True, 'id__gt': pk})
+
+        if descending:
+            after = Q(**{f'{field}__lte': value}) & (
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+            )
+        else:
+            after = Q(**{f'{field}__gte': value}) & (
+                Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+            )
+        if field in self.nullable_fields and not descending:
+            # NULLS LAST: the null block follows every non-null value
+            after |= Q(**{f'{field}__isnull': True})
+        return after
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        field = self.ordering.lstrip('-')
+        # Rows are model instances or .values() dicts
+        if isinstance(last, dict):
+            value, pk = last[field], last['id']
+        else:
+            value, pk = getattr(last, field), last.pk
+        if value is not None and field in self.datetime_fields:
+            value = value.isoformat()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor({
+            'o': self.ordering,
+            'v': value,
+            'id': pk,
+        }))
+
+    def encode_cursor(self, payload):
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return b64encode(raw, altchars=b'-_').decode('ascii')
+
+    def decode_cursor(self, request):
+        """
+        Return (value, pk) for the cursor in the request, or None on the
+        first page. A cursor issued for a different ordering is rejected.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii'), altchars=b'-_'))
+            if payload['o'] != self.ordering:
+                raise ValueError('ordering mismatch')
+            pk = int(payload['id'])
+            value = payload['v']
+            field = self.ordering.lstrip('-')
+            if value is None:
+                if field not in self.nullable_fields:
+                    raise ValueError('null value')
+            elif field in self.datetime_fields:
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError('bad datetime')
+            elif not isinstance(value, str):
+                raise ValueError('bad value')
+        except (BinasciiError, UnicodeError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
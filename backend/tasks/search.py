@@ -0,0 +1,116 @@
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import filters
+
+
+# Text search configurations the app's content is written in.
+# Must match the configurations used by Task.search_vector.
+SEARCH_CONFIGS = ('russian', 'english')
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+
+def build_search_query(term):
+    """
+    Combine a websearch-style query for every configured language, so
+    "задачи" and "tasks" both match their stemmed forms.
+    """
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(term, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def apply_search(queryset, term, rank=False, highlight=False):
+    """
+    Filter a Task queryset by a user-supplied search term.
+
+    Matches either the full-text document (GIN index on search_vector) or a
+    plain substring of title/description (trigram GIN indexes on
+    UPPER(col), which is what icontains compiles to on PostgreSQL), so
+    partial words keep working as before.
+
+    rank: annotate `search_rank` for ordering by relevance.
+    highlight: annotate `title_highlight` / `description_highlight` snippets.
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+    query = build_search_query(term)
+    queryset = queryset.filter(
+        Q(search_vector=query) |
+        Q(title__icontains=term) |
+        Q(description__icontains=term)
+    )
+    if rank:
+        queryset = queryset.annotate(search_rank=SearchRank(F('search_vector'), query))
+    if highlight:
+        queryset = queryset.annotate(
+            title_highlight=SearchHeadline(
+                'title', query,
+                config=SEARCH_CONFIGS[0],
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                highlight_all=True,
+            ),
+            description_highlight=SearchHeadline(
+                'description', query,
+                config=SEARCH_CONFIGS[0],
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_words=35,
+                min_words=15,
+                max_fragments=2,
+                fragment_delimiter=' … ',
+            ),
+        )
+    return queryset
+
+
+def filter_tasks(queryset, params, rank=False, highlight=False):
+    """
+    Apply the TaskSearchSerializer filter grammar (validated data) to a
+    Task queryset. Shared by search and filter-based bulk actions.
+    """
+    queryset = apply_search(queryset, params.get('search'), rank=rank, highlight=highlight)
+    
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category_id=category)
+    
+    priority = params.get('priority')
+    if priority:
+        queryset = queryset.filter(priority=priority)
+    
+    is_done = params.get('is_done')
+    if is_done is not None:
+        queryset = queryset.filter(is_done=is_done)
+    
+    if params.get('is_overdue'):
+        queryset = queryset.filter(deadline__lt=timezone.now(), is_done=False)
+    
+    deadline_from = params.get('deadline_from')
+    if deadline_from:
+        queryset = queryset.filter(deadline__gte=deadline_from)
+    
+    deadline_to = params.get('deadline_to')
+    if deadline_to:
+        queryset = queryset.filter(deadline__lte=deadline_to)
+    
+    return queryset
+
+
+class TaskSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter for `?search=` on task lists backed by apply_search()
+    instead of per-field icontains lookups. Like SearchFilter, every term
+    (or quoted phrase) must match on its own.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            queryset = apply_search(queryset, term)
+        return queryset
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from django.db import models
 from .models import Task, TaskCategory
+from .fieldsets import get_source_columns
+from .sync import decode_sync_token
 
 
 class TaskCategorySerializer(serializers.ModelSerializer):
@@ -49,26 +51,38 @@ class TaskCategorySerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         # Prevent creating a user category with the same name as an existing global one
-        if self.instance is None and user and TaskCategory.objects.filter(owner__isnull=True, name__iexact=name).exists():
-            raise serializers.ValidationError('Category with this name already exists globally')
-        # Enforce per-owner uniqueness (case-insensitive check to be safe)
-        qs = TaskCategory.objects.filter(name__iexact=name)
-        if user:
-            qs = qs.filter(owner=user)
-        else:
-            qs = qs.filter(owner__isnull=True)
-        if self.instance is not None:
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise serializers.ValidationError('You already have a category with this name')
+        # (checked against the category cache; per-owner uniqueness is enforced by the
+        # database, see save_unique)
+        if self.instance is None and user and user.is_authenticated:
+            key = name.upper()
+            if any(c.owner_id is None and c.name.upper() == key for c in TaskCategory.objects.visible_to(user)):
+                raise serializers.ValidationError('Category with this name already exists globally')
         return name
 
+    def save_unique(self, write):
+        """
+        Run a single INSERT/UPDATE and map a case-insensitive name conflict
+        to the validation error a pre-check would have raised
+        """
+        try:
+            with transaction.atomic():
+                return write()
+        except IntegrityError as exc:
+            if 'unique_global_category_name' in str(exc):
+                raise serializers.ValidationError({'name': ['Category with this name already exists globally']})
+            if 'unique_category_name_per_owner' in str(exc):
+                raise serializers.ValidationError({'name': ['You already have a category with this name']})
+            raise
+
     def create(self, validated_data):
         # Attach current user as owner (user-scoped category)
         request = self.context.get('request')
         if request and request.user and request.user.is_authenticated:
             validated_data['owner'] = request.user
-        return super().create(validated_data)
+        return self.save_unique(lambda: super(TaskCategorySerializer, self).create(validated_data))
+
+    def update(self, instance, validated_data):
+        return self.save_unique(lambda: super(TaskCategorySerializer, self).update(instance, validated_data))
 
 
 class TaskListSerializer(serializers.ModelSerializer):
@@ -97,10 +111,274 @@ class TaskListSerializer(serializers.ModelSerializer):
         )
 
 
-class TaskDetailSerializer(serializers.ModelSerializer):
+class TaskSearchResultSerializer(TaskListSerializer):
+    """
+    Serializer for search results: list fields plus relevance and snippets
+    """
+    rank = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
+    
+    class Meta(TaskListSerializer.Meta):
+        fields = TaskListSerializer.Meta.fields + ('rank', 'highlight')
+    
+    def get_rank(self, obj):
+        rank = getattr(obj, 'search_rank', None)
+        return round(rank, 6) if rank is not None else None
+    
+    def get_highlight(self, obj):
+        """
+        Matched fragments wrapped in <mark>...</mark>, when requested
+        """
+        if not hasattr(obj, 'title_highlight'):
+            return None
+        return {
+            'title': obj.title_highlight,
+            'description': obj.description_highlight,
+        }
+
+
+class TaskListRowSerializer:
+    """
+    Fast path for TaskListSerializer(many=True) on large list responses.
+
+    Works on .values() rows instead of model instances: one shared `now`
+    for the deadline fields, category and user name lookups from maps
+    built once per response, and priority colors from a precomputed map.
+    The rendered JSON is identical to TaskListSerializer's.
+
+    `fields` selects a subset of the output (see tasks.fieldsets); only the
+    columns those fields need are selected and unused lookups are skipped.
+    """
+    FIELD_SOURCES = {
+        'id': ('id',),
+        'title': ('title',),
+        'description': ('description',),
+        'is_done': ('is_done',),
+        'priority': ('priority',),
+        'deadline': ('deadline',),
+        'category': ('category_id',),
+        'category_name': ('category_id',),
+        'category_color': ('category_id',),
+        'priority_color': ('priority',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+        'completed_at': ('completed_at',),
+        'is_overdue': ('deadline', 'is_done'),
+        'days_until_deadline': ('deadline',),
+        'user_name': ('user_id',),
+    }
+    FIELDS = TaskListSerializer.Meta.fields
+    PRIORITY_COLORS = {
+        priority: Task(priority=priority).get_priority_display_color()
+        for priority, _ in Task.PRIORITY_CHOICES
+    }
+    DEFAULT_PRIORITY_COLOR = Task(priority='').get_priority_display_color()
+    
+    def __init__(self, rows, user=None, now=None, fields=None):
+        """
+        rows: dicts from values(queryset, fields).
+        user: the requesting user, saves a lookup when the rows are theirs.
+        """
+        self.rows = rows
+        self.user = user
+        self.now = now or timezone.now()
+        self.fields = fields or self.FIELDS
+        self.format_datetime = serializers.DateTimeField().to_representation
+    
+    @classmethod
+    def values(cls, queryset, fields=None):
+        """
+        Trim a Task queryset to the columns the selected fields read
+        """
+        return queryset.values(*get_source_columns(fields or cls.FIELDS, cls.FIELD_SOURCES))
+    
+    def get_categories(self, rows):
+        category_ids = {row['category_id'] for row in rows if row['category_id'] is not None}
+        if not category_ids:
+            return {}
+        return {
+            pk: (name, color)
+            for pk, name, color in TaskCategory.objects.filter(id__in=category_ids).values_list('id', 'name', 'color')
+        }
+    
+    def get_user_names(self, rows):
+        names = {}
+        if self.user is not None:
+            names[self.user.pk] = self.user.get_full_name()
+        missing = {row['user_id'] for row in rows} - names.keys()
+        if missing:
+            User = Task._meta.get_field('user').related_model
+            for user in User.objects.filter(pk__in=missing).only('first_name', 'last_name'):
+                names[user.pk] = user.get_full_name()
+        return names
+    
+    def get_field_builders(self, rows):
+        """
+        {output field: function(row, item)} that sets the field on item
+        """
+        now = self.now
+        format_datetime = self.format_datetime
+        builders = {}
+        
+        def column(name):
+            def build(row, item):
+                item[name] = row[name]
+            return build
+        
+        def datetime_column(name):
+            def build(row, item):
+                value = row[name]
+                item[name] = format_datetime(value) if value else None
+            return build
+        
+        for name in ('id', 'title', 'description', 'is_done', 'priority'):
+            builders[name] = column(name)
+        for name in ('deadline', 'created_at', 'updated_at', 'completed_at'):
+            builders[name] = datetime_column(name)
+        
+        def build_category(row, item):
+            item['category'] = row['category_id']
+        builders['category'] = build_category
+        
+        if {'category_name', 'category_color'} & set(self.fields):
+            categories = self.get_categories(rows)
+            
+            def build_category_name(row, item):
+                category_id = row['category_id']
+                if category_id is None:
+                    item['category_name'] = 'No Category'
+                else:
+                    # None if the category was deleted after the rows were read
+                    category = categories.get(category_id)
+                    item['category_name'] = category[0] if category else None
+            
+            def build_category_color(row, item):
+                # TaskListSerializer skips category_color when there is no category
+                category_id = row['category_id']
+                if category_id is not None:
+                    category = categories.get(category_id)
+                    item['category_color'] = category[1] if category else None
+            
+            builders['category_name'] = build_category_name
+            builders['category_color'] = build_category_color
+        
+        def build_priority_color(row, item):
+            item['priority_color'] = self.PRIORITY_COLORS.get(row['priority'], self.DEFAULT_PRIORITY_COLOR)
+        
+        def build_is_overdue(row, item):
+            deadline = row['deadline']
+            item['is_overdue'] = bool(deadline and not row['is_done'] and now > deadline)
+        
+        def build_days_until_deadline(row, item):
+            deadline = row['deadline']
+            item['days_until_deadline'] = (deadline - now).days if deadline else None
+        
+        builders['priority_color'] = build_priority_color
+        builders['is_overdue'] = build_is_overdue
+        builders['days_until_deadline'] = build_days_until_deadline
+        
+        if 'user_name' in self.fields:
+            user_names = self.get_user_names(rows)
+            
+            def build_user_name(row, item):
+                item['user_name'] = user_names[row['user_id']]
+            builders['user_name'] = build_user_name
+        
+        return builders
+    
+    @property
+    def data(self):
+        rows = list(self.rows)
+        builders = self.get_field_builders(rows)
+        steps = [builders[name] for name in self.fields]
+        data = []
+        for row in rows:
+            item = {}
+            for step in steps:
+                step(row, item)
+            data.append(item)
+        return data
+
+
+class TaskSearchResultRowSerializer(TaskListRowSerializer):
+    """
+    Fast path for TaskSearchResultSerializer(many=True)
+    """
+    FIELD_SOURCES = {
+        **TaskListRowSerializer.FIELD_SOURCES,
+        'rank': (),
+        'highlight': (),
+    }
+    FIELDS = TaskSearchResultSerializer.Meta.fields
+    ANNOTATIONS = ('search_rank', 'title_highlight', 'description_highlight')
+    
+    @classmethod
+    def values(cls, queryset, fields=None):
+        annotations = [name for name in cls.ANNOTATIONS if name in queryset.query.annotations]
+        return queryset.values(*get_source_columns(fields or cls.FIELDS, cls.FIELD_SOURCES), *annotations)
+    
+    def get_field_builders(self, rows):
+        builders = super().get_field_builders(rows)
+        
+        def build_rank(row, item):
+            rank = row.get('search_rank')
+            item['rank'] = round(rank, 6) if rank is not None else None
+        
+        def build_highlight(row, item):
+            if 'title_highlight' in row:
+                item['highlight'] = {
+                    'title': row['title_highlight'],
+                    'description': row['description_highlight'],
+                }
+            else:
+                item['highlight'] = None
+        
+        builders['rank'] = build_rank
+        builders['highlight'] = build_highlight
+        return builders
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin taking fields=(...) to drop unselected output fields
+    """
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TaskDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Task model in detail views
     """
+    # Model fields each output field reads, for .only() on sparse fieldsets
+    FIELD_SOURCES = {
+        'id': ('id',),
+        'title': ('title',),
+        'description': ('description',),
+        'is_done': ('is_done',),
+        'priority': ('priority',),
+        'deadline': ('deadline',),
+        'category': ('category',),
+        'category_details': ('category',),
+        'priority_color': ('priority',),
+        'user': ('user',),
+        'user_details': ('user',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+        'completed_at': ('completed_at',),
+        'is_overdue': ('deadline', 'is_done'),
+        'days_until_deadline': ('deadline',),
+    }
+    # Output fields that need a select_related join
+    RELATED_FIELDS = {
+        'category_details': 'category',
+        'user_details': 'user',
+    }
+    
     category_details = TaskCategorySerializer(source='category', read_only=True)
     priority_color = serializers.CharField(source='get_priority_display_color', read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
@@ -132,10 +410,37 @@ class TaskDetailSerializer(serializers.ModelSerializer):
         }
 
 
+class VisibleCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Category by id, limited to global and the current user's categories
+    and resolved from the category cache (no query in steady state)
+    """
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        category = TaskCategory.objects.get_visible(self.context['request'].user, pk)
+        if category is None:
+            if TaskCategory.objects.filter(pk=pk).exists():
+                raise serializers.ValidationError("Invalid category selected.")
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
 class TaskCreateUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating and updating tasks
     """
+    category = VisibleCategoryField(
+        queryset=TaskCategory.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    
     class Meta:
         model = Task
         fields = (
@@ -158,20 +463,6 @@ class TaskCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Deadline cannot be in the past.")
         return value
     
-    def validate_category(self, value):
-        """
-        Validate category exists
-        """
-        if value:
-            # Only allow categories that are global or owned by the current user
-            user = self.context['request'].user
-            allowed = TaskCategory.objects.filter(id=value.id).filter(
-                models.Q(owner__isnull=True) | models.Q(owner=user)
-            ).exists()
-            if not allowed:
-                raise serializers.ValidationError("Invalid category selected.")
-        return value
-    
     def create(self, validated_data):
         """
         Create task with current user
@@ -180,6 +471,52 @@ class TaskCreateUpdateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class TaskBatchItemSerializer(TaskCreateUpdateSerializer):
+    """
+    Serializer for one task of a batch write. Categories are checked
+    against the ids preloaded once per batch (context['category_ids']).
+    """
+    category = serializers.IntegerField(required=False, allow_null=True)
+    
+    def validate_category(self, value):
+        """
+        Validate category is global or owned by the current user
+        """
+        if value is not None and value not in self.context['category_ids']:
+            raise serializers.ValidationError("Invalid category selected.")
+        return value
+
+
+class TaskBatchSerializer(serializers.Serializer):
+    """
+    Serializer for batch create/update requests
+    """
+    create = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        default=list,
+        max_length=1000,
+        help_text="Tasks to create"
+    )
+    update = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        default=list,
+        max_length=1000,
+        help_text="Partial updates, each with the task 'id'"
+    )
+    all_or_nothing = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Write nothing if any item is invalid"
+    )
+    
+    def validate(self, attrs):
+        if not attrs['create'] and not attrs['update']:
+            raise serializers.ValidationError("Provide at least one task to create or update.")
+        return attrs
+
+
 class TaskStatusUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for updating only task status (is_done)
@@ -250,6 +587,47 @@ class TaskStatsSerializer(serializers.Serializer):
     recent_activity = serializers.ListField()
 
 
+class TaskStatsQuerySerializer(serializers.Serializer):
+    """
+    Serializer for task statistics query parameters
+    """
+    days = serializers.ChoiceField(
+        choices=[7, 30, 365],
+        required=False,
+        default=7,
+        help_text="Recent activity window in days"
+    )
+
+
+class TaskSyncSerializer(serializers.Serializer):
+    """
+    Serializer for delta sync query parameters
+    """
+    since = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        help_text="Opaque token from a previous sync (omit for a full snapshot)"
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=500,
+        min_value=1,
+        max_value=1000,
+        help_text="Maximum number of changes returned"
+    )
+
+    def validate_since(self, value):
+        """
+        Decode the sync token into a sync sequence number
+        """
+        if not value:
+            return 0
+        try:
+            return decode_sync_token(value)
+        except ValueError:
+            raise serializers.ValidationError("Invalid sync token.")
+
+
 class TaskSearchSerializer(serializers.Serializer):
     """
     Serializer for task search parameters
@@ -283,14 +661,55 @@ class TaskSearchSerializer(serializers.Serializer):
         required=False,
         help_text="Filter tasks with deadline before this date"
     )
+    highlight = serializers.BooleanField(
+        required=False,
+        default=True,
+        help_text="Include highlighted snippets when searching"
+    )
     ordering = serializers.ChoiceField(
         choices=[
+            'relevance',
             'created_at', '-created_at',
             'deadline', '-deadline',
             'priority', '-priority',
             'title', '-title'
         ],
         required=False,
-        default='-created_at',
-        help_text="Order results by field"
+        help_text="Order results by field (default: relevance when searching, else -created_at)"
     )
+
+
+
+class TaskFilterActionSerializer(TaskSearchSerializer):
+    """
+    Serializer for bulk actions on all tasks matching search filters
+    """
+    FILTER_FIELDS = (
+        'search', 'category', 'priority', 'is_done',
+        'deadline_from', 'deadline_to',
+    )
+    
+    highlight = None
+    ordering = None
+    action = serializers.ChoiceField(
+        choices=['complete', 'uncomplete', 'delete'],
+        help_text="Action to perform on matching tasks"
+    )
+    dry_run = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Only count the tasks the action would affect"
+    )
+    
+    def validate(self, attrs):
+        """
+        Require at least one filter so an empty body never matches every task.
+        Only filters the client sent count: form bodies fill missing boolean
+        fields with False.
+        """
+        for name in self.FILTER_FIELDS + ('is_overdue',):
+            if name not in self.initial_data:
+                attrs.pop(name, None)
+        if not attrs.get('is_overdue') and all(attrs.get(name) in (None, '') for name in self.FILTER_FIELDS):
+            raise serializers.ValidationError("Provide at least one filter.")
+        return attrs
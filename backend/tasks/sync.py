@@ -0,0 +1,71 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from .models import Task, TaskCounters, TaskTombstone
+
+
+SYNC_TOKEN_VERSION = 'v1'
+
+
+class SyncTokenExpired(Exception):
+    """
+    The token predates compacted tombstones; the client must resync fully.
+    """
+
+
+def encode_sync_token(seq):
+    return urlsafe_b64encode(f'{SYNC_TOKEN_VERSION}:{seq}'.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_sync_token(token):
+    """
+    Return the sync_seq encoded in an opaque token. Raises ValueError.
+    """
+    try:
+        raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('ascii')
+        version, seq = raw.split(':', 1)
+        seq = int(seq)
+    except (BinasciiError, UnicodeError, ValueError):
+        raise ValueError('Invalid sync token')
+    if version != SYNC_TOKEN_VERSION or seq < 0:
+        raise ValueError('Invalid sync token')
+    return seq
+
+
+def get_changes(user, since, limit):
+    """
+    Changes to the user's tasks after sync position `since`, oldest first.
+
+    Returns (tasks, deleted_ids, last_seq, has_more). Task rows and
+    tombstones are merged by sync_seq and cut at `limit` entries, so
+    traffic scales with the number of changes, not the number of tasks.
+    since=0 is a full snapshot and carries no tombstones.
+    """
+    if since:
+        floor = TaskCounters.objects.filter(user=user).values_list('sync_floor', flat=True).first() or 0
+        if since < floor:
+            raise SyncTokenExpired()
+
+    tasks = list(
+        Task.objects.filter(user=user, sync_seq__gt=since)
+        .select_related('category', 'user')
+        .order_by('sync_seq')[:limit + 1]
+    )
+    tombstones = []
+    if since:
+        tombstones = list(
+            TaskTombstone.objects.filter(user=user, sync_seq__gt=since)
+            .order_by('sync_seq')
+            .values_list('sync_seq', 'task_id')[:limit + 1]
+        )
+
+    entries = sorted(
+        [(task.sync_seq, task) for task in tasks] + [(seq, task_id) for seq, task_id in tombstones],
+        key=lambda entry: entry[0]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    last_seq = entries[-1][0] if entries else since
+    changed = [item for _, item in entries if isinstance(item, Task)]
+    deleted = [item for _, item in entries if not isinstance(item, Task)]
+    return changed, deleted, last_seq, has_more
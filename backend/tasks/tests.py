@@ -1,3 +1,1081 @@
-from django.test import TestCase
-
-# Create your tests here.
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.admin.sites import AdminSite
+from django.contrib.admin.utils import label_for_field, lookup_field
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, modify_settings,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+from todo_project.renderers import ORJSONRenderer
+
+from . import ai, async_views, intents, views
+from .management.commands._ai_stub import STREAMED_ANSWER, StubOpenAIServer
+from .models import ChatMessage, Task, TaskCategory, TaskCounters
+from .pagination import TaskKeysetPagination
+from .serializers import TaskListRowSerializer, TaskListSerializer
+
+User = get_user_model()
+
+
+def create_user(email='user@example.com', **extra_fields):
+    username = extra_fields.pop('username', email.split('@')[0])
+    return User.objects.create_user(
+        email=email, password='pass12345', username=username,
+        first_name='Test', last_name='User', **extra_fields
+    )
+
+
+class TaskKeysetPaginationTests(APITestCase):
+    """
+    ?pagination=cursor walks every task exactly once, in order
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        now = timezone.now().replace(microsecond=0)
+        # Duplicate created_at values and null deadlines exercise the id tiebreaker
+        for i in range(7):
+            Task.objects.create(
+                user=self.user,
+                title=f'Task {i}',
+                created_at=now - timedelta(minutes=i // 2),
+                deadline=None if i % 3 == 0 else now + timedelta(days=i % 2),
+            )
+
+    def walk(self, ordering):
+        url = reverse('tasks:task_list_create') + f'?pagination=cursor&page_size=2&ordering={ordering}'
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_created_at_descending(self):
+        expected = list(
+            Task.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk('-created_at'), expected)
+
+    def test_created_at_ascending(self):
+        expected = list(
+            Task.objects.filter(user=self.user).order_by('created_at', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk('created_at'), expected)
+
+    def test_nullable_deadline_both_directions(self):
+        tasks = Task.objects.filter(user=self.user)
+        ascending = list(
+            tasks.order_by(F('deadline').asc(nulls_last=True), 'id').values_list('id', flat=True)
+        )
+        descending = list(
+            tasks.order_by(F('deadline').desc(nulls_first=True), '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk('deadline'), ascending)
+        self.assertEqual(self.walk('-deadline'), descending)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        url = reverse('tasks:task_list_create') + '?pagination=cursor&page_size=2&ordering=-created_at'
+        next_url = self.client.get(url).data['next']
+        response = self.client.get(next_url.replace('ordering=-created_at', 'ordering=title'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_filter_bounds_the_order_column(self):
+        # The (value, id) OR alone can't be used as an index range
+        keyset = TaskKeysetPagination().get_keyset_filter('created_at', True, timezone.now(), 10)
+        sql = str(Task.objects.filter(keyset).query)
+        self.assertIn('"tasks"."created_at" <=', sql)
+
+
+class TaskSearchTests(APITestCase):
+    """
+    ?search= on the task list matches full words and substrings, per term
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.milk = Task.objects.create(user=self.user, title='Buy milk', description='At the corner store')
+        self.bread = Task.objects.create(user=self.user, title='Buy bread')
+
+    def search(self, term):
+        response = self.client.get(reverse('tasks:task_list_create'), {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('buy'), {self.milk.id, self.bread.id})
+        self.assertEqual(self.search('buy store'), {self.milk.id})
+        self.assertEqual(self.search('bread store'), set())
+
+    def test_stemmed_and_partial_words(self):
+        self.assertEqual(self.search('stores'), {self.milk.id})
+        self.assertEqual(self.search('brea'), {self.bread.id})
+
+    def test_search_vector_is_not_loaded(self):
+        self.assertIn('search_vector', Task.objects.get(pk=self.milk.pk).get_deferred_fields())
+        self.assertNotIn('search_vector', self.bread.__dict__)
+
+
+class TaskFieldsetTests(APITestCase):
+    """
+    ?fields= and ?omit= trim the list, detail and search responses
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.task = Task.objects.create(user=self.user, title='Buy milk', priority='high')
+
+    def test_list(self):
+        response = self.client.get(reverse('tasks:task_list_create'), {'fields': 'title,id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'id': self.task.pk, 'title': 'Buy milk'}])
+
+    def test_detail(self):
+        url = reverse('tasks:task_detail', args=[self.task.pk])
+        response = self.client.get(url, {'fields': 'id,title,category_details'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': self.task.pk, 'title': 'Buy milk', 'category_details': None})
+        response = self.client.get(url, {'omit': 'user_details,description'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('user_details', response.data)
+        self.assertNotIn('description', response.data)
+        self.assertEqual(response.data['priority'], 'high')
+
+    def test_search(self):
+        response = self.client.get(reverse('tasks:search_tasks'), {'search': 'milk', 'fields': 'id,title'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tasks'], [{'id': self.task.pk, 'title': 'Buy milk'}])
+
+    def test_unknown_fields_are_rejected(self):
+        for url in (
+            reverse('tasks:task_list_create'),
+            reverse('tasks:task_detail', args=[self.task.pk]),
+            reverse('tasks:search_tasks'),
+        ):
+            response = self.client.get(url, {'fields': 'id,password'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['fields'], ['Unknown fields: password'])
+            response = self.client.get(url, {'omit': 'nope'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['omit'], ['Unknown fields: nope'])
+
+    def test_empty_selection_is_rejected(self):
+        response = self.client.get(reverse('tasks:task_list_create'), {'fields': 'id', 'omit': 'id'})
+        self.assertEqual(response.status_code, 400)
+
+class TaskListRowSerializerTests(TestCase):
+    """
+    The values()-based list serializer renders like TaskListSerializer
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.category = TaskCategory.objects.create(name='Home', color='#123456', owner=self.user)
+        self.task = Task.objects.create(user=self.user, title='Sweep', category=self.category)
+
+    def render(self, **overrides):
+        row = {**TaskListRowSerializer.values(Task.objects.filter(pk=self.task.pk)).get(), **overrides}
+        return TaskListRowSerializer([row], user=self.user).data[0]
+
+    def test_matches_model_serializer(self):
+        self.assertEqual(self.render(), TaskListSerializer(self.task).data)
+
+    def test_category_deleted_after_rows_were_read(self):
+        data = self.render(category_id=self.category.pk + 1000)
+        self.assertIsNone(data['category_name'])
+        self.assertIsNone(data['category_color'])
+
+
+class TaskSyncTests(APITestCase):
+    """
+    /api/tasks/sync/ returns every change since a token exactly once
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.category = TaskCategory.objects.create(name='Home', owner=self.user)
+        self.sweep = Task.objects.create(user=self.user, title='Sweep', category=self.category)
+        self.cook = Task.objects.create(user=self.user, title='Cook')
+        self.token = self.sync()['next_token']
+
+    def sync(self, since=None):
+        response = self.client.get(reverse('tasks:task_sync'), {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def changes(self):
+        data = self.sync(self.token)
+        self.token = data['next_token']
+        return {row['id']: row for row in data['tasks']}, data['deleted']
+
+    def test_full_sync(self):
+        data = self.sync()
+        self.assertEqual({row['id'] for row in data['tasks']}, {self.sweep.id, self.cook.id})
+        self.assertEqual(data['deleted'], [])
+
+    def test_updates_and_tombstones(self):
+        self.assertEqual(self.changes(), ({}, []))
+        self.cook.title = 'Cook dinner'
+        self.cook.save()
+        sweep_id = self.sweep.id
+        self.sweep.delete()
+        tasks, deleted = self.changes()
+        self.assertEqual(list(tasks), [self.cook.id])
+        self.assertEqual(tasks[self.cook.id]['title'], 'Cook dinner')
+        self.assertEqual(deleted, [sweep_id])
+        self.assertEqual(self.changes(), ({}, []))
+
+    def test_category_renamed_or_deleted(self):
+        self.category.name = 'House'
+        self.category.save()
+        tasks, _ = self.changes()
+        self.assertEqual(tasks[self.sweep.id]['category_name'], 'House')
+        self.category.delete()
+        tasks, deleted = self.changes()
+        self.assertEqual(list(tasks), [self.sweep.id])
+        self.assertIsNone(tasks[self.sweep.id]['category'])
+        self.assertEqual(deleted, [])
+
+    def test_user_renamed(self):
+        url = reverse('authentication:user_profile')
+        self.client.patch(url, {'email': 'other@example.com'})
+        self.assertEqual(self.changes(), ({}, []))
+        self.client.patch(url, {'first_name': 'Renamed'})
+        tasks, _ = self.changes()
+        self.assertEqual(set(tasks), {self.sweep.id, self.cook.id})
+        self.assertEqual(tasks[self.cook.id]['user_name'], 'Renamed User')
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """
+    API responses render like DRF's JSONRenderer
+    """
+
+    def render(self, renderer_class, data):
+        return renderer_class().render(data, 'application/json', {})
+
+    def test_matches_drf(self):
+        data = {'id': 1, 'title': 'Ünïcode \u2028', 'deadline': timezone.make_aware(datetime(2026, 1, 2, 12, 30)), 'tags': [None, True]}
+        self.assertEqual(self.render(ORJSONRenderer, data), self.render(JSONRenderer, data))
+
+    def test_integers_wider_than_64_bits(self):
+        data = {'big': 2 ** 64, 'small': -2 ** 70}
+        self.assertEqual(self.render(ORJSONRenderer, data), self.render(JSONRenderer, data))
+
+
+class TaskBatchTests(APITestCase):
+    """
+    /api/tasks/batch/ writes valid items, or nothing with all_or_nothing
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.task = Task.objects.create(user=self.user, title='Sweep')
+
+    def post(self, **data):
+        return self.client.post(reverse('tasks:task_batch'), data, format='json')
+
+    def test_all_or_nothing_writes_nothing(self):
+        response = self.post(
+            create=[{'title': 'Cook'}, {'title': ''}],
+            update=[{'id': self.task.pk, 'is_done': True}],
+            all_or_nothing=True,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']['create']], [1])
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(Task.objects.get(pk=self.task.pk).is_done)
+        counters = TaskCounters.objects.get(user=self.user)
+        self.assertEqual((counters.total, counters.completed), (1, 0))
+
+    def test_partial_batch_writes_valid_items(self):
+        response = self.post(
+            create=[{'title': 'Cook'}, {'title': ''}],
+            update=[{'id': self.task.pk, 'is_done': True}, {'id': self.task.pk + 1000, 'is_done': True}],
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual(response.data['updated'], [{'index': 0, 'id': self.task.pk}])
+        self.assertEqual(len(response.data['errors']['update']), 1)
+        counters = TaskCounters.objects.get(user=self.user)
+        self.assertEqual((counters.total, counters.completed), (2, 1))
+
+
+class TaskFilterActionTests(APITestCase):
+    """
+    /api/tasks/bulk/filter/ acts on the tasks matching the filters sent
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.pending = Task.objects.create(user=self.user, title='Buy milk', priority='high')
+        self.done = Task.objects.create(user=self.user, title='Buy bread', priority='low', is_done=True)
+
+    def post(self, data, format='json'):
+        return self.client.post(reverse('tasks:task_filter_action'), data, format=format)
+
+    def test_filter_required(self):
+        for format in ('json', 'multipart'):
+            with self.subTest(format=format):
+                response = self.post({'action': 'delete'}, format)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('tasks:task_filter_action'), 'action=delete', content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 2)
+
+    def test_form_body_does_not_imply_is_done(self):
+        response = self.post({'action': 'delete', 'search': 'buy', 'dry_run': 'true'}, 'multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['affected_count'], 2)
+
+    def test_complete_matching_tasks(self):
+        response = self.post({'action': 'complete', 'priority': 'high'})
+        self.assertEqual(response.data['affected_count'], 1)
+        self.assertTrue(Task.objects.get(pk=self.pending.pk).is_done)
+        self.assertEqual(TaskCounters.objects.get(user=self.user).completed, 2)
+
+    def test_delete_matching_tasks(self):
+        response = self.post({'action': 'delete', 'is_done': True})
+        self.assertEqual(response.data['affected_count'], 1)
+        self.assertEqual(list(Task.objects.filter(user=self.user)), [self.pending])
+
+
+class TaskConditionalGetTests(APITestCase):
+    """
+    Task reads answer 304 until the user's task data changes
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        Task.objects.create(user=self.user, title='Sweep')
+        self.url = reverse('tasks:task_list_create')
+
+    def test_not_modified_until_a_write(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Task.objects.create(user=self.user, title='Cook')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'is_done': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class AdminUser:
+    """
+    Staff user allowed everything, as request.user for ModelAdmin calls
+    """
+    is_active = is_staff = is_superuser = is_authenticated = True
+
+    def __init__(self, user):
+        self.pk = self.id = user.pk
+
+    def has_perm(self, perm, obj=None):
+        return True
+
+    def has_module_perms(self, app_label):
+        return True
+
+
+@modify_settings(INSTALLED_APPS={'prepend': 'django.contrib.admin'})
+class AdminChangelistTests(TestCase):
+    """
+    Task and category changelists run a fixed number of queries, whatever
+    the number of rows, users and categories on the page
+    """
+
+    def setUp(self):
+        self.admin = import_module('tasks.admin')
+        self.user = create_user()
+        self.added = 0
+
+    def add_rows(self, count):
+        for index in range(count):
+            user = User.objects.create(email=f'user{index}-{self.added}@example.com', username=f'user{index}-{self.added}')
+            category = TaskCategory.objects.create(name='Category', owner=user)
+            Task.objects.bulk_create([Task(user=user, title='Task', category=category), Task(user=user, title='Task')])
+        self.added += 1
+
+    def changelist_queries(self, model_admin, params=None):
+        request = RequestFactory().get('/admin/', params or {})
+        request.user = AdminUser(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            changelist = model_admin.get_changelist_instance(request)
+            for obj in changelist.result_list:
+                for name in changelist.list_display:
+                    if name != 'action_checkbox':
+                        label_for_field(name, model_admin.model, model_admin)
+                        lookup_field(name, obj, model_admin)
+        return len(queries)
+
+    def assertBoundedQueries(self, model_admin, params=None):
+        self.add_rows(2)
+        few = self.changelist_queries(model_admin, params)
+        self.add_rows(20)
+        self.assertEqual(self.changelist_queries(model_admin, params), few)
+
+    def test_tasks(self):
+        model_admin = self.admin.TaskAdmin(Task, AdminSite())
+        self.assertBoundedQueries(model_admin)
+        self.assertBoundedQueries(model_admin, {'user_email': 'USER1-0@example.com', 'is_done__exact': '0'})
+
+    def test_categories(self):
+        self.assertBoundedQueries(self.admin.TaskCategoryAdmin(TaskCategory, AdminSite()))
+
+class TaskCountersTests(TestCase):
+    """
+    Counters follow every task write without recounting
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.category = TaskCategory.objects.create(name='Work', owner=self.user)
+
+    def assertCountersMatchTasks(self):
+        counters = TaskCounters.objects.get(user=self.user)
+        expected = TaskCounters.objects.counter_values(self.user.pk)
+        self.assertEqual({field: getattr(counters, field) for field in expected}, expected)
+        return counters
+
+    def test_single_and_set_based_writes(self):
+        task = Task.objects.create(user=self.user, title='A', priority='high', category=self.category)
+        Task.objects.create(user=self.user, title='B', deadline=timezone.now())
+        counters = self.assertCountersMatchTasks()
+        self.assertEqual((counters.total, counters.high, counters.overdue_eligible), (2, 1, 1))
+
+        task.is_done = True
+        task.save()
+        Task.objects.filter(user=self.user).tracked_update(priority='low')
+        counters = self.assertCountersMatchTasks()
+        self.assertEqual((counters.completed, counters.low), (1, 2))
+
+        Task.objects.filter(pk=task.pk).tracked_delete()
+        counters = self.assertCountersMatchTasks()
+        self.assertEqual(counters.by_category, {TaskCounters.NO_CATEGORY_KEY: 1})
+
+    def test_missing_row_is_built_from_tasks(self):
+        Task.objects.create(user=self.user, title='A')
+        TaskCounters.objects.filter(user=self.user).delete()
+        Task.objects.create(user=self.user, title='B')
+        self.assertEqual(self.assertCountersMatchTasks().total, 2)
+
+    def test_populate_categories_bumps_versions_once(self):
+        TaskCounters.objects.for_user(self.user)
+        version = TaskCounters.objects.get_version(self.user)[0]
+        call_command('populate_categories', stdout=StringIO())
+        self.assertEqual(TaskCounters.objects.get_version(self.user)[0], version + 1)
+        self.assertEqual(TaskCategory.objects.filter(owner=None).count(), 2)
+
+
+class TaskCountersConcurrencyTests(TransactionTestCase):
+    """
+    Two first writes for a user without a counters row both get counted
+    """
+
+    def test_concurrent_first_writes(self):
+        user = create_user()
+        TaskCounters.objects.filter(user=user).delete()
+        inserted, release, errors = threading.Event(), threading.Event(), []
+
+        def first_writer():
+            try:
+                with transaction.atomic():
+                    Task.objects.create(user=user, title='A')
+                    inserted.set()
+                    # Keep the new counters row uncommitted while the other writer runs
+                    release.wait(5)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                inserted.set()
+                connection.close()
+
+        def second_writer():
+            try:
+                Task.objects.create(user=user, title='B')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=first_writer)
+        first.start()
+        inserted.wait(5)
+        second = threading.Thread(target=second_writer)
+        second.start()
+        # Let the second writer reach the counters INSERT and block on it
+        time.sleep(0.5)
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(TaskCounters.objects.get(user=user).total, 2)
+
+
+class TaskCategoryNameTests(APITestCase):
+    """
+    Category names are unique per owner and against global ones, ignoring case
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('tasks:category_list_create')
+        self.groceries = TaskCategory.objects.create(name='Groceries', owner=self.user)
+
+    def test_duplicate_name_in_another_case(self):
+        response = self.client.post(self.url, {'name': ' GROCERIES '}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['name'], ['You already have a category with this name'])
+        self.assertEqual(TaskCategory.objects.filter(owner=self.user).count(), 1)
+
+    def test_rename_to_duplicate_name(self):
+        other = TaskCategory.objects.create(name='Hobby', owner=self.user)
+        url = reverse('tasks:category_detail', args=[other.pk])
+        response = self.client.patch(url, {'name': 'groceries'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['name'], ['You already have a category with this name'])
+
+    def test_global_name_in_another_case(self):
+        TaskCategory.objects.create(name='Paperwork')
+        response = self.client.post(self.url, {'name': 'paperWORK'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['name'], ['Category with this name already exists globally'])
+
+    def test_other_owners_may_reuse_the_name(self):
+        self.client.force_authenticate(create_user('other@example.com'))
+        response = self.client.post(self.url, {'name': 'groceries'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+class TaskCategoryCacheTests(APITestCase):
+    """
+    Cached categories, with invalidations seen by every process
+    """
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        shared = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        TaskCategory.objects._global_snapshot = None
+        # Global categories created by migrations
+        self.existing = set(TaskCategory.objects.filter(owner__isnull=True).values_list('name', flat=True))
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.global_category = TaskCategory.objects.create(name='Work')
+        self.own_category = TaskCategory.objects.create(name='Home', owner=self.user)
+
+    def names(self):
+        return {category.name for category in TaskCategory.objects.visible_to(self.user)} - self.existing
+
+    def test_reads_are_cached(self):
+        self.assertTrue(TaskCategory.objects.cache_enabled())
+        self.assertEqual(self.names(), {'Home', 'Work'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), {'Home', 'Work'})
+            self.assertEqual(TaskCategory.objects.get_visible(self.user, self.own_category.pk), self.own_category)
+
+    def test_writes_invalidate_on_commit(self):
+        self.names()
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskCategory.objects.create(name='Garden', owner=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.global_category.delete()
+        self.assertEqual(self.names(), {'Garden', 'Home'})
+
+    def test_invalidation_from_another_process(self):
+        self.names()
+        # What another worker or populate_categories leaves behind: new
+        # rows and new versions in the shared cache
+        TaskCategory.objects.bulk_create([TaskCategory(name='Study'), TaskCategory(name='Shop', owner=self.user)])
+        cache.set(TaskCategory.objects.GLOBAL_VERSION_KEY, 'other-process')
+        cache.set(TaskCategory.objects.USER_VERSION_KEY.format(self.user.pk), 'other-process')
+        self.assertEqual(self.names(), {'Home', 'Shop', 'Study', 'Work'})
+        study = TaskCategory.objects.get(name='Study')
+        response = self.client.post(reverse('tasks:task_list_create'), {'title': 'Revise', 'category': study.pk})
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_backend_reads_the_database(self):
+        self.assertFalse(TaskCategory.objects.cache_enabled())
+        self.names()
+        TaskCategory.objects.bulk_create([TaskCategory(name='Study')])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(), {'Home', 'Study', 'Work'})
+
+
+# Wednesday
+INTENTS_NOW = timezone.make_aware(datetime(2026, 10, 14, 10, 0))
+
+# message: (intent, title, deadline, category, priority)
+COMMANDS = {
+    'create task Buy milk tomorrow at 18:00': ('create', 'Buy milk', '2026-10-15 18:00', None, None),
+    'добавь задачу купить хлеб завтра в 9 вечера': ('create', 'Купить хлеб', '2026-10-15 21:00', None, None),
+    'remind me to call mom on friday': ('create', 'Call mom', '2026-10-16 09:00', None, None),
+    'create task report in 2 days in category Work with high priority': (
+        'create', 'Report', '2026-10-16 09:00', 'Work', 'high'),
+    'создай задачу отчёт 31.12 категория Работа': ('create', 'Отчёт', '2026-12-31 09:00', 'Работа', None),
+    'напомни мне позвонить врачу через 3 часа': ('create', 'Позвонить врачу', '2026-10-14 13:00', None, None),
+    'add task "Pay rent" on 1st November, urgent': ('create', 'Pay rent', '2026-11-01 09:00', None, 'high'),
+    'create task Plan for next week': ('create', 'Plan', '2026-10-21 09:00', None, None),
+    'создай задачу план на следующей неделе': ('create', 'План', '2026-10-21 09:00', None, None),
+    'create task Ask if I may leave early': ('create', 'Ask if I may leave early', None, None, None),
+    'mark Buy milk as done': ('complete', 'Buy milk', None, None, None),
+    'отметь купить хлеб выполненной': ('complete', 'купить хлеб', None, None, None),
+    'complete the task write report': ('complete', 'write report', None, None, None),
+    'delete task Buy milk': ('delete', 'Buy milk', None, None, None),
+    'удали задачу старый отчёт': ('delete', 'старый отчёт', None, None, None),
+    'перенеси отчёт на пятницу': ('reschedule', 'отчёт', '2026-10-16 09:00', None, None),
+    'move report to next monday 10am': ('reschedule', 'report', '2026-10-19 10:00', None, None),
+    'postpone dentist to 2026-11-02': ('reschedule', 'dentist', '2026-11-02 09:00', None, None),
+}
+
+# Not commands at all
+NOT_COMMANDS = [
+    'how are you',
+    'what should I do today?',
+    'create task buy milk and delete task report',
+    'move report somewhere',
+]
+
+# Recognized, but left to the model: only a date for a title, or nothing to parse it as
+UNSURE_COMMANDS = [
+    'create task in 0 days',
+    'create task call bank in 0 days',
+    'create task tomorrow',
+    'add milk',
+    # Dates the rules don't parse, left in the title
+    'create task pay rent on the 1st',
+    'create task Report in May 2026',
+    'create task dentist next Thursday afternoon or Friday',
+    'создай задачу отчёт к 5-му',
+]
+
+
+@mock.patch('tasks.intents._now', return_value=INTENTS_NOW)
+class IntentParserTests(SimpleTestCase):
+    """
+    parse_command() on the supported command forms
+    """
+
+    def test_commands(self, now):
+        for message, (intent, title, deadline, category, priority) in COMMANDS.items():
+            with self.subTest(message):
+                command = intents.parse_command(message)
+                self.assertIsNotNone(command)
+                when = command['when'] and intents.resolve_when(command['when']).strftime('%Y-%m-%d %H:%M')
+                self.assertEqual(
+                    (command['intent'], command['title'], when, command['category'], command['priority']),
+                    (intent, title, deadline, category, priority),
+                )
+                self.assertGreaterEqual(command['confidence'], 0.8)
+
+    def test_not_commands(self, now):
+        for message in NOT_COMMANDS:
+            with self.subTest(message):
+                self.assertIsNone(intents.parse_command(message))
+
+    def test_unsure_commands(self, now):
+        for message in UNSURE_COMMANDS:
+            with self.subTest(message):
+                self.assertLess(intents.parse_command(message)['confidence'], 0.8)
+
+    def test_zero_offsets_are_not_dates(self, now):
+        self.assertIsNone(intents.parse_when('in 0 days'))
+        self.assertIsNone(intents.parse_when('через 0 минут'))
+
+
+@mock.patch('tasks.intents._now', return_value=INTENTS_NOW)
+@override_settings(AI_INTENT_FAST_PATH=True, AI_INTENT_MIN_CONFIDENCE=0.8)
+class IntentPlanTests(TestCase):
+    """
+    match_command() + command_plan(): the plan, or None to ask the model
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.report = Task.objects.create(user=self.user, title='Quarterly report')
+
+    def plan(self, message):
+        command = intents.match_command(message)
+        return intents.command_plan(self.user, command) if command else None
+
+    def test_create(self, now):
+        plan = self.plan('create task Buy milk tomorrow at 18:00')
+        self.assertEqual(plan['tasks'], [{
+            'title': 'Buy milk',
+            'deadline': timezone.make_aware(datetime(2026, 10, 15, 18, 0)).isoformat(),
+        }])
+
+    def test_existing_task(self, now):
+        self.assertEqual(self.plan('mark quarterly report as done')['update_tasks'],
+                         [{'id': self.report.id, 'is_done': True}])
+        self.assertEqual(self.plan('delete task Quarterly report')['delete_tasks'], [{'id': self.report.id}])
+        self.assertIsNone(self.plan('delete task Something else'))
+
+    def test_past_deadlines_go_to_the_model(self, now):
+        self.assertIsNone(self.plan('create task pay rent 31.12.2025'))
+        self.assertIsNone(self.plan('create task pay rent today at 9:00'))
+        self.assertIsNone(self.plan('move quarterly report to 01.01.2020'))
+
+    def test_no_queries_without_a_command(self, now):
+        with self.assertNumQueries(0):
+            self.assertIsNone(intents.match_command('how are you'))
+
+
+class OncePerMinuteThrottle(UserRateThrottle):
+    rate = '1/min'
+
+
+@override_settings(AI_ASYNC_DB_CONCURRENCY=1, AI_ASYNC_DB_CONN_MAX_AGE=0)
+class AsyncViewTests(TransactionTestCase):
+    """
+    The async views apply the sync views' DRF policy; their database work
+    runs on the pool (other connections, so data must be committed)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.factory = AsyncRequestFactory()
+        pool = async_views.DatabasePool()
+        patcher = mock.patch.object(async_views, 'database', pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: pool._executor and pool._executor.shutdown())
+
+    def get_chats(self, authenticated=True):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'} if authenticated else {}
+        return async_to_sync(async_views.ai_chats_list)(self.factory.get('/api/tasks/ai/chats/', headers=headers))
+
+    def test_authentication_required(self):
+        response = self.get_chats(authenticated=False)
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(response.has_header('WWW-Authenticate'))
+
+    def test_throttled(self):
+        with mock.patch.object(async_views.AsyncViewPolicy, 'throttle_classes', [OncePerMinuteThrottle]):
+            self.assertEqual(self.get_chats().status_code, 200)
+            response = self.get_chats()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+
+    @override_settings(AI_ASYNC_DB_CONN_MAX_AGE=60)
+    def test_pool_threads_keep_connections(self):
+        def max_age():
+            return connection.settings_dict['CONN_MAX_AGE']
+        self.assertEqual(async_to_sync(async_views.database.run)(max_age), 60)
+        async_to_sync(async_views.database.run)(lambda: connection.close())
+
+
+class StubProviderMixin:
+    """
+    Point the assistant at a local OpenAI-compatible stub server
+    """
+
+    def start_stub(self, **options):
+        stub = StubOpenAIServer(**options).__enter__()
+        self.addCleanup(stub.__exit__, None, None, None)
+        environ = mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'sk-test', 'OPENAI_BASE_URL': stub.base_url})
+        environ.start()
+        self.addCleanup(environ.stop)
+        for reset in (ai.reset_provider, ai.clients.clear):
+            reset()
+            self.addCleanup(reset)
+        return stub
+
+
+@mock.patch('tasks.intents._now', return_value=INTENTS_NOW)
+@override_settings(AI_INTENT_FAST_PATH=True, AI_INTENT_MIN_CONFIDENCE=0.8, AI_ASYNC_DB_CONCURRENCY=1)
+class AssistViewTests(StubProviderMixin, TransactionTestCase):
+    """
+    The sync and async ai_assist views make the same provider calls and
+    return the same replies
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.stub = self.start_stub()
+        pool = async_views.DatabasePool()
+        patcher = mock.patch.object(async_views, 'database', pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: pool._executor and pool._executor.shutdown())
+
+    def assist_sync(self, data):
+        request = APIRequestFactory().post('/api/tasks/ai/assist/', data, format='json')
+        force_authenticate(request, self.user)
+        response = views.ai_assist(request)
+        return response.status_code, json.loads(response.render().content)
+
+    def assist_async(self, data):
+        request = AsyncRequestFactory().post(
+            '/api/tasks/ai/assist/', data, content_type='application/json',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        response = async_to_sync(async_views.ai_assist)(request)
+        return response.status_code, json.loads(response.content)
+
+    def assist(self, data):
+        """
+        (status, payload, provider requests) from each view, chat ids left out
+        """
+        results = []
+        for view in (self.assist_sync, self.assist_async):
+            before = self.stub.requests
+            status_code, payload = view(data)
+            payload.pop('chat_id', None)
+            results.append((status_code, payload, self.stub.requests - before))
+        self.assertEqual(results[0], results[1])
+        return results[0]
+
+    def test_message_asks_for_answer_and_plan(self, now):
+        status_code, payload, requests = self.assist({'message': 'How should I plan my week'})
+        self.assertEqual((status_code, requests), (200, 2))
+        self.assertEqual(payload['reply'], 'Stub answer.')
+        self.assertFalse(payload['requires_confirmation'])
+
+    def test_simple_command_is_planned_by_the_rules(self, now):
+        status_code, payload, requests = self.assist({'message': 'create task Buy milk tomorrow at 18:00'})
+        self.assertEqual((status_code, requests), (200, 0))
+        self.assertTrue(payload['requires_confirmation'])
+        self.assertEqual(payload['plan']['tasks'][0]['title'], 'Buy milk')
+
+    def test_confirm_executes_the_client_plan(self, now):
+        plan = {'categories': [], 'tasks': [{'title': 'Call bank'}]}
+        status_code, payload, requests = self.assist({'confirm': True, 'actions': plan})
+        self.assertEqual((status_code, requests, payload['executed']), (200, 0, True))
+        self.assertEqual(Task.objects.filter(user=self.user, title='Call bank').count(), 2)
+
+    def test_confirm_without_a_plan_asks_for_the_plan_only(self, now):
+        status_code, payload, requests = self.assist({'confirm': True, 'message': 'Tidy up my list somehow'})
+        self.assertEqual((status_code, requests, payload['executed']), (200, 1, True))
+
+    def test_provider_errors(self, now):
+        with override_settings(DEBUG=False), mock.patch.dict(os.environ, {'OPENAI_BASE_URL': 'http://127.0.0.1:9/v1'}):
+            ai.reset_provider()
+            status_code, payload, _ = self.assist({'message': 'How should I plan my week'})
+        self.assertEqual(status_code, 503)
+        self.assertEqual(payload, {'error': 'Сервис ИИ пока что недоступен'})
+
+
+class AIClientTests(StubProviderMixin, APITestCase):
+    """
+    Provider clients, and with them their connections, are reused across
+    assist requests
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.stub = self.start_stub()
+
+    def test_one_client_per_key_and_process(self):
+        client = ai.clients.get(self.stub.base_url, 'sk-test')
+        self.assertIs(ai.clients.get(self.stub.base_url, 'sk-test'), client)
+        self.assertIsNot(ai.clients.get(self.stub.base_url, 'sk-other'), client)
+        with mock.patch('tasks.ai.os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(ai.clients.get(self.stub.base_url, 'sk-test'), client)
+
+    def test_connections_are_kept_alive(self):
+        url = reverse('tasks:ai_assist')
+        self.assertEqual(self.client.post(url, {'message': 'How should I plan my week'}, format='json').status_code, 200)
+        connections = self.stub.connections
+        for _ in range(3):
+            self.assertEqual(self.client.post(url, {'message': 'And the next one'}, format='json').status_code, 200)
+        self.assertEqual(self.stub.requests, 8)
+        self.assertEqual(self.stub.connections, connections)
+
+
+class ProviderCallTests(SimpleTestCase):
+    """
+    The answer and plan calls run concurrently under one deadline; a
+    failure or the deadline stops the others
+    """
+
+    def test_results_and_remaining_time(self):
+        results = ai.call_pool.run({'a': lambda remaining: 'a', 'b': lambda remaining: remaining}, 5)
+        self.assertEqual(results['a'], 'a')
+        self.assertTrue(4 < results['b'] <= 5)
+
+    def test_single_call_stays_on_the_request_thread(self):
+        results = ai.call_pool.run({'a': lambda remaining: threading.current_thread()}, 5)
+        self.assertIs(results['a'], threading.current_thread())
+
+    def test_failure_is_raised_without_waiting(self):
+        def fail(remaining):
+            raise ValueError('boom')
+
+        started = time.monotonic()
+        with self.assertRaisesMessage(ValueError, 'boom'):
+            ai.call_pool.run({'slow': lambda remaining: time.sleep(0.5), 'fail': fail}, 5)
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_deadline(self):
+        started = time.monotonic()
+        with self.assertRaisesMessage(TimeoutError, 'slow: assist deadline exceeded'):
+            ai.call_pool.run({'slow': lambda remaining: time.sleep(0.5), 'fast': lambda remaining: 'ok'}, 0.1)
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_async_failure_cancels_the_others(self):
+        cancelled = []
+
+        async def slow(remaining):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append('slow')
+                raise
+
+        async def fail(remaining):
+            raise ValueError('boom')
+
+        with self.assertRaisesMessage(ValueError, 'boom'):
+            asyncio.run(ai.gather_calls({'slow': slow, 'fail': fail}, 5))
+        self.assertEqual(cancelled, ['slow'])
+
+    def test_async_deadline(self):
+        async def slow(remaining):
+            await asyncio.sleep(5)
+
+        async def fast(remaining):
+            return remaining
+
+        started = time.monotonic()
+        with self.assertRaisesMessage(TimeoutError, 'slow: assist deadline exceeded'):
+            asyncio.run(ai.gather_calls({'slow': slow, 'fast': fast}, 0.1))
+        self.assertLess(time.monotonic() - started, 0.4)
+
+
+class AssistDeadlineTests(StubProviderMixin, APITestCase):
+    """
+    A slow provider gets a 503 once AI_ASSIST_DEADLINE has passed
+    """
+
+    def setUp(self):
+        self.client.force_authenticate(create_user())
+        self.start_stub(latency=1)
+
+    @override_settings(AI_ASSIST_DEADLINE=0.2, DEBUG=False)
+    def test_deadline(self):
+        started = time.monotonic()
+        response = self.client.post(reverse('tasks:ai_assist'), {'message': 'How should I plan my week'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data, {'error': 'Сервис ИИ пока что недоступен'})
+        self.assertLess(time.monotonic() - started, 0.8)
+
+
+class AssistStreamTests(StubProviderMixin, APITestCase):
+    """
+    With Accept: text/event-stream the answer is sent as 'token' events,
+    then a 'plan' or 'error' event
+    """
+
+    def setUp(self):
+        self.client.force_authenticate(create_user())
+        self.stub = self.start_stub(token_interval=0.01)
+
+    def post(self, data):
+        return self.client.post(reverse('tasks:ai_assist'), data, format='json', HTTP_ACCEPT='text/event-stream')
+
+    def events(self, chunks):
+        events = []
+        for chunk in chunks:
+            for block in chunk.decode().split('\n\n'):
+                if block:
+                    event, data = block.split('\n')
+                    events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+        return events
+
+    def assistant_messages(self):
+        return list(ChatMessage.objects.filter(role='assistant').values_list('content', flat=True))
+
+    def test_tokens_then_plan(self):
+        response = self.post({'message': 'How should I plan my week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/event-stream'))
+        events = self.events(response.streaming_content)
+        self.assertEqual({name for name, _ in events[:-1]}, {'token'})
+        self.assertEqual(''.join(data['text'] for _, data in events[:-1]), STREAMED_ANSWER)
+        name, payload = events[-1]
+        self.assertEqual(name, 'plan')
+        self.assertEqual(payload['reply'], STREAMED_ANSWER)
+        self.assertEqual(self.assistant_messages(), [STREAMED_ANSWER])
+
+    def test_confirm_sends_only_the_plan(self):
+        plan = {'categories': [], 'tasks': [{'title': 'Call bank'}]}
+        response = self.post({'confirm': True, 'actions': plan})
+        events = self.events(response.streaming_content)
+        self.assertEqual([name for name, _ in events], ['plan'])
+        self.assertTrue(events[0][1]['executed'])
+        self.assertEqual(self.stub.requests, 0)
+
+    @override_settings(AI_MAX_RETRIES=0, DEBUG=False)
+    def test_provider_error(self):
+        with mock.patch.dict(os.environ, {'OPENAI_BASE_URL': 'http://127.0.0.1:9/v1'}):
+            ai.reset_provider()
+            events = self.events(self.post({'message': 'How should I plan my week'}).streaming_content)
+        self.assertEqual(events, [('error', {'error': 'Сервис ИИ пока что недоступен'})])
+        self.assertEqual(self.assistant_messages(), [])
+
+    def test_disconnect_saves_the_partial_answer(self):
+        response = self.post({'message': 'How should I plan my week'})
+        chunks = iter(response.streaming_content)
+        received = self.events([next(chunks), next(chunks)])
+        # As the server does when the client goes away; request_finished
+        # would close the test database connection
+        with mock.patch.object(request_finished, 'send'):
+            response.close()
+        partial = ''.join(data['text'] for _, data in received)
+        self.assertTrue(STREAMED_ANSWER.startswith(partial))
+        self.assertNotEqual(partial, STREAMED_ANSWER)
+        self.assertEqual(self.assistant_messages(), [partial])
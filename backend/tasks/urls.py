@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'tasks'
 
+# Under ASGI the assistant is served by async views (see AI_ASYNC_VIEWS)
+ai_views = async_views if settings.AI_ASYNC_VIEWS else views
+
 urlpatterns = [
     # Task CRUD endpoints
     path('', views.TaskListCreateView.as_view(), name='task_list_create'),
@@ -11,6 +15,8 @@ urlpatterns = [
     
     # Task bulk operations
     path('bulk/', views.TaskBulkOperationsView.as_view(), name='task_bulk_operations'),
+    path('bulk/filter/', views.TaskFilterActionView.as_view(), name='task_filter_action'),
+    path('batch/', views.TaskBatchView.as_view(), name='task_batch'),
     
     # Task categories
     path('categories/', views.TaskCategoryListCreateView.as_view(), name='category_list_create'),
@@ -20,10 +26,11 @@ urlpatterns = [
     path('stats/', views.task_stats, name='task_stats'),
     path('upcoming/', views.upcoming_tasks, name='upcoming_tasks'),
     path('search/', views.search_tasks, name='search_tasks'),
+    path('sync/', views.task_sync, name='task_sync'),
     # AI assistant
-    path('ai/assist/', views.ai_assist, name='ai_assist'),
-    path('ai/chats/', views.ai_chats_list, name='ai_chats_list'),
-    path('ai/chats/<int:chat_id>/', views.ai_chat_messages, name='ai_chat_messages'),
+    path('ai/assist/', ai_views.ai_assist, name='ai_assist'),
+    path('ai/chats/', ai_views.ai_chats_list, name='ai_chats_list'),
+    path('ai/chats/<int:chat_id>/', ai_views.ai_chat_messages, name='ai_chat_messages'),
     
     # Health check
     path('health/', views.health_check, name='health_check'),
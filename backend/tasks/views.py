@@ -1,35 +1,43 @@
 from rest_framework import generics, status, permissions, filters
 from rest_framework import generics, permissions, status, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from django.db.models import Q, Count, Case, When, IntegerField
-from django.db.models.functions import TruncDate
-from .models import Task, TaskCategory, ChatSession, ChatMessage
+from django.db.models import Q
+from .models import Task, TaskCategory, TaskCounters, TaskDailyActivity, ChatMessage
 from .serializers import (
     TaskListSerializer,
+    TaskListRowSerializer,
+    TaskSearchResultRowSerializer,
     TaskDetailSerializer,
     TaskCreateUpdateSerializer,
     TaskStatusUpdateSerializer,
     TaskBulkUpdateSerializer,
+    TaskBatchSerializer,
+    TaskFilterActionSerializer,
     TaskCategorySerializer,
     TaskStatsSerializer,
+    TaskStatsQuerySerializer,
+    TaskSyncSerializer,
     TaskSearchSerializer
 )
-from decouple import config
+from .bulk import write_batch
+from .conditional import ConditionalGetMixin, conditional_get
+from .fieldsets import get_requested_fields, get_source_columns
+from .pagination import TaskKeysetPagination
+from .search import TaskSearchFilter, filter_tasks
+from .sync import SyncTokenExpired, encode_sync_token, get_changes
+from . import ai, assistant, intents
 from django.conf import settings
-import json
-from datetime import datetime
-from django.utils.dateparse import parse_datetime
-try:
-    from openai import OpenAI
-except Exception:  # pragma: no cover
-    OpenAI = None
+from todo_project.metrics import metrics
+from todo_project.renderers import EventStreamRenderer, event_stream_response, render_event
+import time
 
 
-class TaskCategoryListCreateView(generics.ListCreateAPIView):
+class TaskCategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating task categories
     """
@@ -40,9 +48,21 @@ class TaskCategoryListCreateView(generics.ListCreateAPIView):
         # return global categories (owner is null) + user's own
         return TaskCategory.objects.filter(
             Q(owner__isnull=True) | Q(owner=self.request.user)
-        ).annotate(
-            task_count=Count('tasks', filter=Q(tasks__user=self.request.user))
         ).order_by('name')
+    
+    def list(self, request, *args, **kwargs):
+        # Categories from the category cache, per-user task counts from the counters
+        categories = TaskCategory.objects.visible_to(request.user)
+        by_category = TaskCounters.objects.for_user(request.user).by_category
+        for category in categories:
+            category.task_count = by_category.get(TaskCounters.category_key(category.pk), 0)
+        
+        page = self.paginate_queryset(categories)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(categories, many=True)
+        return Response(serializer.data)
 
 
 class TaskCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -73,21 +93,27 @@ class TaskCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().destroy(request, *args, **kwargs)
 
 
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating tasks
     """
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description']
     filterset_fields = ['category', 'priority', 'is_done']
     ordering_fields = ['created_at', 'deadline', 'priority', 'title']
     ordering = ['-created_at']
     
+    @property
+    def pagination_class(self):
+        # Opt-in keyset pagination: ?pagination=cursor
+        request = getattr(self, 'request', None)
+        if request is not None and request.query_params.get('pagination') == 'cursor':
+            return TaskKeysetPagination
+        return api_settings.DEFAULT_PAGINATION_CLASS
+    
     def get_queryset(self):
-        queryset = Task.objects.filter(user=self.request.user).select_related(
-            'category', 'user'
-        )
+        queryset = Task.objects.filter(user=self.request.user)
         
         # Custom filtering
         is_overdue = self.request.query_params.get('is_overdue')
@@ -113,6 +139,17 @@ class TaskListCreateView(generics.ListCreateAPIView):
             return TaskCreateUpdateSerializer
         return TaskListSerializer
     
+    def list(self, request, *args, **kwargs):
+        # Serialize from .values() rows; output matches TaskListSerializer
+        fields = get_requested_fields(request, TaskListRowSerializer.FIELDS)
+        queryset = TaskListRowSerializer.values(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                TaskListRowSerializer(page, user=request.user, fields=fields).data
+            )
+        return Response(TaskListRowSerializer(queryset, user=request.user, fields=fields).data)
+    
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -132,16 +169,37 @@ class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_fieldset(self):
+        """
+        Fields selected with ?fields= / ?omit= on GET, else None
+        """
+        if self.request.method != 'GET':
+            return None
+        return get_requested_fields(self.request, TaskDetailSerializer.Meta.fields)
+    
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user).select_related(
-            'category', 'user'
-        )
+        queryset = Task.objects.filter(user=self.request.user)
+        fields = self.get_fieldset()
+        if fields is None:
+            return queryset.select_related('category', 'user')
+        queryset = queryset.only(*get_source_columns(fields, TaskDetailSerializer.FIELD_SOURCES))
+        related = [
+            TaskDetailSerializer.RELATED_FIELDS[name]
+            for name in fields if name in TaskDetailSerializer.RELATED_FIELDS
+        ]
+        # select_related() without arguments would follow every relation
+        return queryset.select_related(*related) if related else queryset
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return TaskCreateUpdateSerializer
         return TaskDetailSerializer
     
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
+    
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -211,20 +269,19 @@ class TaskBulkOperationsView(APIView):
         )
         
         if action == 'complete':
-            updated_count = tasks.filter(is_done=False).update(
+            updated_count = tasks.filter(is_done=False).tracked_update(
                 is_done=True,
                 completed_at=timezone.now()
             )
             message = f'{updated_count} tasks marked as completed'
         elif action == 'uncomplete':
-            updated_count = tasks.filter(is_done=True).update(
+            updated_count = tasks.filter(is_done=True).tracked_update(
                 is_done=False,
                 completed_at=None
             )
             message = f'{updated_count} tasks marked as pending'
         elif action == 'delete':
-            deleted_count = tasks.count()
-            tasks.delete()
+            deleted_count = tasks.tracked_delete()
             message = f'{deleted_count} tasks deleted'
         
         return Response({
@@ -233,51 +290,111 @@ class TaskBulkOperationsView(APIView):
         })
 
 
+class TaskFilterActionView(APIView):
+    """
+    API endpoint for bulk actions on all tasks matching search filters
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = TaskFilterActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        action = serializer.validated_data['action']
+        dry_run = serializer.validated_data['dry_run']
+        tasks = filter_tasks(Task.objects.filter(user=request.user), serializer.validated_data)
+        if action == 'complete':
+            tasks = tasks.filter(is_done=False)
+        elif action == 'uncomplete':
+            tasks = tasks.filter(is_done=True)
+        
+        if dry_run:
+            affected_count = tasks.count()
+        elif action == 'complete':
+            affected_count = tasks.tracked_update(is_done=True, completed_at=timezone.now())
+        elif action == 'uncomplete':
+            affected_count = tasks.tracked_update(is_done=False, completed_at=None)
+        else:
+            affected_count = tasks.tracked_delete()
+        
+        verb = {
+            'complete': 'marked as completed',
+            'uncomplete': 'marked as pending',
+            'delete': 'deleted',
+        }[action]
+        return Response({
+            'message': f'{affected_count} tasks {"would be " if dry_run else ""}{verb}',
+            'affected_count': affected_count,
+            'dry_run': dry_run
+        })
+
+
+class TaskBatchView(APIView):
+    """
+    API endpoint for creating and partially updating many tasks at once
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = TaskBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        created, updated, errors = write_batch(
+            request.user,
+            serializer.validated_data['create'],
+            serializer.validated_data['update'],
+            all_or_nothing=serializer.validated_data['all_or_nothing']
+        )
+        has_errors = bool(errors['create'] or errors['update'])
+        
+        if has_errors and serializer.validated_data['all_or_nothing']:
+            return Response({
+                'message': 'Batch rejected, no tasks were written',
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': f'{len(created)} tasks created, {len(updated)} tasks updated',
+            'created': created,
+            'updated': updated,
+            'errors': errors
+        }, status=status.HTTP_207_MULTI_STATUS if has_errors else status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get
 def task_stats(request):
     """
     Get comprehensive task statistics for the user
+    Query: ?days=7|30|365 (recent activity window, default 7)
     """
+    query_serializer = TaskStatsQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+    days = query_serializer.validated_data['days']
     user = request.user
     
-    # Basic counts
-    total_tasks = user.tasks.count()
-    completed_tasks = user.tasks.filter(is_done=True).count()
-    pending_tasks = total_tasks - completed_tasks
-    overdue_tasks = user.tasks.filter(
-        deadline__lt=timezone.now(),
-        is_done=False
-    ).count()
+    # Basic counts (maintained incrementally, see TaskCounters)
+    counters = TaskCounters.objects.for_user(user)
+    total_tasks = counters.total
+    completed_tasks = counters.completed
+    pending_tasks = counters.pending
+    overdue_tasks = counters.get_overdue_count()
     
     # Tasks by category
-    tasks_by_category = dict(
-        user.tasks.values('category__name')
-        .annotate(count=Count('id'))
-        .values_list('category__name', 'count')
-    )
+    tasks_by_category = counters.get_tasks_by_category()
     
     # Tasks by priority
-    tasks_by_priority = dict(
-        user.tasks.values('priority')
-        .annotate(count=Count('id'))
-        .values_list('priority', 'count')
-    )
+    tasks_by_priority = counters.get_tasks_by_priority()
     
-    # Recent activity (last 7 days)
-    seven_days_ago = timezone.now() - timezone.timedelta(days=7)
-    recent_activity = list(
-        user.tasks.filter(created_at__gte=seven_days_ago)
-        .extra(select={'date': 'date(created_at)'})
-        .values('date')
-        .annotate(count=Count('id'))
-        .order_by('date')
-    )
+    # Recent activity from the daily rollup (one row per active day)
+    recent_activity = [
+        {'date': row.date, 'count': row.created, 'completed': row.completed}
+        for row in TaskDailyActivity.objects.window(user, days)
+    ]
     
     # Completion rate
-    completion_rate = round(
-        (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2
-    )
+    completion_rate = counters.completion_rate
     
     stats_data = {
         'total_tasks': total_tasks,
@@ -296,6 +413,7 @@ def task_stats(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get
 def upcoming_tasks(request):
     """
     Get upcoming tasks (with deadlines in next 7 days)
@@ -307,12 +425,47 @@ def upcoming_tasks(request):
         deadline__gte=timezone.now(),
         deadline__lte=seven_days_from_now,
         is_done=False
-    ).select_related('category').order_by('deadline')
+    ).order_by('deadline')
     
-    serializer = TaskListSerializer(upcoming, many=True)
+    fields = get_requested_fields(request, TaskListRowSerializer.FIELDS)
+    tasks = TaskListRowSerializer(
+        TaskListRowSerializer.values(upcoming, fields), user=user, fields=fields
+    ).data
     return Response({
-        'count': upcoming.count(),
-        'tasks': serializer.data
+        'count': len(tasks),
+        'tasks': tasks
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@conditional_get
+def task_sync(request):
+    """
+    Delta sync: tasks created or updated and ids of tasks deleted since
+    the given token. Query: ?since=<token>&limit=<n>
+    Responds 410 when the token is older than the tombstone retention
+    window; the client must then resync without `since`.
+    """
+    sync_serializer = TaskSyncSerializer(data=request.query_params)
+    sync_serializer.is_valid(raise_exception=True)
+    since = sync_serializer.validated_data.get('since') or 0
+    limit = sync_serializer.validated_data['limit']
+    
+    try:
+        tasks, deleted, last_seq, has_more = get_changes(request.user, since, limit)
+    except SyncTokenExpired:
+        return Response({
+            'error': 'sync_token_expired',
+            'detail': 'Full resync required'
+        }, status=status.HTTP_410_GONE)
+    
+    serializer = TaskListSerializer(tasks, many=True)
+    return Response({
+        'tasks': serializer.data,
+        'deleted': deleted,
+        'next_token': encode_sync_token(last_seq),
+        'has_more': has_more,
     })
 
 
@@ -324,52 +477,37 @@ def search_tasks(request):
     """
     search_serializer = TaskSearchSerializer(data=request.query_params)
     search_serializer.is_valid(raise_exception=True)
+    fields = get_requested_fields(request, TaskSearchResultRowSerializer.FIELDS)
     
-    queryset = Task.objects.filter(user=request.user).select_related('category', 'user')
+    queryset = Task.objects.filter(user=request.user)
     
     # Apply filters
-    search_term = search_serializer.validated_data.get('search')
-    if search_term:
-        queryset = queryset.filter(
-            Q(title__icontains=search_term) | 
-            Q(description__icontains=search_term)
-        )
-    
-    category = search_serializer.validated_data.get('category')
-    if category:
-        queryset = queryset.filter(category_id=category)
-    
-    priority = search_serializer.validated_data.get('priority')
-    if priority:
-        queryset = queryset.filter(priority=priority)
-    
-    is_done = search_serializer.validated_data.get('is_done')
-    if is_done is not None:
-        queryset = queryset.filter(is_done=is_done)
-    
-    is_overdue = search_serializer.validated_data.get('is_overdue')
-    if is_overdue:
-        queryset = queryset.filter(
-            deadline__lt=timezone.now(),
-            is_done=False
+    search_term = (search_serializer.validated_data.get('search') or '').strip()
+    queryset = filter_tasks(
+        queryset,
+        search_serializer.validated_data,
+        rank=True,
+        highlight=(
+            search_serializer.validated_data.get('highlight', True) and
+            (fields is None or 'highlight' in fields)
         )
+    )
     
-    deadline_from = search_serializer.validated_data.get('deadline_from')
-    if deadline_from:
-        queryset = queryset.filter(deadline__gte=deadline_from)
-    
-    deadline_to = search_serializer.validated_data.get('deadline_to')
-    if deadline_to:
-        queryset = queryset.filter(deadline__lte=deadline_to)
-    
-    # Apply ordering
-    ordering = search_serializer.validated_data.get('ordering', '-created_at')
-    queryset = queryset.order_by(ordering)
+    # Apply ordering (relevance is only meaningful with a search term)
+    ordering = search_serializer.validated_data.get('ordering')
+    if not ordering:
+        ordering = 'relevance' if search_term else '-created_at'
+    if ordering == 'relevance':
+        queryset = queryset.order_by('-search_rank', '-created_at') if search_term else queryset.order_by('-created_at')
+    else:
+        queryset = queryset.order_by(ordering)
     
-    serializer = TaskListSerializer(queryset, many=True)
+    tasks = TaskSearchResultRowSerializer(
+        TaskSearchResultRowSerializer.values(queryset, fields), user=request.user, fields=fields
+    ).data
     return Response({
-        'count': queryset.count(),
-        'tasks': serializer.data
+        'count': len(tasks),
+        'tasks': tasks
     })
 
 
@@ -386,19 +524,68 @@ def health_check(request):
     })
 
 
+def stream_assist_reply(client, provider, session, answer_request, plan_call, started):
+    """
+    Server-sent events for a streamed assist reply: 'token' events with the
+    answer text as the provider produces it, then a 'plan' event with the
+    JSON response payload (its 'reply' replaces the streamed text when a
+    plan was prepared), or an 'error' event.
+
+    The assistant message is saved at the end. If the client disconnects,
+    the text received so far is saved and the provider stream is closed,
+    so its connection is not left open.
+    """
+    plan = ai.call_pool.submit({'plan': plan_call}, getattr(settings, 'AI_ASSIST_DEADLINE', 30))
+    stream = None
+    parts = []
+    saved = False
+    try:
+        stream = client.chat.completions.create(**answer_request, stream=True)
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if not parts:
+                metrics.observe('ai.stream.first_token_seconds', time.perf_counter() - started)
+            parts.append(delta)
+            yield render_event('token', {'text': delta})
+
+        actions = plan.results()['plan']
+        answer, payload = assistant.build_reply(provider, session, ''.join(parts), actions, False, [])
+        ChatMessage.objects.create(session=session, role='assistant', content=answer)
+        saved = True
+        yield render_event('plan', payload)
+    except GeneratorExit:
+        metrics.increment('ai.stream.disconnects')
+        raise
+    except Exception as e:
+        yield render_event('error', assistant.unavailable_payload(provider, e))
+    finally:
+        plan.cancel()
+        if stream is not None:
+            stream.close()
+        if not saved and parts:
+            ChatMessage.objects.create(session=session, role='assistant', content=''.join(parts))
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer])
 def ai_assist(request):
     """
     AI assistant endpoint. Uses OpenAI with server-side key and the
     authenticated user's tasks as context. Never exposes other users' data.
     Body: {"message": "..."}
+    With `Accept: text/event-stream` the reply is streamed as server-sent
+    events (see stream_assist_reply). Served by tasks.async_views.ai_assist
+    when AI_ASYNC_VIEWS is enabled.
     """
-    api_key = config('OPENAI_API_KEY', default=None)
-    # Optional custom base URL (for providers like OpenRouter)
-    base_url_env = config('OPENAI_BASE_URL', default=None)
-    if not api_key or OpenAI is None:
-        return Response({'error': 'Сервис ИИ пока что недоступен'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    started = time.perf_counter()
+    stream = isinstance(request.accepted_renderer, EventStreamRenderer)
+    # Provider settings and API clients are shared per process (see tasks.ai)
+    provider = ai.get_provider()
+    if provider is None:
+        return Response(assistant.unavailable_payload(), status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     user = request.user
     data = request.data or {}
@@ -406,474 +593,71 @@ def ai_assist(request):
     if not user_message and not data.get('confirm'):
         return Response({'error': 'message is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Chat session handling
-    chat_id = data.get('chat_id')
-    session = None
-    if chat_id:
-        try:
-            session = ChatSession.objects.get(id=chat_id, user=user)
-        except ChatSession.DoesNotExist:
-            return Response({'error': 'chat_not_found'}, status=status.HTTP_404_NOT_FOUND)
-    else:
-        # Create new chat session, keep only last 15 sessions
-        title = (user_message[:100] + '...') if len(user_message) > 100 else user_message
-        session = ChatSession.objects.create(user=user, title=title or 'Новый диалог')
-        # Retention: keep last 15 sessions
-        keep = 15
-        ids_to_keep = list(ChatSession.objects.filter(user=user).order_by('-updated_at').values_list('id', flat=True)[:keep])
-        ChatSession.objects.filter(user=user).exclude(id__in=ids_to_keep).delete()
-
-    # Save user message (only for regular prompts)
-    if user_message:
-        ChatMessage.objects.create(session=session, role='user', content=user_message)
-
-    # Collect a concise snapshot of user's tasks
-    tasks_qs = Task.objects.filter(user=user).select_related('category')
-    pending = list(tasks_qs.filter(is_done=False).values('id', 'title', 'priority', 'deadline', 'category__name')[:50])
-    completed = list(tasks_qs.filter(is_done=True).values('id', 'title', 'priority', 'completed_at', 'category__name')[:20])
-
-    def fmt_task(t):
-        return f"- [{t.get('category__name') or 'Без категории'}] {t['title']} (приоритет: {t.get('priority') or '-'}, дедлайн: {t.get('deadline') or '-'})"
-    def fmt_completed(t):
-        return f"- [{t.get('category__name') or 'Без категории'}] {t['title']} (выполнено)"
-
-    snapshot = "\n".join([fmt_task(t) for t in pending])
-    snapshot_done = "\n".join([fmt_completed(t) for t in completed])
-
-    system_prompt = (
-        "Ты — помощник по планированию задач. Отвечай по-русски."
-        "Учитывай ТОЛЬКО задачи текущего пользователя, которые даются в контексте. "
-        "Не повторяй обратно список задач, если тебя об этом явно не попросили. "
-        "Никогда не утверждай, что уже выполнил какие‑либо изменения. Если пользователь просит создать/обновить/удалить — кратко подтверди намерение и жди подтверждения."
-    )
-
-    content = (
-        f"Контекст — мои задачи (всего: {tasks_qs.count()}):\n"
-        f"Невыполненные (до 50):\n{snapshot or '- нет'}\n\n"
-        f"Выполненные (до 20):\n{snapshot_done or '- нет'}\n\n"
-        f"Вопрос: {user_message}"
-    )
+    # Chat session, user message and the prompt context
+    chat = assistant.open_chat(user, data.get('chat_id'), user_message)
+    if chat is None:
+        return Response({'error': 'chat_not_found'}, status=status.HTTP_404_NOT_FOUND)
+    session, content, history = chat
 
     try:
-        # Auto-detect OpenRouter key and set base URL if needed
-        is_openrouter_key = api_key.startswith('sk-or-')
-        base_url = base_url_env or ('https://openrouter.ai/api/v1' if is_openrouter_key else None)
-
-        # Normalize model id: OpenRouter expects vendor prefix (e.g. "openai/gpt-4o-mini")
-        configured_model = config('OPENAI_MODEL', default='gpt-4o-mini')
-        model = configured_model
-        if is_openrouter_key and '/' not in configured_model:
-            model = f'openai/{configured_model}'
-
-        # Build client
-        if base_url:
-            client = OpenAI(api_key=api_key, base_url=base_url, timeout=30)
-        else:
-            client = OpenAI(api_key=api_key, timeout=30)
-
-        # Compute max_tokens with safe bounds (from env and optional request override)
-        try:
-            env_cap = config('OPENAI_MAX_TOKENS', default=512, cast=int)
-        except Exception:
-            env_cap = 512
-        env_cap = max(32, min(env_cap, 4096))
-        req_cap = None
-        if isinstance(request.data, dict) and request.data.get('max_tokens') is not None:
-            try:
-                req_cap = int(request.data.get('max_tokens'))
-            except Exception:
-                req_cap = None
-        max_tokens = env_cap if req_cap is None else max(32, min(req_cap, env_cap))
-
-        # Optional OpenRouter ranking headers
-        extra_headers = {}
-        referer = config('AI_REFERER', default=None)
-        site_title = config('AI_TITLE', default=None)
-        if referer:
-            extra_headers["HTTP-Referer"] = referer
-        if site_title:
-            extra_headers["X-Title"] = site_title
-
-        # Build chat history for the model (last 10 pairs to keep short)
-        history = list(session.messages.order_by('-created_at').values('role', 'content')[:10])
-        history.reverse()
-
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *[{"role": m['role'], "content": m['content']} for m in history],
-                {"role": "user", "content": content},
-            ],
-            temperature=0.2,
-            max_tokens=max_tokens,
-            **({"extra_headers": extra_headers} if extra_headers else {}),
-        )
-        answer = completion.choices[0].message.content
+        client = ai.get_client(provider)
+        model = provider.model
+        answer_timeout = getattr(settings, 'AI_ANSWER_TIMEOUT', 30)
+        plan_timeout = getattr(settings, 'AI_PLAN_TIMEOUT', 30)
+
+        answer_request = assistant.answer_request(model, history, content, assistant.answer_max_tokens(provider, data))
+        plan_request = assistant.plan_request(model, content, bool(data.get('confirm')))
+
+        def answer_call(remaining):
+            completion = client.chat.completions.create(
+                **answer_request,
+                **provider.request_options(min(answer_timeout, remaining)),
+            )
+            return completion.choices[0].message.content
 
         # Second pass: actions planning
-        actions = {"categories": [], "tasks": []}
-        try:
-            if data.get('confirm'):
-                # Use client-provided actions if present, else regenerate
-                if data.get('actions'):
-                    actions = data['actions'] if isinstance(data['actions'], dict) else json.loads(data['actions'])
-                else:
-                    # Regenerate actions from current input
-                    schema_prompt = (
-                        "Ты парсер намерений для приложения задач. Верни ТОЛЬКО JSON. "
-                        "Схема: {\"categories\":[], \"tasks\":[], \"update_categories\":[], \"update_tasks\":[], \"delete_categories\":[], \"delete_tasks\":[]} "
-                        "categories: [{name, color?, description?}] — создать; "
-                        "tasks: [{title, description?, priority?, deadline?, category?}] — создать; "
-                        "update_categories: [{name, new_name?, color?, description?}]; "
-                        "update_tasks: [{id?|title, title?, description?, priority?, deadline?, category?, is_done?}]; "
-                        "delete_categories: [{name}]; delete_tasks: [{id?|title}]. "
-                        "deadline по возможности ISO8601 (например 2025-09-05T18:00:00Z)."
-                    )
-                    actions_completion = client.chat.completions.create(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": schema_prompt},
-                            {"role": "user", "content": content},
-                        ],
-                        temperature=0,
-                        max_tokens=768,
-                        **({"extra_headers": extra_headers} if extra_headers else {}),
-                    )
-                    raw_json = (actions_completion.choices[0].message.content or "").strip()
-                    try:
-                        actions = json.loads(raw_json)
-                    except Exception:
-                        start = raw_json.find('{'); end = raw_json.rfind('}')
-                        actions = json.loads(raw_json[start:end+1]) if (start != -1 and end != -1 and end > start) else {"categories": [], "tasks": []}
-            else:
-                # Plan only (no execution)
-                schema_prompt = (
-                    "Ты парсер намерений для приложения задач. Верни ТОЛЬКО JSON. "
-                    "Схема: {\"categories\":[], \"tasks\":[], \"update_categories\":[], \"update_tasks\":[], \"delete_categories\":[], \"delete_tasks\":[]} "
-                    "categories: [{name, color?, description?}] — создать; "
-                    "tasks: [{title, description?, priority?, deadline?, category?}] — создать; "
-                    "update_categories: [{name, new_name?, color?, description?}]; "
-                    "update_tasks: [{id?|title, title?, description?, priority?, deadline?, category?, is_done?}]; "
-                    "delete_categories: [{name}]; delete_tasks: [{id?|title}]. "
-                    "deadline по возможности ISO8601."
-                )
+        def plan_call(remaining):
+            # A failed plan is an empty plan: it never cancels the answer
+            try:
                 actions_completion = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": schema_prompt},
-                        {"role": "user", "content": content},
-                    ],
-                    temperature=0,
-                    max_tokens=768,
-                    **({"extra_headers": extra_headers} if extra_headers else {}),
+                    **plan_request,
+                    **provider.request_options(min(plan_timeout, remaining)),
                 )
-                raw_json = (actions_completion.choices[0].message.content or "").strip()
-                try:
-                    actions = json.loads(raw_json)
-                except Exception:
-                    start = raw_json.find('{'); end = raw_json.rfind('}')
-                    actions = json.loads(raw_json[start:end+1]) if (start != -1 and end != -1 and end > start) else {"categories": [], "tasks": []}
-        except Exception:
-            actions = {"categories": [], "tasks": []}
-
-        created_summary = []
-        # Limits per request
-        max_new_categories = 5
-        max_new_tasks = 20
-
-        # Create or reuse categories only if confirm=True
-        executed = False
-        if data.get('confirm'):
-            executed = True
-            try:
-                cats_in = (actions.get('categories') or [])[:max_new_categories]
-                for cat in cats_in:
-                    name = (cat.get('name') or '').strip()
-                    if not name:
-                        continue
-                    color = cat.get('color') or None
-                    # Prefer an existing accessible category (user-owned first, then global)
-                    obj = TaskCategory.objects.filter(
-                        (Q(owner=request.user) | Q(owner__isnull=True)) & Q(name__iexact=name)
-                    ).order_by('-owner').first()
-                    if not obj:
-                        # Create a user-owned category
-                        obj = TaskCategory.objects.create(
-                            name=name,
-                            color=(color if (isinstance(color, str) and color.startswith('#') and len(color) in (4, 7)) else '#3B82F6'),
-                            owner=request.user
-                        )
-                    else:
-                        # Update color only for user's own categories
-                        if obj.owner_id == request.user.id and color and isinstance(color, str) and color.startswith('#') and len(color) in (4, 7) and obj.color != color:
-                            obj.color = color
-                            obj.save()
-                    # Do not reveal whether category existed before to avoid inference
-                    created_summary.append(f"категория: {obj.name}")
-            except Exception:
-                pass
-
-        # Helper normalization
-        def norm_priority(p):
-            p = (p or '').lower()
-            return p if p in ('low', 'medium', 'high') else 'medium'
-
-        def parse_deadline(value):
-            if not value:
-                return None
-            dt = parse_datetime(value)
-            if dt:
-                if timezone.is_naive(dt):
-                    dt = timezone.make_aware(dt, timezone=timezone.utc)
-                return dt
-            try:
-                dt = datetime.fromisoformat(value)
-                if timezone.is_naive(dt):
-                    dt = timezone.make_aware(dt, timezone=timezone.utc)
-                return dt
+                return assistant.parse_plan(actions_completion.choices[0].message.content)
             except Exception:
-                pass
-            # Fallback: dd.mm.yyyy[ HH:MM]
-            try:
-                parts = value.strip().split()
-                date_part = parts[0]
-                day, month, year = [int(x) for x in date_part.split('.')]
-                if len(parts) > 1:
-                    time_part = parts[1]
-                    hh, mm = [int(x) for x in time_part.split(':')]
-                else:
-                    hh, mm = 9, 0  # default 09:00
-                dt = datetime(year, month, day, hh, mm)
-                if timezone.is_naive(dt):
-                    dt = timezone.make_aware(dt, timezone=timezone.utc)
-                return dt
-            except Exception:
-                return None
-
-        # Category lookup cache (only categories visible to the user)
-        cat_cache = {c.name.lower(): c for c in TaskCategory.objects.filter(Q(owner__isnull=True) | Q(owner=user))}
-
-        # Create tasks only if confirm=True
-        if data.get('confirm'):
-            try:
-                tasks_in = (actions.get('tasks') or [])[:max_new_tasks]
-                new_count = 0
-                for t in tasks_in:
-                    title = (t.get('title') or '').strip()
-                    if len(title) < 3:
-                        continue
-                    desc = t.get('description') or None
-                    prio = norm_priority(t.get('priority'))
-                    cat_name = (t.get('category') or '').strip().lower()
-                    category = cat_cache.get(cat_name) if cat_name else None
-                    deadline_dt = parse_deadline(t.get('deadline'))
-                    Task.objects.create(
-                        user=user,
-                        title=title,
-                        description=desc,
-                        priority=prio,
-                        deadline=deadline_dt,
-                        category=category,
-                    )
-                    new_count += 1
-                if new_count:
-                    created_summary.append(f"задач создано: {new_count}")
-            except Exception:
-                pass
-
-        # Update categories (confirm only)
-        if data.get('confirm'):
-            try:
-                updates = actions.get('update_categories') or []
-                upd_count = 0
-                for u in updates:
-                    name = (u.get('name') or '').strip()
-                    if not name:
-                        continue
-                    # Only allow updating user's own categories
-                    cat = TaskCategory.objects.filter(owner=user, name__iexact=name).first()
-                    if not cat:
-                        continue
-                    changed = False
-                    new_name = (u.get('new_name') or '').strip()
-                    if new_name and new_name != cat.name and not TaskCategory.objects.filter(owner=user, name__iexact=new_name).exists():
-                        cat.name = new_name
-                        changed = True
-                    color = u.get('color')
-                    if color and isinstance(color, str) and color.startswith('#') and len(color) in (4, 7) and color != cat.color:
-                        cat.color = color
-                        changed = True
-                    desc = u.get('description')
-                    if desc is not None and desc != cat.description:
-                        cat.description = desc
-                        changed = True
-                    if changed:
-                        cat.save()
-                        upd_count += 1
-                if upd_count:
-                    created_summary.append(f"категорий обновлено: {upd_count}")
-            except Exception:
-                pass
+                return assistant.empty_plan()
+
+        # The client's plan (confirm requests) or the rules' plan for a
+        # simple command; the provider is only called without one
+        actions, command = assistant.plan_source(data, user_message)
+        if command:
+            actions = intents.command_plan(user, command)
+        needed, actions, executed = assistant.assist_calls(data, actions)
+        calls = {name: {'answer': answer_call, 'plan': plan_call}[name] for name in needed}
+
+        if stream and 'answer' in calls:
+            # Answer tokens are sent as they arrive; the plan runs alongside
+            answer_request.update(provider.request_options(answer_timeout))
+            return event_stream_response(
+                stream_assist_reply(client, provider, session, answer_request, plan_call, started)
+            )
 
-        # Update tasks (confirm only)
-        if data.get('confirm'):
-            try:
-                updates = actions.get('update_tasks') or []
-                upd_count = 0
-                cat_cache = {c.name.lower(): c for c in TaskCategory.objects.filter(Q(owner__isnull=True) | Q(owner=user))}
-                for u in updates:
-                    task = None
-                    if u.get('id') is not None:
-                        task = Task.objects.filter(user=user, id=u.get('id')).first()
-                    if not task and u.get('title'):
-                        task = Task.objects.filter(user=user, title__iexact=(u.get('title') or '').strip()).order_by('-created_at').first()
-                    if not task:
-                        continue
-                    changed = False
-                    if 'title' in u and u['title']:
-                        title = u['title'].strip()
-                        if len(title) >= 3 and title != task.title:
-                            task.title = title
-                            changed = True
-                    if 'description' in u:
-                        desc = u['description']
-                        if desc != task.description:
-                            task.description = desc
-                            changed = True
-                    if 'priority' in u:
-                        prio = norm_priority(u.get('priority'))
-                        if prio != task.priority:
-                            task.priority = prio
-                            changed = True
-                    if 'deadline' in u:
-                        deadline_dt = parse_deadline(u.get('deadline'))
-                        if deadline_dt != task.deadline:
-                            task.deadline = deadline_dt
-                            changed = True
-                    if 'category' in u:
-                        cname = (u.get('category') or '').strip().lower()
-                        new_cat = cat_cache.get(cname) if cname else None
-                        if new_cat != task.category:
-                            task.category = new_cat
-                            changed = True
-                    if 'is_done' in u:
-                        is_done = bool(u.get('is_done'))
-                        if is_done != task.is_done:
-                            task.is_done = is_done
-                            changed = True
-                    if changed:
-                        task.save()
-                        upd_count += 1
-                if upd_count:
-                    created_summary.append(f"задач обновлено: {upd_count}")
-            except Exception:
-                pass
+        # Both calls are built from the same input and run concurrently
+        round_started = time.perf_counter()
+        results = ai.call_pool.run(calls, getattr(settings, 'AI_ASSIST_DEADLINE', 30)) if calls else {}
+        assistant.record_round(calls, round_started)
+        answer = results.get('answer')
+        actions = results.get('plan', actions)
 
-        # Delete categories (confirm only)
-        if data.get('confirm'):
-            try:
-                deletions = actions.get('delete_categories') or []
-                del_ok = 0
-                for d in deletions:
-                    name = (d.get('name') or '').strip()
-                    if not name:
-                        continue
-                    # Only delete user's own categories
-                    cat = TaskCategory.objects.filter(owner=user, name__iexact=name).first()
-                    if not cat:
-                        continue
-                    Task.objects.filter(user=user, category=cat).update(category=None)
-                    cat.delete()
-                    del_ok += 1
-                msg_parts = []
-                if del_ok:
-                    msg_parts.append(f"категорий удалено: {del_ok}")
-                if msg_parts:
-                    created_summary.append("; ".join(msg_parts))
-            except Exception:
-                pass
-
-        # Delete tasks (confirm only)
-        if data.get('confirm'):
-            try:
-                deletions = actions.get('delete_tasks') or []
-                del_count = 0
-                for d in deletions:
-                    task = None
-                    if d.get('id') is not None:
-                        task = Task.objects.filter(user=user, id=d.get('id')).first()
-                    if not task and d.get('title'):
-                        task = Task.objects.filter(user=user, title__iexact=(d.get('title') or '').strip()).order_by('-created_at').first()
-                    if not task:
-                        continue
-                    task.delete()
-                    del_count += 1
-                if del_count:
-                    created_summary.append(f"задач удалено: {del_count}")
-            except Exception:
-                pass
-
-        # Build deterministic assistant reply to avoid misleading claims
-        def summarize_plan(a: dict) -> str:
-            c_c = len(a.get('categories') or [])
-            c_t = len(a.get('tasks') or [])
-            u_c = len(a.get('update_categories') or [])
-            u_t = len(a.get('update_tasks') or [])
-            d_c = len(a.get('delete_categories') or [])
-            d_t = len(a.get('delete_tasks') or [])
-            lines = ["Я подготовил план изменений:"]
-            if any([c_c, c_t]):
-                lines.append(f"- создать: категорий {c_c}, задач {c_t}")
-            if any([u_c, u_t]):
-                lines.append(f"- обновить: категорий {u_c}, задач {u_t}")
-            if any([d_c, d_t]):
-                lines.append(f"- удалить: категорий {d_c}, задач {d_t}")
-            lines.append("Нажмите Подтвердить, чтобы выполнить.")
-            return "\n".join(lines)
-
-        has_actions = any([
-            actions.get('categories'), actions.get('tasks'),
-            actions.get('update_categories'), actions.get('update_tasks'),
-            actions.get('delete_categories'), actions.get('delete_tasks')
-        ])
-
-        if not executed and has_actions:
-            answer = summarize_plan(actions)
-        elif executed:
-            if created_summary:
-                answer = "Изменения выполнены. " + "; ".join(created_summary)
-            else:
-                answer = "Изменения выполнены."
-
-        # Save assistant message
-        ChatMessage.objects.create(session=session, role='assistant', content=answer or '')
-
-        response_payload = {
-            'reply': (answer or '').rstrip(),
-            'source': 'openai' if not is_openrouter_key else 'openrouter',
-            'chat_id': session.id,
-            'requires_confirmation': (not executed and has_actions),
-            'executed': executed,
-        }
-        if not executed:
-            response_payload['plan'] = actions
-        if executed and created_summary:
-            response_payload['created'] = created_summary
+        # Apply the plan only if confirm=True, then save the assistant message
+        response_payload = assistant.save_reply(user, provider, session, answer, actions, executed)
 
+        if stream:
+            return event_stream_response(iter([render_event('plan', response_payload)]))
         return Response(response_payload)
     except Exception as e:
-        # In DEBUG provide a hint to speed up troubleshooting (no secrets exposed)
-        if getattr(settings, 'DEBUG', False):
-            return Response({
-                'error': 'Сервис ИИ пока что недоступен',
-                'detail': str(e),
-                'model': model if 'model' in locals() else None,
-                'base_url': base_url if 'base_url' in locals() else None,
-                'provider': 'openrouter' if 'is_openrouter_key' in locals() and is_openrouter_key else 'openai'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        # Hide provider errors from clients in production
-        return Response({'error': 'Сервис ИИ пока что недоступен'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        # Provider errors are only detailed in DEBUG
+        return Response(assistant.unavailable_payload(provider, e), status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
 @api_view(['GET'])
@@ -882,17 +666,7 @@ def ai_chats_list(request):
     """
     List last 15 chat sessions for the user.
     """
-    sessions = ChatSession.objects.filter(user=request.user).order_by('-updated_at')[:15]
-    data = [
-        {
-            'id': s.id,
-            'title': s.title,
-            'created_at': s.created_at,
-            'updated_at': s.updated_at,
-        }
-        for s in sessions
-    ]
-    return Response({'chats': data})
+    return Response({'chats': assistant.chat_list(request.user)})
 
 
 @api_view(['GET'])
@@ -901,10 +675,7 @@ def ai_chat_messages(request, chat_id: int):
     """
     Get messages for a chat session (last 200).
     """
-    try:
-        session = ChatSession.objects.get(id=chat_id, user=request.user)
-    except ChatSession.DoesNotExist:
+    data = assistant.chat_messages(request.user, chat_id)
+    if data is None:
         return Response({'error': 'chat_not_found'}, status=status.HTTP_404_NOT_FOUND)
-    msgs = session.messages.order_by('created_at')[:200]
-    data = [{'role': m.role, 'content': m.content, 'created_at': m.created_at} for m in msgs]
-    return Response({'chat': {'id': session.id, 'title': session.title}, 'messages': data})
+    return Response(data)
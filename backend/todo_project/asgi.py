@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
+# Waiting on the AI provider should not hold a worker thread under ASGI
+os.environ.setdefault('AI_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
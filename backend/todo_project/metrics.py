@@ -0,0 +1,89 @@
+"""
+In-process metrics registry.
+
+Counters, gauges and timing summaries kept in memory per worker process
+and exposed as JSON at /api/metrics/ (see metrics_view). Names are dotted
+strings, optionally split by labels: metrics.observe('x.seconds', 0.2,
+encoding='gzip') is reported under 'x.seconds{encoding=gzip}'.
+"""
+import hmac
+import os
+import threading
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}={v}' for k, v in sorted(labels.items())) + '}'
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, gauges and summaries
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._gauges = {}
+            self._summaries = {}
+
+    def increment(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        """
+        Add a sample (e.g. seconds) to a count/sum/min/max summary
+        """
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = {'count': 1, 'sum': value, 'min': value, 'max': value}
+            else:
+                summary['count'] += 1
+                summary['sum'] += value
+                summary['min'] = min(summary['min'], value)
+                summary['max'] = max(summary['max'], value)
+
+    def snapshot(self):
+        with self._lock:
+            summaries = {
+                key: {**summary, 'avg': summary['sum'] / summary['count']}
+                for key, summary in self._summaries.items()
+            }
+            return {
+                'pid': os.getpid(),
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'summaries': summaries,
+            }
+
+
+metrics = Metrics()
+
+
+def metrics_view(request):
+    """
+    Metrics of the worker process serving the request. Requires the
+    X-Metrics-Token header to match METRICS_TOKEN; disabled when unset.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    provided = request.headers.get('X-Metrics-Token', '')
+    if not token or not hmac.compare_digest(provided.encode(), token.encode()):
+        raise Http404()
+    return JsonResponse(metrics.snapshot())
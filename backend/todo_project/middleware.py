@@ -0,0 +1,264 @@
+import re
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from .metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+ACCEPT_ENCODING_RE = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def parse_accept_encoding(header):
+    """
+    {coding: q} from an Accept-Encoding header
+    """
+    codings = {}
+    for part in (header or '').split(','):
+        match = ACCEPT_ENCODING_RE.match(part)
+        if not match:
+            continue
+        try:
+            q = float(match[2]) if match[2] is not None else 1.0
+        except ValueError:
+            continue
+        codings[match[1].lower()] = q
+    return codings
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self):
+        level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        # wbits=31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """
+        Emit everything buffered so far without ending the stream
+        """
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self):
+        quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+ENCODERS = {'gzip': GzipEncoder}
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder
+
+# Preferred coding when the client accepts several with the same q
+PREFERENCE = ('br', 'gzip')
+
+
+def select_encoder(request):
+    codings = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    best, best_q = None, 0.0
+    for name in PREFERENCE:
+        if name not in ENCODERS:
+            continue
+        q = codings.get(name, codings.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return ENCODERS[best] if best else None
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip, negotiated by
+    Accept-Encoding.
+
+    Bodies under COMPRESSION_MIN_SIZE bytes and responses under
+    COMPRESSION_EXCLUDED_PATHS (secrets next to reflected input, see
+    BREACH) are sent as is. Streaming responses are compressed chunk by
+    chunk and flushed after every chunk, so clients receive data as it is
+    produced. CPU time spent compressing
+    is recorded per response in the metrics registry
+    ('compression.cpu_seconds', by encoding) together with bytes in/out.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.excluded_paths = tuple(getattr(settings, 'COMPRESSION_EXCLUDED_PATHS', ()))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if request.path_info.startswith(self.excluded_paths):
+            return response
+        # It's not worth attempting to compress really short responses
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        # Avoid compressing twice
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoder_class = select_encoder(request)
+        if encoder_class is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async_stream(
+                    encoder_class(), response.streaming_content
+                )
+            else:
+                response.streaming_content = self.compress_stream(
+                    encoder_class(), response.streaming_content
+                )
+            # Length of the compressed stream is not known up front
+            del response['Content-Length']
+        else:
+            encoder = encoder_class()
+            start = time.thread_time()
+            compressed = encoder.compress(response.content) + encoder.finish()
+            self.record(encoder, time.thread_time() - start, len(response.content), len(compressed))
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+
+        # An ETag describes the uncompressed representation: make it weak,
+        # as django.middleware.gzip does
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoder_class.name
+        return response
+
+    def compress_stream(self, encoder, chunks):
+        cpu = size_in = size_out = 0
+        try:
+            for chunk in chunks:
+                start = time.thread_time()
+                data = encoder.compress(chunk) + encoder.flush()
+                cpu += time.thread_time() - start
+                size_in += len(chunk)
+                size_out += len(data)
+                if data:
+                    yield data
+            start = time.thread_time()
+            data = encoder.finish()
+            cpu += time.thread_time() - start
+            size_out += len(data)
+            yield data
+        finally:
+            self.record(encoder, cpu, size_in, size_out)
+
+    async def compress_async_stream(self, encoder, chunks):
+        cpu = size_in = size_out = 0
+        try:
+            async for chunk in chunks:
+                start = time.thread_time()
+                data = encoder.compress(chunk) + encoder.flush()
+                cpu += time.thread_time() - start
+                size_in += len(chunk)
+                size_out += len(data)
+                if data:
+                    yield data
+            start = time.thread_time()
+            data = encoder.finish()
+            cpu += time.thread_time() - start
+            size_out += len(data)
+            yield data
+        finally:
+            self.record(encoder, cpu, size_in, size_out)
+
+    def record(self, encoder, cpu_seconds, size_in, size_out):
+        metrics.observe('compression.cpu_seconds', cpu_seconds, encoding=encoder.name)
+        metrics.increment('compression.bytes_in', size_in, encoding=encoder.name)
+        metrics.increment('compression.bytes_out', size_out, encoding=encoder.name)
+
+
+class APIExemptMiddleware:
+    """
+    Run the wrapped middleware (a dotted path) for every request except
+    those under API_PATH_PREFIX when STATELESS_API is enabled.
+
+    The API authenticates with JWT only, so sessions, CSRF cookies,
+    messages and session-based request.user are never read there.
+    Like the wrapped middleware, it runs sync or async (under ASGI).
+    """
+    wrapped = None
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.middleware = import_string(self.wrapped)(get_response)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def is_exempt(self, request):
+        return getattr(settings, 'STATELESS_API', True) and request.path_info.startswith(
+            getattr(settings, 'API_PATH_PREFIX', '/api/')
+        )
+
+    def __call__(self, request):
+        if self.is_exempt(request):
+            # In async mode get_response returns the coroutine to await
+            return self.get_response(request)
+        return self.middleware(request)
+
+
+class SessionMiddleware(APIExemptMiddleware):
+    wrapped = 'django.contrib.sessions.middleware.SessionMiddleware'
+
+
+class CsrfViewMiddleware(APIExemptMiddleware):
+    wrapped = 'django.middleware.csrf.CsrfViewMiddleware'
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_exempt(request):
+            return None
+        return self.middleware.process_view(request, view_func, view_args, view_kwargs)
+
+
+class AuthenticationMiddleware(APIExemptMiddleware):
+    wrapped = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+
+
+class MessageMiddleware(APIExemptMiddleware):
+    wrapped = 'django.contrib.messages.middleware.MessageMiddleware'
@@ -0,0 +1,64 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections, transaction
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over large tables.
+
+    COUNT(*) on PostgreSQL reads the whole table, so an unfiltered list
+    larger than ADMIN_EXACT_COUNT_LIMIT rows is counted from the
+    planner's estimate (pg_class.reltuples). A filtered list is counted
+    exactly under a statement timeout of ADMIN_COUNT_TIMEOUT_MS; when
+    that runs out the planner's row estimate for the query is used.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        if not queryset.query.where:
+            estimate = self.table_estimate(queryset)
+            if estimate >= getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000):
+                return estimate
+
+        timeout = getattr(settings, 'ADMIN_COUNT_TIMEOUT_MS', 200)
+        try:
+            with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT current_setting('statement_timeout'), set_config('statement_timeout', %s, true)",
+                    [str(timeout)]
+                )
+                previous = cursor.fetchone()[0]
+                count = queryset.count()
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [previous])
+                return count
+        except OperationalError:
+            return self.plan_estimate(queryset)
+
+    def table_estimate(self, queryset):
+        """
+        Row count of the queryset's table from the last ANALYZE, or -1
+        when the table has never been analyzed
+        """
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
+
+    def plan_estimate(self, queryset):
+        """
+        Number of rows the planner expects the query to return
+        """
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,111 @@
+"""
+API renderers: an orjson-backed JSON renderer and a MessagePack renderer.
+Both fall back to DRF's JSON encoder for types they don't handle natively.
+EventStreamRenderer lets views opt in to `text/event-stream`.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def encode_default(obj):
+    """
+    Encode types the binary encoders don't know (Decimal, timedelta, lazy
+    strings, querysets, ...) the way DRF's JSONEncoder does
+    """
+    return encoders.JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson. Output matches DRF's compact, unicode
+    JSON, except that NaN and infinite floats render as null where DRF
+    raises ValueError. Indented output (e.g. `application/json; indent=4`),
+    data orjson can't encode (integers wider than 64 bits) and missing
+    orjson fall back to the stdlib renderer.
+    """
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=encode_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep DRF's escaping of U+2028/U+2029 so output stays a JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders `application/msgpack` for clients that ask for it
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+def render_event(event, data):
+    """
+    One server-sent event with a JSON payload
+    """
+    payload = ORJSONRenderer().render(data).decode()
+    return f'event: {event}\ndata: {payload}\n\n'.encode()
+
+
+def event_stream_response(events):
+    """
+    StreamingHttpResponse for an (async) iterator of render_event() chunks
+    """
+    response = StreamingHttpResponse(events, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies (nginx) from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Negotiates `text/event-stream` for views that stream their reply (they
+    return a StreamingHttpResponse of render_event() chunks). A regular
+    Response, e.g. a validation error, is sent as a single event: 'error'
+    for 4xx/5xx statuses, 'message' otherwise.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        response = (renderer_context or {}).get('response')
+        event = 'error' if response is not None and response.status_code >= 400 else 'message'
+        return render_event(event, data)
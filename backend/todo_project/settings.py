@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from importlib.util import find_spec
 from decouple import config
 from datetime import timedelta
 
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -58,14 +60,22 @@ if config('JWT_ENABLE_BLACKLIST', default=False, cast=bool):
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'todo_project.middleware.CompressionMiddleware',
+    # Session, CSRF, auth and messages are skipped under API_PATH_PREFIX
+    # (JWT-only, see STATELESS_API)
+    'todo_project.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'todo_project.middleware.CsrfViewMiddleware',
+    'todo_project.middleware.AuthenticationMiddleware',
+    'todo_project.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The API is token-only: no session writes or CSRF/messages processing
+# for paths under API_PATH_PREFIX
+STATELESS_API = config('STATELESS_API', default=True, cast=bool)
+API_PATH_PREFIX = '/api/'
+
 ROOT_URLCONF = 'todo_project.urls'
 
 TEMPLATES = [
@@ -99,6 +109,11 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='password'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Seconds a connection is reused for (0: one per request). Keep 0 under
+        # ASGI, where sync code runs on a new thread per request; the async AI
+        # views' database threads use AI_ASYNC_DB_CONN_MAX_AGE instead
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -121,6 +136,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing runs on a bounded pool (authentication.hashers): at most
+# PASSWORD_HASHING_WORKERS hashes at a time (default: CPU count) and
+# PASSWORD_HASHING_QUEUE_SIZE waiting; further logins get a 429.
+# PASSWORD_ARGON2=true hashes new passwords with Argon2id (argon2-cffi);
+# existing PBKDF2 hashes are upgraded on the next login.
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=0, cast=int)
+PASSWORD_HASHING_QUEUE_SIZE = config('PASSWORD_HASHING_QUEUE_SIZE', default=16, cast=int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=65536, cast=int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=1, cast=int)
+
+PASSWORD_ARGON2 = config('PASSWORD_ARGON2', default=False, cast=bool) and find_spec('argon2') is not None
+
+# Hashers are looked up by algorithm name with the last entry winning, so
+# argon2 is listed once, as the pooled hasher, whether or not it's the default
+PASSWORD_HASHERS = [
+    *(['authentication.hashers.PooledArgon2PasswordHasher'] if PASSWORD_ARGON2 else []),
+    'authentication.hashers.PooledPBKDF2PasswordHasher',
+    # Django's other defaults, to verify hashes made with them
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    *([] if PASSWORD_ARGON2 else ['authentication.hashers.PooledArgon2PasswordHasher']),
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -150,18 +190,66 @@ AUTH_USER_MODEL = 'authentication.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'todo_project.renderers.ORJSONRenderer',
+        # MessagePack is offered only when the optional msgpack package is installed
+        *(['todo_project.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'todo_project.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        *(['todo_project.parsers.MessagePackParser'] if find_spec('msgpack') else []),
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Cache (category cache, ...). With several worker processes use a shared
+# backend, e.g. django.core.cache.backends.redis.RedisCache. The category
+# cache is skipped with a per-process backend (LocMemCache, DummyCache):
+# other workers and management commands would not see its invalidations.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Seconds cached categories may be served without seeing an invalidation
+TASKS_CATEGORY_CACHE_TIMEOUT = config('TASKS_CATEGORY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Conditional GET on task read endpoints: longest time (seconds) a 304 may
+# keep clock-dependent fields such as is_overdue unchanged
+TASKS_CONDITIONAL_GET_MAX_AGE = config('TASKS_CONDITIONAL_GET_MAX_AGE', default=60, cast=int)
+
+# Delta sync: days deleted-task tombstones are kept before compaction;
+# sync tokens older than that require a full resync
+TASKS_SYNC_TOMBSTONE_RETENTION_DAYS = config('TASKS_SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Response compression (brotli when installed, else gzip): bodies smaller
+# than COMPRESSION_MIN_SIZE bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+# Never compressed: auth responses carry tokens next to echoed request
+# data, which compression would expose to BREACH-style length probing
+COMPRESSION_EXCLUDED_PATHS = ('/api/auth/',)
+
+# Token for GET /api/metrics/ (X-Metrics-Token header); empty disables it
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Admin changelists: unfiltered tables larger than ADMIN_EXACT_COUNT_LIMIT rows
+# are counted from the planner's estimate; filtered counts give up after
+# ADMIN_COUNT_TIMEOUT_MS milliseconds (see todo_project.paginators)
+ADMIN_EXACT_COUNT_LIMIT = config('ADMIN_EXACT_COUNT_LIMIT', default=10000, cast=int)
+ADMIN_COUNT_TIMEOUT_MS = config('ADMIN_COUNT_TIMEOUT_MS', default=200, cast=int)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
@@ -180,8 +268,62 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.tokens.DenylistTokenRefreshSerializer',
 }
 
+# Refresh token denylist (authentication.denylist, with JWT_ENABLE_BLACKLIST):
+# a per-process Bloom filter of blacklisted JTIs, synced from the database
+# every JWT_DENYLIST_SYNC_INTERVAL seconds and rebuilt every
+# JWT_DENYLIST_REBUILD_INTERVAL seconds. Expired tokens are removed by
+# `manage.py expire_outstanding_tokens`, run from cron.
+# Other processes learn about a blacklisted token only at their next sync:
+# a refresh token rotated in one worker can still be used once in another
+# for up to JWT_DENYLIST_SYNC_INTERVAL seconds.
+JWT_DENYLIST_SYNC_INTERVAL = config('JWT_DENYLIST_SYNC_INTERVAL', default=10, cast=int)
+JWT_DENYLIST_REBUILD_INTERVAL = config('JWT_DENYLIST_REBUILD_INTERVAL', default=3600, cast=int)
+JWT_DENYLIST_CAPACITY = config('JWT_DENYLIST_CAPACITY', default=100000, cast=int)
+JWT_DENYLIST_ERROR_RATE = config('JWT_DENYLIST_ERROR_RATE', default=0.001, cast=float)
+
+# Per-process cache of authenticated users (authentication.authentication):
+# entries are reloaded after JWT_USER_CACHE_TTL seconds, and is_active,
+# password and name are re-read every JWT_USER_ACTIVE_RECHECK seconds. A
+# deactivation, password change or rename made in another worker is seen
+# by this one only at its next recheck: until then it accepts the old
+# password's tokens (CHECK_REVOKE_TOKEN) and renders the old name.
+JWT_USER_CACHE_SIZE = config('JWT_USER_CACHE_SIZE', default=10000, cast=int)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=300, cast=int)
+JWT_USER_ACTIVE_RECHECK = config('JWT_USER_ACTIVE_RECHECK', default=30, cast=int)
+
+# AI assistant (tasks.ai): one pooled HTTP client per provider and process.
+# Timeouts are in seconds; HTTP/2 is used when the h2 package is installed
+AI_ANSWER_TIMEOUT = config('AI_ANSWER_TIMEOUT', default=30, cast=float)
+AI_PLAN_TIMEOUT = config('AI_PLAN_TIMEOUT', default=30, cast=float)
+# Shared deadline for the answer and plan calls, which run concurrently on a
+# pool of AI_CALL_WORKERS threads per process
+AI_ASSIST_DEADLINE = config('AI_ASSIST_DEADLINE', default=30, cast=float)
+AI_CALL_WORKERS = config('AI_CALL_WORKERS', default=32, cast=int)
+# Serve ai_assist and the chat views with tasks.async_views (set by asgi.py).
+# Their database work runs on AI_ASYNC_DB_CONCURRENCY threads (connections)
+# per process, whatever the number of requests waiting on the provider
+AI_ASYNC_VIEWS = config('AI_ASYNC_VIEWS', default=False, cast=bool)
+AI_ASYNC_DB_CONCURRENCY = config('AI_ASYNC_DB_CONCURRENCY', default=10, cast=int)
+# Seconds those threads keep their connections open between requests
+AI_ASYNC_DB_CONN_MAX_AGE = config('AI_ASYNC_DB_CONN_MAX_AGE', default=60, cast=int)
+# Rule-based fast path (tasks.intents): simple task commands get their plan
+# without provider calls when recognized with at least this confidence
+AI_INTENT_FAST_PATH = config('AI_INTENT_FAST_PATH', default=True, cast=bool)
+AI_INTENT_MIN_CONFIDENCE = config('AI_INTENT_MIN_CONFIDENCE', default=0.8, cast=float)
+AI_CONNECT_TIMEOUT = config('AI_CONNECT_TIMEOUT', default=5, cast=float)
+AI_MAX_RETRIES = config('AI_MAX_RETRIES', default=2, cast=int)
+AI_HTTP_MAX_CONNECTIONS = config('AI_HTTP_MAX_CONNECTIONS', default=100, cast=int)
+AI_HTTP_MAX_KEEPALIVE = config('AI_HTTP_MAX_KEEPALIVE', default=20, cast=int)
+AI_HTTP_KEEPALIVE_EXPIRY = config('AI_HTTP_KEEPALIVE_EXPIRY', default=120, cast=float)
+
+# Google sign-in: signing certs endpoint ({kid: x509 PEM} or JWKS), cached
+# per process as long as its Cache-Control allows
+GOOGLE_CERTS_URL = config('GOOGLE_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
+GOOGLE_CERTS_TIMEOUT = config('GOOGLE_CERTS_TIMEOUT', default=5, cast=int)
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:5173,http://127.0.0.1:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
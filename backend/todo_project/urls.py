@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.urls import path, include
 from django.http import JsonResponse
+from .metrics import metrics_view
 
 
 def api_root(request):
@@ -43,10 +44,13 @@ def api_root(request):
                 'detail': 'GET/PUT/DELETE /api/tasks/{id}/',
                 'update_status': 'PATCH /api/tasks/{id}/status/',
                 'bulk_operations': 'POST /api/tasks/bulk/',
+                'bulk_by_filter': 'POST /api/tasks/bulk/filter/',
+                'batch': 'POST /api/tasks/batch/',
                 'categories': 'GET/POST /api/tasks/categories/',
                 'stats': 'GET /api/tasks/stats/',
                 'upcoming': 'GET /api/tasks/upcoming/',
                 'search': 'GET /api/tasks/search/',
+                'sync': 'GET /api/tasks/sync/?since={token}',
             }
         }
     })
@@ -56,4 +60,5 @@ urlpatterns = [
     path('api/', api_root, name='api_root'),
     path('api/auth/', include('authentication.urls')),
     path('api/tasks/', include('tasks.urls')),
+    path('api/metrics/', metrics_view, name='metrics'),
 ]